@@ -0,0 +1,160 @@
+"""Incrementally maintained priority order of affected areas.
+
+Every area's urgency score is computed when the area is written and stored
+in ``affected_areas.urgency_score`` (indexed), and an in-memory indexed
+heap mirrors the scores.  Adding or changing an area costs O(log n) and
+top-k reads walk the heap without re-sorting anything.
+"""
+import asyncio
+import heapq
+
+
+class IndexedMaxHeap:
+    """Max-heap of ``(score, key)`` supporting O(log n) update and removal by key.
+
+    Ties are broken by the smaller key, matching the stable
+    ``ORDER BY urgency_score DESC, id`` order.
+    """
+
+    def __init__(self, items=()):
+        self._heap = [(-score, key) for key, score in items]
+        heapq.heapify(self._heap)
+        self._pos = {key: i for i, (_, key) in enumerate(self._heap)}
+
+    def __len__(self):
+        return len(self._heap)
+
+    def __contains__(self, key):
+        return key in self._pos
+
+    def score(self, key):
+        return -self._heap[self._pos[key]][0]
+
+    def _move(self, i, entry):
+        self._heap[i] = entry
+        self._pos[entry[1]] = i
+
+    def _sift_up(self, i):
+        entry = self._heap[i]
+        while i > 0:
+            parent = (i - 1) >> 1
+            if self._heap[parent] <= entry:
+                break
+            self._move(i, self._heap[parent])
+            i = parent
+        self._move(i, entry)
+
+    def _sift_down(self, i):
+        heap = self._heap
+        entry = heap[i]
+        n = len(heap)
+        while True:
+            child = 2 * i + 1
+            if child >= n:
+                break
+            if child + 1 < n and heap[child + 1] < heap[child]:
+                child += 1
+            if entry <= heap[child]:
+                break
+            self._move(i, heap[child])
+            i = child
+        self._move(i, entry)
+
+    def set(self, key, score):
+        """Insert ``key`` or change its score"""
+        entry = (-score, key)
+        i = self._pos.get(key)
+        if i is None:
+            self._heap.append(entry)
+            self._pos[key] = len(self._heap) - 1
+            self._sift_up(len(self._heap) - 1)
+            return
+        old = self._heap[i]
+        self._heap[i] = entry
+        if entry < old:
+            self._sift_up(i)
+        else:
+            self._sift_down(i)
+
+    def remove(self, key):
+        i = self._pos.pop(key)
+        last = self._heap.pop()
+        if i < len(self._heap):
+            self._move(i, last)
+            self._sift_up(i)
+            self._sift_down(self._pos[last[1]])
+
+    def top(self, k):
+        """The ``k`` highest ``(key, score)`` pairs, best first, in O(k log k)"""
+        heap = self._heap
+        result = []
+        frontier = [(heap[0], 0)] if heap else []
+        while frontier and len(result) < k:
+            (neg_score, key), i = heapq.heappop(frontier)
+            result.append((key, -neg_score))
+            for child in (2 * i + 1, 2 * i + 2):
+                if child < len(heap):
+                    heapq.heappush(frontier, (heap[child], child))
+        return result
+
+
+class AreaPriorityIndex:
+    """Keeps stored urgency scores and the in-memory heap in step"""
+
+    def __init__(self, database, score_area):
+        self.database = database
+        self.score_area = score_area
+        self._heap = None
+        self._pending = None
+        self._lock = asyncio.Lock()
+
+    def _load(self, conn):
+        rows = conn.execute(
+            'SELECT id, severity, population, delay_time, urgency_score FROM affected_areas'
+        ).fetchall()
+        scores = []
+        stale = []
+        for area_id, severity, population, delay_time, stored in rows:
+            score = self.score_area({'severity': severity, 'population': population, 'delay_time': delay_time})
+            scores.append((area_id, score))
+            if score != stored:
+                stale.append((score, area_id))
+        # Backfill rows written before scores were maintained on write
+        conn.executemany('UPDATE affected_areas SET urgency_score = ? WHERE id = ?', stale)
+        return IndexedMaxHeap(scores)
+
+    async def get(self):
+        heap = self._heap
+        if heap is not None:
+            return heap
+        async with self._lock:
+            if self._heap is None:
+                # Changes committed while the load is in flight are replayed
+                # on top of it; replaying one the load already saw is harmless
+                self._pending = []
+                try:
+                    heap = await self.database.run(self._load, write=True)
+                    for area_id, score in self._pending:
+                        if score is None:
+                            if area_id in heap:
+                                heap.remove(area_id)
+                        else:
+                            heap.set(area_id, score)
+                    self._heap = heap
+                finally:
+                    self._pending = None
+            return self._heap
+
+    def set(self, area_id, score):
+        """Record a committed score"""
+        if self._heap is not None:
+            self._heap.set(area_id, score)
+        elif self._pending is not None:
+            self._pending.append((area_id, score))
+
+    def remove(self, area_id):
+        if self._heap is not None:
+            if area_id in self._heap:
+                self._heap.remove(area_id)
+        elif self._pending is not None:
+            self._pending.append((area_id, None))
@@ -0,0 +1,89 @@
+"""Vectorized urgency scoring over all affected areas.
+
+The ``affected_areas`` columns are loaded once into NumPy arrays, scored in
+one pass with caller-supplied weights and ranked with ``argpartition``, so
+asking for the k most urgent of 100k+ areas never sorts the whole table.
+"""
+from database import LoadedCache
+from lazy_imports import lazy_import
+from metrics import instrument
+
+np = lazy_import('numpy')
+
+# Weights of the normalized severity, population and delay components
+DEFAULT_WEIGHTS = {'severity': 40, 'population': 30, 'delay': 30}
+
+# Values at which each component saturates
+SEVERITY_SCALE = 10
+POPULATION_CAP = 100000
+DELAY_CAP_HOURS = 24
+
+
+@instrument(size='severity')
+def urgency_scores(severity, population, delay_time, weights=DEFAULT_WEIGHTS):
+    """Scores for whole columns; same arithmetic as ``calculate_urgency_score``"""
+    severity_normalized = np.asarray(severity, dtype=np.float64) / SEVERITY_SCALE
+    population_normalized = np.minimum(np.asarray(population, dtype=np.float64) / POPULATION_CAP, 1)
+    delay_normalized = np.minimum(np.asarray(delay_time, dtype=np.float64) / DELAY_CAP_HOURS, 1)
+    return (severity_normalized * weights['severity'] +
+            population_normalized * weights['population'] +
+            delay_normalized * weights['delay'])
+
+
+@instrument(size='scores')
+def top_k(scores, ids, k):
+    """Indices of the ``k`` highest scores, best first, ties by smaller id.
+
+    ``ids`` must be ascending.  Selection is O(n) with ``argpartition``;
+    only the k winners are sorted.
+    """
+    n = len(scores)
+    if k <= 0 or n == 0:
+        return np.empty(0, dtype=np.intp)
+    if k < n:
+        candidates = np.argpartition(-scores, k - 1)[:k]
+        threshold = scores[candidates].min()
+        # argpartition breaks ties at the threshold arbitrarily; keep the
+        # smallest ids among them instead
+        above = np.flatnonzero(scores > threshold)
+        tied = np.flatnonzero(scores == threshold)
+        chosen = np.concatenate([above, tied[:k - len(above)]])
+    else:
+        chosen = np.arange(n)
+    return chosen[np.lexsort((ids[chosen], -scores[chosen]))]
+
+
+class AreaColumns:
+    """Column arrays of ``affected_areas`` ordered by id"""
+
+    def __init__(self, rows):
+        self.ids = np.array([row[0] for row in rows], dtype=np.int64)
+        self.names = [row[1] for row in rows]
+        self.severity = np.array([row[2] for row in rows], dtype=np.float64)
+        self.population = np.array([row[3] for row in rows], dtype=np.float64)
+        self.delay_time = np.array([row[4] for row in rows], dtype=np.float64)
+        self._raw = rows
+
+    def __len__(self):
+        return len(self.ids)
+
+    def area(self, i, score):
+        row = self._raw[i]
+        return {
+            'id': row[0],
+            'name': row[1],
+            'severity': row[2],
+            'population': row[3],
+            'delay_time': row[4],
+            'urgency_score': float(score)
+        }
+
+
+class AreaColumnCache(LoadedCache):
+    """Loads the area columns once and again after ``invalidate()``"""
+
+    def _load(self, conn):
+        rows = conn.execute(
+            'SELECT id, name, severity, population, delay_time FROM affected_areas ORDER BY id'
+        ).fetchall()
+        return AreaColumns(rows)
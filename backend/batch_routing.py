@@ -0,0 +1,72 @@
+"""One-to-many and many-to-many shortest paths on the road graph.
+
+A distance table between S sources and T targets needs one shortest-path
+tree per distinct source, not one search per pair: each tree is grown
+only until every target is settled, and all of its targets are read off
+it.  Roads are undirected, so the table can equally be grown from the
+targets and transposed -- whichever side has fewer distinct nodes is
+searched, which makes one-to-many and many-to-one both a single search.
+For the same reason a root that was already a target of an earlier tree
+only searches for the targets it does not know yet, so a square table
+over one set of stops costs about half its searches' work.
+"""
+from metrics import instrument
+from road_graph import INF
+
+
+def _unique(nodes):
+    return list(dict.fromkeys(nodes))
+
+
+@instrument(size='sources')
+def route_table(graph, sources, targets, paths=False):
+    """Distances (and optionally paths) from every source to every target.
+
+    ``sources`` and ``targets`` are node ids of ``graph``; duplicates are
+    allowed.  Returns ``{'distances', 'paths', 'searches'}`` where
+    ``distances[i][j]`` is the road distance from ``sources[i]`` to
+    ``targets[j]`` (None when unreachable) and ``paths[i][j]`` the node ids
+    along it, or None for both when ``paths`` is false.
+    """
+    distinct_sources = _unique(sources)
+    distinct_targets = _unique(targets)
+    reverse = len(distinct_targets) < len(distinct_sources)
+    roots, leaves = (distinct_targets, distinct_sources) if reverse else (distinct_sources, distinct_targets)
+
+    index = graph.index
+    # (root, leaf) -> (distance, path from root to leaf)
+    found = {}
+    searches = 0
+    for root in roots:
+        # Leaves searched from earlier as roots already know their distance
+        # to this root; a road traced backwards is just as short
+        for leaf in leaves:
+            if (leaf, root) in found and (root, leaf) not in found:
+                d, path = found[(leaf, root)]
+                found[(root, leaf)] = (d, path[::-1] if path is not None else None)
+        pending = [leaf for leaf in leaves if (root, leaf) not in found]
+        if not pending:
+            continue
+        searches += 1
+        r = index[root]
+        pending_nodes = [index[leaf] for leaf in pending]
+        dist, prev = graph.shortest_path_tree(r, targets=pending_nodes)
+        for leaf, t in zip(pending, pending_nodes):
+            d = dist[t]
+            if d == INF:
+                found[(root, leaf)] = (None, None)
+            else:
+                found[(root, leaf)] = (d, graph.path_from_tree(prev, r, t) if paths else None)
+
+    def cell(source, target):
+        if reverse:
+            d, path = found[(target, source)]
+            return d, path[::-1] if path is not None else None
+        return found[(source, target)]
+
+    table = [[cell(source, target) for target in targets] for source in sources]
+    return {
+        'distances': [[d for d, _ in row] for row in table],
+        'paths': [[path for _, path in row] for row in table] if paths else None,
+        'searches': searches
+    }
@@ -0,0 +1,110 @@
+"""Scaling benchmark for volunteer-to-region assignment.
+
+Times the min-cost matching solver over growing volunteer/region counts and
+compares it with the original backtracking search on the one-volunteer-per-
+region tiers.  That search accepts the first volunteer that clears the skill
+threshold and never revisits a skipped region, so it is fast but can leave
+regions uncovered that a matching would fill::
+
+    python -m benchmarks.bench_assignment
+"""
+import argparse
+import json
+import random
+
+from benchmarks.common import time_call
+from volunteer_assignment import MIN_SKILL_MATCH, assign_volunteers_optimal, calculate_match_score, skill_match
+
+# (volunteers, regions, capacity of every region)
+TIERS = [(20, 8, 1), (60, 16, 1), (300, 40, 1), (1000, 60, 5), (2000, 100, 10)]
+
+SKILLS = ['Medical', 'First Aid', 'Search and Rescue', 'Engineering', 'Technical',
+          'Logistics', 'Transportation', 'Communications', 'Psychology']
+LOCATIONS = ['Downtown', 'Riverside', 'Industrial', 'Suburban', 'Mountain']
+ZONES = ['Emergency Zone', 'Medical Area', 'Rescue Zone', 'Relief Center',
+         'Hospital District', 'Technical Depot', 'Engineering Yard']
+
+
+def legacy_backtrack_assignment(volunteers, regions):
+    """The original one-volunteer-per-region backtracking search"""
+    assignments = []
+    used_volunteers = set()
+
+    def can_assign(volunteer, region):
+        if volunteer['id'] in used_volunteers:
+            return False
+        return skill_match(volunteer, region) >= MIN_SKILL_MATCH
+
+    def backtrack(region_idx):
+        if region_idx >= len(regions):
+            return True
+        region = regions[region_idx]
+        for volunteer in volunteers:
+            if can_assign(volunteer, region):
+                assignments.append({
+                    'volunteer': volunteer,
+                    'region': region,
+                    'match_score': calculate_match_score(volunteer, region)
+                })
+                used_volunteers.add(volunteer['id'])
+                if backtrack(region_idx + 1):
+                    return True
+                assignments.pop()
+                used_volunteers.remove(volunteer['id'])
+        # Try to continue without assigning anyone to this region
+        return backtrack(region_idx + 1)
+
+    backtrack(0)
+    return assignments
+
+
+def make_instance(volunteers, regions, rng):
+    people = [
+        {
+            'id': i,
+            'name': f'volunteer-{i}',
+            'skills': ', '.join(rng.sample(SKILLS, rng.randint(1, 2))),
+            'location': rng.choice(LOCATIONS),
+        }
+        for i in range(volunteers)
+    ]
+    names = [f'{rng.choice(LOCATIONS)} {rng.choice(ZONES)} {r}' for r in range(regions)]
+    return people, names
+
+
+def run(seed):
+    rng = random.Random(seed)
+    results = []
+    for volunteers, regions, capacity in TIERS:
+        people, names = make_instance(volunteers, regions, rng)
+        assignments, [optimal_ms] = time_call(assign_volunteers_optimal, people, names, [capacity] * regions)
+        row = {
+            'volunteers': volunteers,
+            'regions': regions,
+            'capacity': capacity,
+            'optimal_ms': round(optimal_ms, 2),
+            'optimal_assigned': len(assignments),
+            'optimal_score': sum(a['match_score'] for a in assignments),
+        }
+        # The baseline only knows one volunteer per region
+        if capacity == 1:
+            legacy, [legacy_ms] = time_call(legacy_backtrack_assignment, people, names)
+            row.update({
+                'legacy_ms': round(legacy_ms, 2),
+                'legacy_assigned': len(legacy),
+                'legacy_score': sum(a['match_score'] for a in legacy),
+            })
+        results.append(row)
+        print(json.dumps(row))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+    run(args.seed)
+
+
+if __name__ == '__main__':
+    main()
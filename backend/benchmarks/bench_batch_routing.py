@@ -0,0 +1,60 @@
+"""Batch route tables versus one shortest-path query per pair.
+
+Builds a random grid road network and times an S x T distance table both
+ways: ``route_table`` (one early-terminating tree per source) and a
+``shortest_path`` call for every pair, as a client looping over
+``/api/shortest-route`` would::
+
+    python -m benchmarks.bench_batch_routing --grid 100 --pairs 20x20 200x200 1x500
+"""
+import argparse
+import json
+import random
+
+from batch_routing import route_table
+from benchmarks.bench_tour import grid_graph
+from benchmarks.common import time_call
+
+# Per-pair baselines above this many pairs are timed on a sample and scaled
+MAX_BASELINE_PAIRS = 2000
+
+
+def per_pair(graph, sources, targets):
+    return [[graph.shortest_path(s, t)[1] for t in targets] for s in sources]
+
+
+def run(seed, size, shapes):
+    rng = random.Random(seed)
+    graph = grid_graph(rng, size)
+    for shape in shapes:
+        s, t = map(int, shape.split('x'))
+        sources = rng.sample(graph.nodes, s)
+        targets = rng.sample(graph.nodes, t)
+        table, batch_ms = time_call(route_table, graph, sources, targets)
+
+        # The per-pair loop is slow enough to extrapolate from a prefix of rows
+        rows = max(1, min(s, MAX_BASELINE_PAIRS // t))
+        expected, pair_ms = time_call(per_pair, graph, sources[:rows], targets)
+        assert expected == table['distances'][:rows]
+        print(json.dumps({
+            'nodes': len(graph),
+            'sources': s,
+            'targets': t,
+            'searches': table['searches'],
+            'batch_ms': round(batch_ms[0], 1),
+            'per_pair_ms': round(pair_ms[0] * s / rows, 1),
+            'speedup': round(pair_ms[0] * s / rows / batch_ms[0], 1),
+        }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--grid', type=int, default=100)
+    parser.add_argument('--pairs', nargs='+', default=['20x20', '200x200', '1x500', '500x1'])
+    args = parser.parse_args()
+    run(args.seed, args.grid, args.pairs)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""Contraction hierarchy queries versus plain Dijkstra.
+
+Builds a random grid road network per size, preprocesses it into a
+hierarchy file and times random point-to-point routes both ways, checking
+that every distance agrees.  Grids are close to the worst case for
+contraction hierarchies -- no natural highway structure to exploit -- so
+real road networks shrink the search spaces further::
+
+    python -m benchmarks.bench_contraction --grid 50 100 --queries 300
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+
+from benchmarks.bench_tour import grid_graph
+from benchmarks.common import summarize, time_call
+from contraction import ContractionHierarchy, build_hierarchy, save_hierarchy
+
+
+def run(seed, sizes, queries):
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in sizes:
+            rng = random.Random(seed)
+            graph = grid_graph(rng, size)
+            path = os.path.join(tmp, f'grid{size}.ch')
+            (rank, upward), build_ms = time_call(build_hierarchy, graph)
+            save_hierarchy(path, graph, rank, upward)
+            hierarchy, load_ms = time_call(ContractionHierarchy, path)
+
+            pairs = [rng.sample(graph.nodes, 2) for _ in range(queries)]
+            ch_ms, dijkstra_ms = [], []
+            for start, end in pairs:
+                (route, distance), elapsed = time_call(hierarchy.shortest_path, start, end)
+                ch_ms += elapsed
+                (_, expected), elapsed = time_call(graph.shortest_path, start, end)
+                dijkstra_ms += elapsed
+                assert distance == expected, (start, end, distance, expected)
+                assert sum(graph.edge_weight(a, b) for a, b in zip(route, route[1:])) == expected
+
+            ch, dijkstra = summarize(ch_ms), summarize(dijkstra_ms)
+            print(json.dumps({
+                'nodes': len(graph),
+                'edges': graph.edge_count,
+                'build_s': round(build_ms[0] / 1000, 2),
+                'upward_edges': sum(len(edges) for edges in upward),
+                'file_bytes': os.path.getsize(path),
+                'load_ms': round(load_ms[0], 2),
+                'queries': queries,
+                'ch_p50_ms': ch['p50_ms'],
+                'ch_p99_ms': ch['p99_ms'],
+                'dijkstra_p50_ms': dijkstra['p50_ms'],
+                'dijkstra_p99_ms': dijkstra['p99_ms'],
+                'speedup_p50': round(dijkstra['p50_ms'] / ch['p50_ms'], 1),
+            }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--grid', type=int, nargs='+', default=[50, 100])
+    parser.add_argument('--queries', type=int, default=300)
+    args = parser.parse_args()
+    run(args.seed, args.grid, args.queries)
+
+
+if __name__ == '__main__':
+    main()
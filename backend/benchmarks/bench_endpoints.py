@@ -0,0 +1,87 @@
+"""Concurrent load benchmark for the API endpoints.
+
+Start the server first (``uvicorn main:app --port 8000``) and run::
+
+    python -m benchmarks.bench_endpoints --url http://127.0.0.1:8000
+
+Run it once against the old build and once against the new one to compare
+p50/p99 latency before and after a change.  Only the standard library is
+used so the script runs wherever the backend does.
+"""
+import argparse
+import json
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.common import summarize
+
+READ_ENDPOINTS = [
+    '/api/areas',
+    '/api/volunteers',
+    '/api/supply-items',
+    '/api/dispatch-centers',
+    '/api/dashboard/stats',
+    '/api/messages',
+]
+
+SAMPLE_MESSAGE = {
+    'message': 'URGENT: family trapped by flood water near the bridge, one injured, need rescue',
+    'source': 'SMS',
+}
+
+
+def _request(base_url, path, payload=None):
+    data = json.dumps(payload).encode() if payload is not None else None
+    req = urllib.request.Request(
+        base_url + path,
+        data=data,
+        headers={'Content-Type': 'application/json'} if data else {},
+        method='POST' if data else 'GET',
+    )
+    start = time.perf_counter()
+    with urllib.request.urlopen(req) as resp:
+        resp.read()
+    return (time.perf_counter() - start) * 1000
+
+
+def run(base_url, concurrency, requests_per_endpoint, write_ratio):
+    jobs = []
+    for path in READ_ENDPOINTS:
+        jobs.extend((path, None) for _ in range(requests_per_endpoint))
+    writes = int(len(jobs) * write_ratio)
+    jobs.extend(('/api/analyze-message', SAMPLE_MESSAGE) for _ in range(writes))
+    # Interleave reads and writes so they contend with each other
+    jobs = jobs[::2] + jobs[1::2]
+
+    latencies = {}
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = [(path, pool.submit(_request, base_url, path, payload)) for path, payload in jobs]
+        for path, future in futures:
+            latencies.setdefault(path, []).append(future.result())
+    elapsed = time.perf_counter() - start
+
+    all_latencies = [ms for samples in latencies.values() for ms in samples]
+    return {
+        'concurrency': concurrency,
+        'requests': len(jobs),
+        'throughput_rps': round(len(jobs) / elapsed, 1),
+        'overall': summarize(all_latencies),
+        'endpoints': {path: summarize(samples) for path, samples in sorted(latencies.items())},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', default='http://127.0.0.1:8000')
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--requests', type=int, default=200, help='requests per read endpoint')
+    parser.add_argument('--write-ratio', type=float, default=0.2,
+                        help='analyze-message POSTs as a fraction of read requests')
+    args = parser.parse_args()
+    print(json.dumps(run(args.url, args.concurrency, args.requests, args.write_ratio), indent=2))
+
+
+if __name__ == '__main__':
+    main()
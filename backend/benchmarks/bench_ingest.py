@@ -0,0 +1,107 @@
+"""Message ingestion throughput benchmark.
+
+Start the server first (``uvicorn main:app --port 8000``) and run::
+
+    python -m benchmarks.bench_ingest --url http://127.0.0.1:8000
+
+Sends the same synthetic messages one POST at a time, through the batch
+endpoint and through the NDJSON stream, and reports messages per second.
+"""
+import argparse
+import json
+import random
+import socket
+import threading
+import time
+import urllib.parse
+import urllib.request
+
+WORDS = [
+    'water', 'road', 'bridge', 'school', 'roof', 'family', 'children', 'need',
+    'please', 'send', 'near', 'the', 'river', 'street', 'north', 'power',
+    'urgent', 'help', 'trapped', 'injured', 'flood', 'fire', 'rescue', 'medical',
+]
+SOURCES = ['SMS', 'Twitter', 'Hotline', 'Facebook']
+
+
+def make_messages(count, seed):
+    rng = random.Random(seed)
+    return [
+        {'message': ' '.join(rng.choice(WORDS) for _ in range(rng.randint(8, 30))),
+         'source': rng.choice(SOURCES)}
+        for _ in range(count)
+    ]
+
+
+def _post(url, payload):
+    req = urllib.request.Request(url, data=json.dumps(payload).encode(),
+                                 headers={'Content-Type': 'application/json'}, method='POST')
+    with urllib.request.urlopen(req) as resp:
+        return resp.read()
+
+
+def run_single(base_url, messages):
+    for message in messages:
+        _post(base_url + '/api/analyze-message', message)
+
+
+def run_batch(base_url, messages, batch_size):
+    for start in range(0, len(messages), batch_size):
+        _post(base_url + '/api/analyze-messages', {'messages': messages[start:start + batch_size]})
+
+
+def run_stream(base_url, messages):
+    """Chunked NDJSON upload while a second thread drains the results"""
+    url = urllib.parse.urlsplit(base_url)
+    sock = socket.create_connection((url.hostname, url.port or 80))
+    head = (f'POST /api/analyze-messages/stream HTTP/1.1\r\nHost: {url.hostname}\r\n'
+            'Content-Type: application/x-ndjson\r\nTransfer-Encoding: chunked\r\n'
+            'Connection: close\r\n\r\n')
+
+    def send_body():
+        sock.sendall(head.encode())
+        for start in range(0, len(messages), 200):
+            data = ''.join(json.dumps(m) + '\n' for m in messages[start:start + 200]).encode()
+            sock.sendall(f'{len(data):x}\r\n'.encode() + data + b'\r\n')
+        sock.sendall(b'0\r\n\r\n')
+
+    sender = threading.Thread(target=send_body)
+    sender.start()
+    results = 0
+    while True:
+        data = sock.recv(65536)
+        if not data:
+            break
+        results += data.count(b'}\n')
+    sender.join()
+    sock.close()
+    return results
+
+
+def measure(fn, *args):
+    start = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', default='http://127.0.0.1:8000')
+    parser.add_argument('--messages', type=int, default=20000)
+    parser.add_argument('--single', type=int, default=1000, help='messages sent one POST at a time')
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=11)
+    args = parser.parse_args()
+
+    messages = make_messages(args.messages, args.seed)
+    single = messages[:args.single]
+    results = {
+        'single_msgs_per_s': round(len(single) / measure(run_single, args.url, single), 1),
+        'batch_msgs_per_s': round(len(messages) / measure(run_batch, args.url, messages, args.batch_size), 1),
+        'stream_msgs_per_s': round(len(messages) / measure(run_stream, args.url, messages), 1),
+    }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""Scaling benchmark for the supply packing engine.
+
+Times exact and greedy bounded knapsack over a grid of item counts and
+capacities, and the original list-of-lists 0/1 DP on the tiers it can
+finish::
+
+    python -m benchmarks.bench_knapsack
+"""
+import argparse
+import json
+import random
+
+from benchmarks.common import time_call
+from knapsack import EXACT_CELL_LIMIT, _split_quantity, pack_supplies
+
+ITEM_COUNTS = [10, 100, 1000, 10000]
+CAPACITIES = [100, 1000, 10000, 100000]
+
+# Cells (items x capacity) the pure-Python baseline is allowed to fill
+LEGACY_CELL_LIMIT = 2_000_000
+
+
+def legacy_knapsack_01(items, capacity):
+    """The original pure-Python (n+1) x (capacity+1) table DP"""
+    n = len(items)
+    dp = [[0 for _ in range(capacity + 1)] for _ in range(n + 1)]
+    for i in range(1, n + 1):
+        for w in range(1, capacity + 1):
+            weight = items[i-1]['weight']
+            utility = items[i-1]['utility']
+            if weight <= w:
+                dp[i][w] = max(dp[i-1][w], dp[i-1][w-weight] + utility)
+            else:
+                dp[i][w] = dp[i-1][w]
+    return dp[n][capacity]
+
+
+def make_items(count, rng):
+    return [
+        {
+            'id': i,
+            'item_name': f'item-{i}',
+            'weight': rng.randint(1, 50),
+            'utility': rng.randint(1, 10),
+            'quantity': rng.choice([1, 5, 20, 100, 200]),
+        }
+        for i in range(count)
+    ]
+
+
+def run(seed):
+    rng = random.Random(seed)
+    results = []
+    for count in ITEM_COUNTS:
+        items = make_items(count, rng)
+        pieces = sum(len(_split_quantity(item['quantity'])) for item in items)
+        for capacity in CAPACITIES:
+            row = {'items': count, 'pieces': pieces, 'capacity': capacity}
+            (_, greedy_utility, _), [greedy_ms] = time_call(pack_supplies, items, capacity, 'greedy')
+            row.update({'greedy_ms': round(greedy_ms, 2), 'greedy_utility': greedy_utility})
+            # Exact mode refuses tables past EXACT_CELL_LIMIT (auto goes greedy)
+            if pieces * (capacity + 1) <= EXACT_CELL_LIMIT:
+                (_, exact_utility, _), [exact_ms] = time_call(pack_supplies, items, capacity, 'exact')
+                row.update({
+                    'exact_ms': round(exact_ms, 2),
+                    'exact_utility': exact_utility,
+                    'bitset_bytes': pieces * (capacity + 1) // 8,
+                    'greedy_ratio': round(greedy_utility / exact_utility, 4) if exact_utility else 1.0,
+                })
+            if count * capacity <= LEGACY_CELL_LIMIT:
+                single = [dict(item, quantity=1) for item in items]
+                _, [legacy_ms] = time_call(legacy_knapsack_01, single, capacity)
+                _, [unit_ms] = time_call(pack_supplies, single, capacity, 'exact')
+                row.update({'legacy_01_ms': round(legacy_ms, 2), 'vectorized_01_ms': round(unit_ms, 2)})
+            results.append(row)
+            print(json.dumps(row))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+    run(args.seed)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+"""Query latency of the dispatch center spatial index.
+
+Builds the KD-tree over growing numbers of random centers and times
+k-nearest and within-radius queries against a full vectorized haversine
+scan, which is what answering them without an index costs::
+
+    python -m benchmarks.bench_spatial
+"""
+import argparse
+import json
+import random
+
+from benchmarks.common import summarize, time_call
+from spatial_index import SpatialIndex, haversine_km_array
+
+SIZES = [1000, 10000, 50000, 200000]
+
+
+def random_centers(rng, n):
+    # Half spread over a continent, half packed into a metro area
+    latitudes, longitudes = [], []
+    for i in range(n):
+        if i % 2:
+            latitudes.append(rng.uniform(25, 50))
+            longitudes.append(rng.uniform(-125, -65))
+        else:
+            latitudes.append(rng.gauss(40.7, 0.2))
+            longitudes.append(rng.gauss(-74.0, 0.2))
+    return latitudes, longitudes
+
+
+def run(seed, queries, k, radius_km):
+    rng = random.Random(seed)
+    for n in SIZES:
+        latitudes, longitudes = random_centers(rng, n)
+        index, build = time_call(SpatialIndex, range(n), latitudes, longitudes)
+        points = [(rng.gauss(40.7, 0.5), rng.gauss(-74.0, 0.5)) for _ in range(queries)]
+
+        nearest, within, scan = [], [], []
+        for lat, lon in points:
+            nearest += time_call(index.nearest, lat, lon, k)[1]
+            within += time_call(index.within, lat, lon, radius_km)[1]
+            scan += time_call(haversine_km_array, lat, lon, index.latitudes, index.longitudes)[1]
+
+        print(json.dumps({
+            'centers': n,
+            'build_ms': round(build[0], 1),
+            'nearest': summarize(nearest),
+            'within': summarize(within),
+            'full_scan': summarize(scan),
+        }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--queries', type=int, default=500)
+    parser.add_argument('--k', type=int, default=5)
+    parser.add_argument('--radius-km', type=float, default=2.0)
+    args = parser.parse_args()
+    run(args.seed, args.queries, args.k, args.radius_km)
+
+
+if __name__ == '__main__':
+    main()
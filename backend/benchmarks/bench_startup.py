@@ -0,0 +1,98 @@
+"""Cold-start benchmark: process launch to first answered request.
+
+Starts ``uvicorn main:app`` from the backend directory over and over and
+polls until the first response arrives, against a database that has never
+been migrated and against one that is already current.  Also reports the
+bare ``import main`` time::
+
+    python -m benchmarks.bench_startup --runs 5
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+from benchmarks.common import free_port, summarize
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def time_import(db_path):
+    """Milliseconds for ``import main`` in a fresh interpreter"""
+    code = 'import time; t = time.perf_counter(); import main; print((time.perf_counter() - t) * 1000)'
+    out = subprocess.run(
+        [sys.executable, '-c', code], cwd=BACKEND_DIR, capture_output=True, text=True, check=True,
+        env=dict(os.environ, OPTIRELIEF_DB=db_path)
+    )
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def time_first_response(db_path, path, timeout=60):
+    """Milliseconds from launching uvicorn until ``path`` answers 200"""
+    port = free_port()
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'main:app', '--port', str(port), '--log-level', 'warning'],
+        cwd=BACKEND_DIR, env=dict(os.environ, OPTIRELIEF_DB=db_path),
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        while time.perf_counter() - start < timeout:
+            try:
+                with urllib.request.urlopen(f'http://127.0.0.1:{port}{path}', timeout=5) as response:
+                    if response.status == 200:
+                        return (time.perf_counter() - start) * 1000
+            except (urllib.error.URLError, ConnectionError):
+                time.sleep(0.005)
+        raise RuntimeError(f'server did not answer {path} within {timeout}s')
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def run(runs, path, source_db):
+    results = {}
+    with tempfile.TemporaryDirectory() as scratch:
+        db_path = os.path.join(scratch, 'optirelief.db')
+
+        def reset():
+            for suffix in ('', '-wal', '-shm'):
+                if os.path.exists(db_path + suffix):
+                    os.remove(db_path + suffix)
+            if source_db:
+                shutil.copyfile(source_db, db_path)
+
+        for label in ('unmigrated', 'migrated'):
+            ready = []
+            imports = []
+            for _ in range(runs):
+                # Every unmigrated measurement starts from the same database;
+                # the migrated ones reuse whatever the previous boot left
+                if label == 'unmigrated':
+                    reset()
+                imports.append(time_import(db_path))
+                if label == 'unmigrated':
+                    reset()
+                ready.append(time_first_response(db_path, path))
+            results[label] = {'import_main': summarize(imports), 'first_response': summarize(ready)}
+            print(json.dumps({'database': label, 'path': path, **results[label]}))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--path', default='/api/dashboard/stats')
+    parser.add_argument('--source-db', help='database to start each unmigrated run from (default: empty)')
+    args = parser.parse_args()
+    run(args.runs, args.path, args.source_db)
+
+
+if __name__ == '__main__':
+    main()
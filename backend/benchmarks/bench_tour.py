@@ -0,0 +1,58 @@
+"""Delivery tour planning on random grid road networks.
+
+Reports how long the stop-to-stop distance matrix and the 2-opt/Or-opt
+improvement take, and how much shorter the improved tour is than the
+nearest-neighbour tour it starts from::
+
+    python -m benchmarks.bench_tour --grid 60 --stops 100 500 1000
+"""
+import argparse
+import json
+import random
+
+from road_graph import RoadGraph
+from tour_planner import plan_tour
+
+
+def grid_graph(rng, size):
+    """``size`` x ``size`` street grid with random block lengths"""
+    edges = []
+    for x in range(size):
+        for y in range(size):
+            if x + 1 < size:
+                edges.append((f'{x}_{y}', f'{x + 1}_{y}', rng.randint(1, 20)))
+            if y + 1 < size:
+                edges.append((f'{x}_{y}', f'{x}_{y + 1}', rng.randint(1, 20)))
+    return RoadGraph(edges)
+
+
+def run(seed, size, stop_counts, time_budget_ms):
+    rng = random.Random(seed)
+    graph = grid_graph(rng, size)
+    for count in stop_counts:
+        depot, *stops = rng.sample(graph.nodes, count + 1)
+        tour = plan_tour(graph, depot, stops, time_budget_ms=time_budget_ms)
+        print(json.dumps({
+            'nodes': len(graph),
+            'stops': count,
+            'matrix_ms': tour['matrix_time_ms'],
+            'solve_ms': tour['solve_time_ms'],
+            'converged': tour['converged'],
+            'nearest_neighbour': tour['initial_distance'],
+            'improved': tour['total_distance'],
+            'saving_pct': round(100 * (1 - tour['total_distance'] / tour['initial_distance']), 1),
+        }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--grid', type=int, default=60)
+    parser.add_argument('--stops', type=int, nargs='+', default=[100, 500, 1000])
+    parser.add_argument('--time-budget-ms', type=float, default=5000)
+    args = parser.parse_args()
+    run(args.seed, args.grid, args.stops, args.time_budget_ms)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,40 @@
+"""Shared helpers for the benchmark scripts"""
+import socket
+import time
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of an unsorted list of samples"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[rank]
+
+
+def summarize(latencies_ms):
+    """p50/p99/mean summary of a list of latencies in milliseconds"""
+    return {
+        'count': len(latencies_ms),
+        'p50_ms': round(percentile(latencies_ms, 50), 3),
+        'p99_ms': round(percentile(latencies_ms, 99), 3),
+        'mean_ms': round(sum(latencies_ms) / len(latencies_ms), 3) if latencies_ms else 0.0,
+    }
+
+
+def time_call(fn, *args, repeat=1, **kwargs):
+    """Run ``fn`` ``repeat`` times and return (last result, latencies in ms)"""
+    latencies = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(*args, **kwargs)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return result, latencies
+
+
+def free_port():
+    """An unused local TCP port for a throwaway server"""
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
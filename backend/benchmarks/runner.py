@@ -0,0 +1,331 @@
+"""Benchmark suite: algorithms and endpoints across data-size tiers.
+
+For every tier a seeded synthetic database is generated (see
+``benchmarks.synthetic``), the algorithms are timed in-process on data
+loaded from it and the read endpoints are timed against a uvicorn server
+started on it.  Results are written as JSON tagged with the git commit, and
+two result files can be compared to spot regressions::
+
+    python -m benchmarks.runner --tiers small medium --output before.json
+    python -m benchmarks.runner --tiers small medium --output after.json
+    python -m benchmarks.runner --compare before.json after.json
+
+Generated databases are kept in ``--data-dir`` when one is given and reused
+by later runs with the same tier and seed.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+from benchmarks import synthetic
+from benchmarks.common import free_port, summarize, time_call
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Fixed-size work per tier where the full input would be impractical
+SHORTEST_PATH_PAIRS = 20
+DISPATCH_CENTERS = 20
+TOUR_STOPS = 100
+SPATIAL_QUERIES = 200
+SEARCH_MESSAGES = 20_000
+SEARCH_QUERIES = ['trapped', 'water', 'hospital', 'generator', 'bridge damaged']
+ASSIGNMENT_REGION_KINDS = ['Emergency Zone', 'Medical Area', 'Rescue Zone', 'Relief Center', 'Technical Depot']
+
+# Comparisons flag a case whose p50 grew by more than this factor
+REGRESSION_THRESHOLD = 1.25
+
+
+def load_main(scratch_dir):
+    """Import ``main`` for the algorithms that live there.
+
+    Importing it migrates ``OPTIRELIEF_DB``, so that is pointed at a scratch
+    file rather than whatever database the environment names.
+    """
+    os.environ['OPTIRELIEF_DB'] = os.path.join(scratch_dir, 'import.db')
+    import main
+    return main
+
+
+def git_commit():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BACKEND_DIR,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=BACKEND_DIR,
+                               capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return commit + ('-dirty' if dirty else '')
+
+
+def tier_database(data_dir, tier, seed, log):
+    path = os.path.join(data_dir, f'synthetic-{tier}-seed{seed}.db')
+    if not os.path.exists(path):
+        log(f'[{tier}] generating {path}')
+        synthetic.populate(path, tier, seed, log=lambda line: log(f'[{tier}]   {line}'))
+    return path
+
+
+def _result(tier, kind, name, size, latencies, **extra):
+    return {'tier': tier, 'kind': kind, 'name': name, 'size': size, **summarize(latencies), **extra}
+
+
+def algorithm_results(main, tier, db_path, seed):
+    """Time each algorithm on the tier's data"""
+    from area_scoring import top_k, urgency_scores
+    from keyword_scanner import DEFAULT_KEYWORDS, DEFAULT_WEIGHT, KeywordScanner
+    from batch_routing import route_table
+    from knapsack import knapsack_01, pack_supplies
+    from message_search import fts_query, search_messages
+    from road_graph import RoadGraph, center_coordinates
+    from spatial_index import SpatialIndex
+    from tour_planner import plan_tour
+    from volunteer_assignment import assign_volunteers_optimal
+    import numpy as np
+
+    rng = random.Random(f'{seed}:runner')
+    conn = sqlite3.connect(db_path)
+    try:
+        areas = [dict(zip(('name', 'severity', 'population', 'delay_time'), row)) for row in
+                 conn.execute('SELECT name, severity, population, delay_time FROM affected_areas')]
+        items = [dict(zip(('id', 'item_name', 'weight', 'utility', 'quantity'), row)) for row in
+                 conn.execute('SELECT id, item_name, weight, utility, quantity FROM supply_items')]
+        volunteers = [dict(zip(('id', 'name', 'skills', 'location'), row)) for row in
+                      conn.execute("SELECT id, name, skills, location FROM volunteers WHERE status = 'available'")]
+        edges = conn.execute('SELECT from_loc, to_loc, distance FROM location_graph').fetchall()
+        centers = conn.execute('SELECT id, latitude, longitude FROM dispatch_centers').fetchall()
+        messages = [row[0] for row in conn.execute('SELECT message FROM requests LIMIT ?', (SEARCH_MESSAGES,))]
+        message_count = conn.execute('SELECT COUNT(*) FROM requests').fetchone()[0]
+
+        results = []
+
+        def record(name, size, latencies):
+            results.append(_result(tier, 'algorithm', name, size, latencies))
+
+        severity, population, delay = (np.array(column) for column in
+                                       zip(*[(a['severity'], a['population'], a['delay_time']) for a in areas]))
+        ids = np.arange(len(areas))
+
+        def rank_areas():
+            return top_k(urgency_scores(severity, population, delay), ids, 10)
+        record('urgency_top_k', len(areas), time_call(rank_areas, repeat=3)[1])
+
+        single_items = [dict(item, quantity=1) for item in items]
+        record('knapsack_01', len(items), time_call(knapsack_01, single_items, 1000, repeat=3)[1])
+        record('pack_supplies', len(items), time_call(pack_supplies, items, 1000, repeat=3)[1])
+
+        graph, build = time_call(RoadGraph, edges, center_coordinates(centers))
+        record('road_graph_build', len(edges), build)
+
+        # Route between nodes of the synthetic network's main component (the
+        # migration's sample roads are a separate island)
+        dist, _ = graph.shortest_path_tree(max(range(len(graph)), key=lambda i: graph.indptr[i + 1] - graph.indptr[i]))
+        connected = [graph.nodes[i] for i, d in enumerate(dist) if d != float('inf')]
+
+        latencies = []
+        for _ in range(SHORTEST_PATH_PAIRS):
+            start, end = rng.sample(connected, 2)
+            latencies += time_call(main.dijkstra_shortest_path, graph, start, end)[1]
+        record('dijkstra_shortest_path', len(graph), latencies)
+
+        # Center-to-center routes for a multi-dispatch of random nodes
+        dispatch = rng.sample(connected, min(DISPATCH_CENTERS, len(connected)))
+        record('dispatch_route_table', len(dispatch),
+               time_call(route_table, graph, dispatch, dispatch, paths=True)[1])
+
+        # One region per 50 volunteers, each taking up to 10
+        region_count = max(len(ASSIGNMENT_REGION_KINDS), len(volunteers) // 50)
+        regions = [f'{rng.choice(synthetic.LOCATIONS)} {ASSIGNMENT_REGION_KINDS[i % len(ASSIGNMENT_REGION_KINDS)]}'
+                   for i in range(region_count)]
+        record('assign_volunteers_optimal', len(volunteers),
+               time_call(assign_volunteers_optimal, volunteers, regions, [10] * len(regions))[1])
+
+        scanner = KeywordScanner([(keyword, DEFAULT_WEIGHT) for keyword in DEFAULT_KEYWORDS])
+
+        def scan_messages():
+            return sum(scanner.score(message)[1] for message in messages)
+        record('keyword_score', sum(map(len, messages)), time_call(scan_messages, repeat=3)[1])
+
+        stops = rng.sample(connected, min(TOUR_STOPS + 1, len(connected)))
+        record('plan_tour', len(stops) - 1, time_call(plan_tour, graph, stops[0], stops[1:])[1])
+
+        index, build = time_call(SpatialIndex, [row[0] for row in centers],
+                                 [row[1] for row in centers], [row[2] for row in centers])
+        record('spatial_index_build', len(centers), build)
+        latencies = []
+        for _ in range(SPATIAL_QUERIES):
+            lat = synthetic.ORIGIN[0] + rng.random() * synthetic.SPAN_DEGREES
+            lon = synthetic.ORIGIN[1] + rng.random() * synthetic.SPAN_DEGREES
+            latencies += time_call(index.nearest, lat, lon, 5)[1]
+        record('spatial_nearest', len(centers), latencies)
+
+        latencies = []
+        for query in SEARCH_QUERIES:
+            latencies += time_call(search_messages, conn, fts_query(query), 20, 0)[1]
+        record('search_messages', message_count, latencies)
+        return results
+    finally:
+        conn.close()
+
+
+@contextmanager
+def serve(db_path, timeout=120):
+    """A uvicorn server on ``db_path``; yields its base URL once it answers"""
+    port = free_port()
+    base_url = f'http://127.0.0.1:{port}'
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'main:app', '--port', str(port), '--log-level', 'warning'],
+        cwd=BACKEND_DIR, env=dict(os.environ, OPTIRELIEF_DB=db_path),
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                with urllib.request.urlopen(base_url + '/', timeout=5):
+                    break
+            except (urllib.error.URLError, ConnectionError):
+                if time.monotonic() > deadline or server.poll() is not None:
+                    raise RuntimeError(f'server on {db_path} did not start')
+                time.sleep(0.05)
+        yield base_url
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def endpoint_cases(db_path, seed):
+    """``(name, path, json body or None)`` for the endpoints worth timing"""
+    rng = random.Random(f'{seed}:endpoints')
+    conn = sqlite3.connect(db_path)
+    try:
+        nodes = [row[0] for row in conn.execute('SELECT from_loc FROM location_graph ORDER BY rowid DESC LIMIT 1000')]
+        start, end = rng.sample(nodes, 2)
+    finally:
+        conn.close()
+    lat = synthetic.ORIGIN[0] + synthetic.SPAN_DEGREES / 2
+    lon = synthetic.ORIGIN[1] + synthetic.SPAN_DEGREES / 2
+    return [
+        ('GET /api/dashboard/stats', '/api/dashboard/stats', None),
+        ('GET /api/areas', '/api/areas', None),
+        ('GET /api/areas/top', '/api/areas/top?k=20', None),
+        ('GET /api/volunteers', '/api/volunteers', None),
+        ('GET /api/messages', '/api/messages?limit=100', None),
+        ('GET /api/messages?urgency_level', '/api/messages?limit=100&urgency_level=Critical', None),
+        ('GET /api/messages/search', '/api/messages/search?q=trapped', None),
+        ('GET /api/shortest-route', '/api/shortest-route?' + urllib.parse.urlencode({'start': start, 'end': end}), None),
+        ('GET /api/dispatch-centers/nearest', f'/api/dispatch-centers/nearest?lat={lat}&lon={lon}&k=5', None),
+        ('POST /api/sort-priority', '/api/sort-priority?limit=100', {}),
+        ('POST /api/assign-volunteers', '/api/assign-volunteers', {}),
+    ]
+
+
+def _fetch(url, body):
+    data = json.dumps(body).encode() if body is not None else None
+    request = urllib.request.Request(url, data=data, headers={'Content-Type': 'application/json'} if data else {},
+                                     method='POST' if data is not None else 'GET')
+    start = time.perf_counter()
+    with urllib.request.urlopen(request, timeout=600) as response:
+        response.read()
+    return (time.perf_counter() - start) * 1000
+
+
+def endpoint_results(tier, db_path, seed, requests):
+    results = []
+    with serve(db_path) as base_url:
+        for name, path, body in endpoint_cases(db_path, seed):
+            # The first call pays for cold caches; report it separately
+            cold = _fetch(base_url + path, body)
+            latencies = [_fetch(base_url + path, body) for _ in range(requests)]
+            results.append(_result(tier, 'endpoint', name, None, latencies, cold_ms=round(cold, 3)))
+    return results
+
+
+def run(tiers, seed, data_dir, requests, endpoints=True, log=print):
+    with tempfile.TemporaryDirectory() as scratch:
+        main = load_main(scratch)
+        data_dir = data_dir or scratch
+        os.makedirs(data_dir, exist_ok=True)
+        report = {
+            'commit': git_commit(),
+            'created_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'seed': seed,
+            'tiers': {tier: synthetic.sizes_for(tier) for tier in tiers},
+            'results': [],
+        }
+        for tier in tiers:
+            db_path = tier_database(data_dir, tier, seed, log)
+            log(f'[{tier}] algorithms')
+            report['results'] += algorithm_results(main, tier, db_path, seed)
+            if endpoints:
+                log(f'[{tier}] endpoints')
+                report['results'] += endpoint_results(tier, db_path, seed, requests)
+        return report
+
+
+def compare(before, after, threshold=REGRESSION_THRESHOLD):
+    """Lines comparing p50 latency per case; returns ``(lines, regressions)``"""
+    old = {(r['tier'], r['kind'], r['name']): r for r in before['results']}
+    lines = [f"before {before.get('commit')}  after {after.get('commit')}",
+             f"{'tier':8} {'kind':10} {'name':36} {'p50 before':>11} {'p50 after':>11} {'ratio':>7}"]
+    regressions = 0
+    for r in after['results']:
+        previous = old.get((r['tier'], r['kind'], r['name']))
+        if previous is None:
+            continue
+        ratio = r['p50_ms'] / previous['p50_ms'] if previous['p50_ms'] else float('inf')
+        flag = ''
+        if ratio > threshold:
+            flag = '  REGRESSION'
+            regressions += 1
+        lines.append(f"{r['tier']:8} {r['kind']:10} {r['name']:36} {previous['p50_ms']:11.3f} {r['p50_ms']:11.3f} "
+                     f"{ratio:7.2f}{flag}")
+    return lines, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--tiers', nargs='+', default=['small', 'medium'], choices=list(synthetic.SCALES))
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--data-dir', help='keep generated databases here and reuse them')
+    parser.add_argument('--requests', type=int, default=20, help='timed requests per endpoint')
+    parser.add_argument('--skip-endpoints', action='store_true')
+    parser.add_argument('--output', help='write results JSON here (default: stdout)')
+    parser.add_argument('--compare', nargs=2, metavar=('BEFORE', 'AFTER'), help='compare two result files')
+    parser.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD)
+    args = parser.parse_args()
+
+    if args.compare:
+        with open(args.compare[0]) as f:
+            before = json.load(f)
+        with open(args.compare[1]) as f:
+            after = json.load(f)
+        lines, regressions = compare(before, after, args.threshold)
+        print('\n'.join(lines))
+        sys.exit(1 if regressions else 0)
+
+    log = lambda line: print(line, file=sys.stderr, flush=True)
+    report = run(args.tiers, args.seed, args.data_dir, args.requests, not args.skip_endpoints, log)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+
+if __name__ == '__main__':
+    main()
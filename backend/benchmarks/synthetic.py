@@ -0,0 +1,271 @@
+"""Seeded synthetic disaster-scale data for the OptiRelief schema.
+
+Fills a fresh (or existing) SQLite database with affected areas,
+volunteers, supply items, a road network with dispatch centers on it, and
+scored distress messages.  Every table draws from its own generator seeded
+with ``(seed, table)``, so the same seed and scale always produce the same
+rows and changing one table's size leaves the others untouched::
+
+    python -m benchmarks.synthetic --db /tmp/optirelief-full.db --scale full
+
+``--scale`` is a preset name from ``SCALES`` or a fraction of ``FULL_SIZES``.
+"""
+import argparse
+import json
+import math
+import os
+import random
+import sqlite3
+import time
+from datetime import datetime, timedelta
+
+import dashboard
+from area_scoring import urgency_scores
+from keyword_scanner import DEFAULT_KEYWORDS, DEFAULT_WEIGHT, KeywordScanner, urgency_level_for
+from migrations import migrate
+from road_graph import haversine_km
+
+# Row counts at scale 1.0; the road graph is sized by its edge count
+FULL_SIZES = {
+    'areas': 100_000,
+    'volunteers': 10_000,
+    'supply_items': 2_000,
+    'road_edges': 100_000,
+    'dispatch_centers': 10_000,
+    'messages': 1_000_000,
+}
+
+SCALES = {'small': 0.01, 'medium': 0.1, 'full': 1.0}
+
+# Road network bounding box (greater New York, like the seed centers)
+ORIGIN = (40.45, -74.30)
+SPAN_DEGREES = 0.6
+# Road distance units per kilometre
+UNITS_PER_KM = 10
+
+MESSAGE_DAYS = 14
+INSERT_BATCH = 10_000
+
+SOURCES = ['SMS', 'Twitter', 'Hotline', 'Facebook', 'Radio', 'Field Report']
+SOURCE_WEIGHTS = [40, 25, 15, 10, 5, 5]
+AREA_KINDS = ['District', 'Community', 'Zone', 'Village', 'Heights', 'Park', 'Harbor', 'Valley']
+AREA_WORDS = ['North', 'South', 'East', 'West', 'River', 'Hill', 'Lake', 'Mill', 'Oak', 'Cedar',
+              'Bridge', 'Station', 'Old Town', 'Market', 'Airport', 'Industrial', 'Mountain', 'Bay']
+FIRST_NAMES = ['Alice', 'Bob', 'Carol', 'David', 'Eve', 'Frank', 'Grace', 'Hassan', 'Ines', 'Jun',
+               'Kofi', 'Lena', 'Mateo', 'Nadia', 'Omar', 'Priya', 'Quinn', 'Rosa', 'Sven', 'Tariq']
+LAST_NAMES = ['Johnson', 'Smith', 'Davis', 'Wilson', 'Brown', 'Miller', 'Garcia', 'Khan', 'Nguyen',
+              'Okafor', 'Rossi', 'Sato', 'Silva', 'Weber', 'Yilmaz', 'Cohen', 'Novak', 'Haddad']
+SKILLS = ['Medical', 'First Aid', 'Search and Rescue', 'Engineering', 'Technical', 'Logistics',
+          'Transportation', 'Communications', 'Psychology', 'Cooking', 'Translation']
+LOCATIONS = ['Downtown', 'Riverside', 'Industrial', 'Suburban', 'Mountain', 'Harbor', 'Airport', 'Valley']
+SUPPLIES = ['Water Bottles', 'Medical Kit', 'Blankets', 'Food Rations', 'Flashlights', 'Radio Equipment',
+            'Tents', 'Batteries', 'Generators', 'Hygiene Kit', 'Baby Formula', 'Tarpaulins', 'Fuel Cans']
+CENTER_KINDS = ['Emergency Response Center', 'Relief Distribution Hub', 'Medical Support Base',
+                'Logistics Center', 'Command Post', 'Shelter']
+
+MESSAGE_OPENERS = ['', '', 'URGENT: ', 'Please help, ', 'SOS ', 'Emergency! ', 'Update: ', 'Hi, ']
+MESSAGE_NEEDS = [
+    'family trapped on the roof by flood water', 'two people injured after the building collapse',
+    'need drinking water and food for {n} people', 'elderly man needs medical attention and medicine',
+    'road blocked by fallen trees, trucks cannot pass', 'fire spreading near the school',
+    'shelter is full, {n} families need tents and blankets', 'power out for two days, need a generator',
+    'need transport to the hospital for a pregnant woman', 'children missing since the river rose',
+    'severe bleeding, ambulance required immediately', 'bridge damaged, danger for cars',
+    'we are safe but need baby formula and diapers', 'gas leak reported in the basement',
+    'critical patient on oxygen, batteries running out', 'rescue boat needed, water still rising',
+]
+MESSAGE_CLOSERS = ['', '', '', 'Please send help.', 'Send help immediately!', 'Critical situation, severe danger.',
+                   'Urgent rescue needed, people injured and trapped.', 'Thank you.']
+MESSAGE_PLACES = ['near {area}', 'at {area}', 'behind the market in {area}', 'on Main Street, {area}',
+                  'close to the church in {area}', '']
+
+
+def sizes_for(scale):
+    """Row counts for a preset name or a numeric fraction of full scale"""
+    factor = SCALES[scale] if scale in SCALES else float(scale)
+    return {table: max(1, int(count * factor)) for table, count in FULL_SIZES.items()}
+
+
+def _rng(seed, table):
+    return random.Random(f'{seed}:{table}')
+
+
+def _batches(rows, size=INSERT_BATCH):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _insert(conn, sql, rows):
+    count = 0
+    for batch in _batches(rows):
+        conn.executemany(sql, batch)
+        count += len(batch)
+    return count
+
+
+def area_names(seed, count):
+    """Names of the generated areas, in id order"""
+    rng = _rng(seed, 'areas')
+    return [f'{rng.choice(AREA_WORDS)} {rng.choice(AREA_KINDS)} {i + 1}' for i in range(count)]
+
+
+def generate_areas(seed, count):
+    rng = _rng(seed, 'area_stats')
+    names = area_names(seed, count)
+    severity = [min(10, max(1, round(rng.gauss(5.5, 2.2)))) for _ in range(count)]
+    # Populations are heavy-tailed: many hamlets, a few dense districts
+    population = [min(2_000_000, int(rng.lognormvariate(9, 1.3))) for _ in range(count)]
+    delay = [int(rng.expovariate(1 / 6)) for _ in range(count)]
+    scores = urgency_scores(severity, population, delay)
+    return [(names[i], severity[i], population[i], delay[i], float(scores[i])) for i in range(count)]
+
+
+def generate_volunteers(seed, count):
+    rng = _rng(seed, 'volunteers')
+    rows = []
+    for _ in range(count):
+        skills = ', '.join(rng.sample(SKILLS, rng.randint(1, 3)))
+        status = rng.choices(['available', 'assigned', 'unavailable'], [70, 20, 10])[0]
+        assigned_to = f'{rng.choice(LOCATIONS)} Relief Site' if status == 'assigned' else None
+        rows.append((f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}', skills,
+                     rng.choice(LOCATIONS), status, assigned_to))
+    return rows
+
+
+def generate_supplies(seed, count):
+    rng = _rng(seed, 'supply_items')
+    return [
+        (f'{rng.choice(SUPPLIES)} #{i + 1}', rng.randint(1, 25), rng.randint(1, 10), rng.choice([1, 5, 20, 50, 100, 200]))
+        for i in range(count)
+    ]
+
+
+def generate_road_network(seed, edge_count):
+    """``(edges, coordinates)`` of a jittered street grid with about ``edge_count`` roads.
+
+    A w x w grid has 2w(w-1) streets; a few are closed and a few diagonal
+    shortcuts added.  Distances are road units proportional to the
+    great-circle length.  Node ids are ``N<row>_<col>``.
+    """
+    rng = _rng(seed, 'road_network')
+    width = max(2, math.ceil((1 + math.sqrt(1 + 2 * edge_count)) / 2))
+    step = SPAN_DEGREES / width
+    coordinates = {}
+    for r in range(width):
+        for c in range(width):
+            coordinates[f'N{r}_{c}'] = (ORIGIN[0] + (r + rng.uniform(-0.3, 0.3)) * step,
+                                        ORIGIN[1] + (c + rng.uniform(-0.3, 0.3)) * step)
+
+    def road(a, b):
+        km = haversine_km(*coordinates[a], *coordinates[b])
+        # Roads wind a little more than the straight line
+        return (a, b, max(1, round(km * UNITS_PER_KM * rng.uniform(1.0, 1.4))))
+
+    edges = []
+    for r in range(width):
+        for c in range(width):
+            here = f'N{r}_{c}'
+            if c + 1 < width and rng.random() > 0.03:
+                edges.append(road(here, f'N{r}_{c + 1}'))
+            if r + 1 < width and rng.random() > 0.03:
+                edges.append(road(here, f'N{r + 1}_{c}'))
+            if r + 1 < width and c + 1 < width and rng.random() < 0.06:
+                edges.append(road(here, f'N{r + 1}_{c + 1}'))
+    return edges, coordinates
+
+
+def generate_centers(seed, count, coordinates):
+    """Dispatch centers placed on road nodes, so routes can start from them"""
+    rng = _rng(seed, 'dispatch_centers')
+    nodes = rng.sample(sorted(coordinates), min(count, len(coordinates)))
+    return [(node, f'{rng.choice(CENTER_KINDS)} {node}', *coordinates[node]) for node in nodes]
+
+
+def generate_messages(seed, count, names):
+    """Message rows with the urgency fields the ingestion endpoints compute"""
+    rng = _rng(seed, 'messages')
+    scanner = KeywordScanner([(keyword, DEFAULT_WEIGHT) for keyword in DEFAULT_KEYWORDS])
+    end = datetime(2026, 1, 15)
+    span = MESSAGE_DAYS * 24 * 3600
+    for _ in range(count):
+        needs = rng.sample(MESSAGE_NEEDS, rng.choices([1, 2, 3], [60, 30, 10])[0])
+        need = ', '.join(needs).format(n=rng.randint(2, 40))
+        place = rng.choice(MESSAGE_PLACES).format(area=rng.choice(names))
+        message = ' '.join(f'{rng.choice(MESSAGE_OPENERS)}{need} {place}. {rng.choice(MESSAGE_CLOSERS)}'.split())
+        found, score = scanner.score(message)
+        timestamp = (end - timedelta(seconds=rng.randrange(span))).strftime('%Y-%m-%d %H:%M:%S')
+        status = rng.choices(['open', 'in_progress', 'resolved'], [55, 20, 25])[0]
+        yield (message, rng.choices(SOURCES, SOURCE_WEIGHTS)[0], timestamp, score, urgency_level_for(score),
+               json.dumps(found), dashboard.classify_request(message), status)
+
+
+def populate(path, scale='small', seed=1, log=None):
+    """Create ``path`` if needed, migrate it and add the synthetic rows.
+
+    Returns the row counts written per table.
+    """
+    sizes = sizes_for(scale)
+    conn = sqlite3.connect(path)
+    try:
+        conn.execute('PRAGMA journal_mode=WAL')
+        migrate(conn)
+        # Bulk load: durability only matters once the load has finished
+        conn.execute('PRAGMA synchronous=OFF')
+        written = {}
+
+        def step(table, sql, rows):
+            start = time.perf_counter()
+            with conn:
+                written[table] = _insert(conn, sql, rows)
+            if log:
+                log(f'{table}: {written[table]} rows in {time.perf_counter() - start:.1f}s')
+
+        step('affected_areas',
+             'INSERT INTO affected_areas (name, severity, population, delay_time, urgency_score) VALUES (?, ?, ?, ?, ?)',
+             generate_areas(seed, sizes['areas']))
+        step('volunteers',
+             'INSERT INTO volunteers (name, skills, location, status, assigned_to) VALUES (?, ?, ?, ?, ?)',
+             generate_volunteers(seed, sizes['volunteers']))
+        step('supply_items',
+             'INSERT INTO supply_items (item_name, weight, utility, quantity) VALUES (?, ?, ?, ?)',
+             generate_supplies(seed, sizes['supply_items']))
+        edges, coordinates = generate_road_network(seed, sizes['road_edges'])
+        step('location_graph',
+             'INSERT OR REPLACE INTO location_graph (from_loc, to_loc, distance) VALUES (?, ?, ?)', edges)
+        step('dispatch_centers',
+             'INSERT OR REPLACE INTO dispatch_centers (id, name, latitude, longitude) VALUES (?, ?, ?, ?)',
+             generate_centers(seed, sizes['dispatch_centers'], coordinates))
+        step('requests',
+             'INSERT INTO requests (message, source, timestamp, urgency_score, urgency_level, keywords_found, '
+             'request_type, status) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+             generate_messages(seed, sizes['messages'], area_names(seed, sizes['areas'])))
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute('ANALYZE')
+        conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+        return written
+    finally:
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--db', required=True, help='database file to create or extend')
+    parser.add_argument('--scale', default='small', help=f"one of {', '.join(SCALES)} or a fraction of full scale")
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+    if os.path.exists(args.db):
+        print(f'{args.db} exists; adding synthetic rows to it')
+    start = time.perf_counter()
+    written = populate(args.db, args.scale, args.seed, log=print)
+    print(json.dumps({'db': args.db, 'scale': args.scale, 'seed': args.seed, 'rows': written,
+                      'seconds': round(time.perf_counter() - start, 1)}))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,335 @@
+"""Contraction hierarchy for point-to-point routes on large road networks.
+
+Preprocessing (offline, ``python -m contraction``) contracts the nodes of
+the road graph one at a time, least important first.  Removing a node adds
+a shortcut between two of its neighbours whenever the path through it is
+the only shortest one (a bounded "witness" search looks for another).
+Every node ends up with a rank and a list of "upward" edges to
+higher-ranked neighbours, shortcuts included.
+
+A query then runs Dijkstra from both ends over upward edges only.  Both
+searches climb towards the few important nodes and meet there, touching
+hundreds of nodes where a plain Dijkstra settles a large part of the
+graph.  Shortcuts on the result are expanded back into road edges through
+the node each one bypasses.
+
+The hierarchy is written to one binary file: a header and flat arrays
+(ranks, CSR upward edges, bypassed nodes, weights) aligned for
+``memoryview.cast``, then the node ids as JSON.  The server maps it
+read-only, so opening it costs no parsing beyond the node ids, and it is
+used only while its graph signature matches the cached road graph -- after
+a road change routes fall back to Dijkstra until the file is rebuilt.
+"""
+import argparse
+import heapq
+import json
+import mmap
+import os
+import sqlite3
+import struct
+import time
+from array import array
+
+from metrics import instrument
+from road_graph import INF, load_road_graph
+
+HIERARCHY_PATH = os.environ.get('OPTIRELIEF_CH_PATH', 'road_graph.ch')
+
+MAGIC = b'ORCH0001'
+# magic, graph signature, nodes, upward edges, node id bytes, weights are floats
+HEADER = struct.Struct('<8s32sQQQ?7x')
+
+# Witness searches give up after settling this many nodes; lower values
+# preprocess faster but add shortcuts that a longer search would avoid
+WITNESS_SETTLE_LIMIT = 60
+
+
+def _align(offset):
+    return (offset + 7) & ~7
+
+
+def _witness_distances(adj, source, skip, limit):
+    """Bounded Dijkstra from ``source`` in the remaining graph without ``skip``"""
+    dist = {source: 0}
+    heap = [(0, source)]
+    settled = 0
+    while heap:
+        d, u = heapq.heappop(heap)
+        if d > dist[u]:
+            continue
+        if d > limit or settled == WITNESS_SETTLE_LIMIT:
+            break
+        settled += 1
+        for v, w in adj[u].items():
+            if v != skip:
+                nd = d + w
+                if nd < dist.get(v, INF):
+                    dist[v] = nd
+                    heapq.heappush(heap, (nd, v))
+    return dist
+
+
+def _shortcuts(adj, v):
+    """``(u, x, weight)`` shortcuts needed to contract ``v`` from the remaining graph"""
+    neighbors = list(adj[v].items())
+    shortcuts = []
+    for k, (u, wu) in enumerate(neighbors[:-1]):
+        rest = neighbors[k + 1:]
+        dist = _witness_distances(adj, u, v, wu + max(w for _, w in rest))
+        for x, wx in rest:
+            if dist.get(x, INF) > wu + wx:
+                shortcuts.append((u, x, wu + wx))
+    return shortcuts
+
+
+def build_hierarchy(graph):
+    """Contract every node of ``graph``; returns ``(rank, upward)`` where
+    ``upward[v]`` lists ``(neighbour, weight, bypassed node or -1)``"""
+    n = len(graph)
+    adj = [{} for _ in range(n)]
+    for u in range(n):
+        for v, w in graph.neighbors(u):
+            if u != v:
+                adj[u][v] = w
+    # (lower, higher node index) -> node a current shortcut bypasses
+    bypassed = {}
+    deleted = [0] * n
+
+    def priority(v, shortcuts):
+        # Edge difference (weighted double, which kept both the shortcut
+        # count and query times lowest on grids) plus contracted neighbours,
+        # which spreads contraction evenly over the graph
+        return 2 * (len(shortcuts) - len(adj[v])) + deleted[v]
+
+    heap = [(priority(v, _shortcuts(adj, v)), v) for v in range(n)]
+    heapq.heapify(heap)
+    rank = [0] * n
+    upward = [None] * n
+    order = 0
+    while heap:
+        _, v = heapq.heappop(heap)
+        # Priorities go stale as neighbours are contracted; re-check lazily
+        shortcuts = _shortcuts(adj, v)
+        current = priority(v, shortcuts)
+        if heap and current > heap[0][0]:
+            heapq.heappush(heap, (current, v))
+            continue
+
+        rank[v] = order
+        order += 1
+        upward[v] = [(u, w, bypassed.get((min(u, v), max(u, v)), -1)) for u, w in adj[v].items()]
+        for u in adj[v]:
+            del adj[u][v]
+            deleted[u] += 1
+        adj[v] = {}
+        for u, x, weight in shortcuts:
+            if weight < adj[u].get(x, INF):
+                adj[u][x] = adj[x][u] = weight
+                bypassed[(min(u, x), max(u, x))] = v
+    return rank, upward
+
+
+def save_hierarchy(path, graph, rank, upward):
+    """Write the hierarchy of ``graph`` to ``path`` atomically"""
+    floats = graph.weights.typecode == 'd'
+    indptr = array('q', [0])
+    targets = array('i')
+    middles = array('i')
+    weights = array('d' if floats else 'q')
+    for edges in upward:
+        for u, w, m in edges:
+            targets.append(u)
+            weights.append(w)
+            middles.append(m)
+        indptr.append(len(targets))
+    names = json.dumps(graph.nodes, ensure_ascii=False, separators=(',', ':')).encode()
+
+    tmp = f'{path}.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, graph.signature.encode(), len(graph), len(targets), len(names), floats))
+        for section in (array('i', rank), indptr, targets, middles, weights):
+            f.write(b'\0' * (_align(f.tell()) - f.tell()))
+            f.write(section.tobytes())
+        f.write(b'\0' * (_align(f.tell()) - f.tell()))
+        f.write(names)
+    os.replace(tmp, path)
+
+
+class ContractionHierarchy:
+    """Read-only, memory-mapped hierarchy file"""
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._mmap)
+        magic, signature, n, m, names_size, floats = HEADER.unpack_from(view)
+        if magic != MAGIC:
+            raise ValueError(f'{path} is not a contraction hierarchy file')
+        self.signature = signature.decode()
+        offset = HEADER.size
+
+        def section(code, count):
+            nonlocal offset
+            offset = _align(offset)
+            size = count * struct.calcsize(code)
+            data = view[offset:offset + size].cast(code)
+            offset += size
+            return data
+
+        self.rank = section('i', n)
+        self.indptr = section('q', n + 1)
+        self.targets = section('i', m)
+        self.middles = section('i', m)
+        self.weights = section('d' if floats else 'q', m)
+        offset = _align(offset)
+        self.nodes = json.loads(bytes(view[offset:offset + names_size]))
+        self.index = {node: i for i, node in enumerate(self.nodes)}
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def _edge_middle(self, a, b):
+        """Node the upward edge between ``a`` and ``b`` bypasses, or -1"""
+        if self.rank[a] > self.rank[b]:
+            a, b = b, a
+        for k in range(self.indptr[a], self.indptr[a + 1]):
+            if self.targets[k] == b:
+                return self.middles[k]
+        raise KeyError((a, b))
+
+    def _unpack(self, path):
+        """Road nodes along a path of hierarchy edges"""
+        nodes = [path[0]]
+        for a, b in zip(path, path[1:]):
+            stack = [(a, b)]
+            while stack:
+                x, y = stack.pop()
+                m = self._edge_middle(x, y)
+                if m < 0:
+                    nodes.append(y)
+                else:
+                    stack.append((m, y))
+                    stack.append((x, m))
+        return nodes
+
+    @instrument(name='ch_shortest_path')
+    def shortest_path(self, start, end):
+        """Shortest ``(path, distance)`` between two node ids, like RoadGraph.shortest_path"""
+        s, t = self.index.get(start), self.index.get(end)
+        if s is None or t is None:
+            return None, INF
+        if s == t:
+            return [start], 0
+        indptr, targets, weights = self.indptr, self.targets, self.weights
+        forward, backward = {s: 0}, {t: 0}
+        forward_parent, backward_parent = {s: -1}, {t: -1}
+        forward_heap, backward_heap = [(0, s)], [(0, t)]
+        best, meet = INF, -1
+        while True:
+            # Expand the direction with the nearer frontier; a direction is
+            # done once its frontier is no closer than the best meeting
+            if forward_heap and forward_heap[0][0] >= best:
+                forward_heap = []
+            if backward_heap and backward_heap[0][0] >= best:
+                backward_heap = []
+            if forward_heap and (not backward_heap or forward_heap[0][0] <= backward_heap[0][0]):
+                dist, parent, heap, other = forward, forward_parent, forward_heap, backward
+            elif backward_heap:
+                dist, parent, heap, other = backward, backward_parent, backward_heap, forward
+            else:
+                break
+
+            d, u = heapq.heappop(heap)
+            if d > dist[u]:
+                continue
+            if u in other and d + other[u] < best:
+                best, meet = d + other[u], u
+            start, stop = indptr[u], indptr[u + 1]
+            # Stall on demand: reached more cheaply from above, u cannot be
+            # on a shortest up-down path, so nothing is relaxed from it
+            stalled = False
+            for k in range(start, stop):
+                if dist.get(targets[k], INF) + weights[k] < d:
+                    stalled = True
+                    break
+            if stalled:
+                continue
+            for k in range(start, stop):
+                v = targets[k]
+                nd = d + weights[k]
+                if nd < dist.get(v, INF):
+                    dist[v] = nd
+                    parent[v] = u
+                    heapq.heappush(heap, (nd, v))
+        if meet < 0:
+            return None, INF
+
+        up = []
+        node = meet
+        while node >= 0:
+            up.append(node)
+            node = forward_parent[node]
+        down = []
+        node = backward_parent[meet]
+        while node >= 0:
+            down.append(node)
+            node = backward_parent[node]
+        path = self._unpack(up[::-1] + down)
+        return [self.nodes[i] for i in path], best
+
+
+class HierarchyCache:
+    """The hierarchy file at ``path``, reopened whenever it changes on disk"""
+
+    def __init__(self, path=HIERARCHY_PATH):
+        self.path = path
+        self._hierarchy = None
+        self._stamp = None
+
+    def get(self, graph):
+        """The hierarchy if it was built from ``graph``'s edges, else None"""
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        if stamp != self._stamp:
+            try:
+                self._hierarchy = ContractionHierarchy(self.path)
+            except (ValueError, struct.error, TypeError):
+                self._hierarchy = None
+            self._stamp = stamp
+        hierarchy = self._hierarchy
+        if hierarchy is not None and hierarchy.signature == graph.signature:
+            return hierarchy
+        return None
+
+
+def main():
+    from database import DB_PATH
+
+    parser = argparse.ArgumentParser(description='Build the contraction hierarchy file for the road graph')
+    parser.add_argument('--db', default=DB_PATH)
+    parser.add_argument('--out', default=HIERARCHY_PATH)
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db)
+    try:
+        graph = load_road_graph(conn)
+    finally:
+        conn.close()
+    start = time.perf_counter()
+    rank, upward = build_hierarchy(graph)
+    save_hierarchy(args.out, graph, rank, upward)
+    print(json.dumps({
+        'nodes': len(graph),
+        'edges': graph.edge_count,
+        'upward_edges': sum(len(edges) for edges in upward),
+        'seconds': round(time.perf_counter() - start, 2),
+        'bytes': os.path.getsize(args.out),
+        'path': args.out
+    }))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+"""Materialized counters behind the ``/api/dashboard/*`` endpoints.
+
+Triggers on ``requests``, ``volunteers`` and ``affected_areas`` keep the
+``dashboard_counters`` table in step with every write, inside the writing
+transaction, so a dashboard poll reads a handful of counter rows instead of
+scanning the tables.  ``rebuild`` recomputes every counter from scratch.
+"""
+from keyword_scanner import KeywordScanner
+
+# Request categories and the words that put a message in them; the
+# category with the most matches wins, earlier ones on ties
+REQUEST_TYPES = {
+    'Medical': ['medical', 'injured', 'injury', 'hospital', 'ambulance', 'casualty', 'bleeding',
+                'doctor', 'medicine', 'sick', 'wounded'],
+    'Food/Water': ['food', 'water', 'hungry', 'thirst', 'drink', 'ration', 'meal', 'starving'],
+    'Shelter': ['shelter', 'roof', 'tent', 'homeless', 'blanket', 'collapse', 'house', 'building'],
+    'Transportation': ['transport', 'evacuat', 'vehicle', 'road', 'stranded', 'boat', 'bridge', 'trapped'],
+}
+OTHER_REQUEST_TYPE = 'Other'
+
+PRIORITY_LEVELS = ['Critical', 'High', 'Medium', 'Low']
+REQUEST_STATUSES = ('open', 'in_progress', 'resolved')
+VOLUNTEER_STATUSES = ('available', 'assigned', 'unavailable')
+
+_type_scanner = KeywordScanner(
+    [(word, t) for t, (name, words) in enumerate(REQUEST_TYPES.items()) for word in words]
+)
+_type_names = list(REQUEST_TYPES)
+
+
+def classify_request(message):
+    """Dashboard category of a message"""
+    hits = [0] * len(_type_names)
+    for t, n in zip(_type_scanner.weights, _type_scanner.count(message)):
+        hits[t] += n
+    best = max(range(len(hits)), key=lambda t: (hits[t], -t))
+    return _type_names[best] if hits[best] else OTHER_REQUEST_TYPE
+
+
+def _bump(metric, bucket, delta):
+    return (f"INSERT INTO dashboard_counters (metric, bucket, value) VALUES ('{metric}', {bucket}, {delta}) "
+            f"ON CONFLICT (metric, bucket) DO UPDATE SET value = value + {delta};")
+
+
+def _request_counts(row, delta):
+    return ''.join([
+        _bump('requests', "''", delta),
+        _bump('requests_by_level', f"COALESCE({row}.urgency_level, '')", delta),
+        _bump('requests_by_type', f"COALESCE({row}.request_type, '{OTHER_REQUEST_TYPE}')", delta),
+        _bump('requests_by_status', f"COALESCE({row}.status, 'open')", delta),
+    ])
+
+
+def _volunteer_counts(row, delta):
+    return _bump('volunteers_by_status', f"COALESCE({row}.status, '')", delta)
+
+
+TRIGGERS = f'''
+    CREATE TRIGGER IF NOT EXISTS dashboard_requests_insert AFTER INSERT ON requests BEGIN
+        {_request_counts('NEW', 1)}
+    END;
+    CREATE TRIGGER IF NOT EXISTS dashboard_requests_delete AFTER DELETE ON requests BEGIN
+        {_request_counts('OLD', -1)}
+    END;
+    CREATE TRIGGER IF NOT EXISTS dashboard_requests_update
+    AFTER UPDATE OF urgency_level, request_type, status ON requests BEGIN
+        {_request_counts('OLD', -1)}
+        {_request_counts('NEW', 1)}
+    END;
+    CREATE TRIGGER IF NOT EXISTS dashboard_volunteers_insert AFTER INSERT ON volunteers BEGIN
+        {_volunteer_counts('NEW', 1)}
+    END;
+    CREATE TRIGGER IF NOT EXISTS dashboard_volunteers_delete AFTER DELETE ON volunteers BEGIN
+        {_volunteer_counts('OLD', -1)}
+    END;
+    CREATE TRIGGER IF NOT EXISTS dashboard_volunteers_update AFTER UPDATE OF status ON volunteers BEGIN
+        {_volunteer_counts('OLD', -1)}
+        {_volunteer_counts('NEW', 1)}
+    END;
+    CREATE TRIGGER IF NOT EXISTS dashboard_areas_insert AFTER INSERT ON affected_areas BEGIN
+        {_bump('areas', "''", 1)}
+    END;
+    CREATE TRIGGER IF NOT EXISTS dashboard_areas_delete AFTER DELETE ON affected_areas BEGIN
+        {_bump('areas', "''", -1)}
+    END;
+'''
+
+
+def rebuild(conn):
+    """Recompute every counter from the base tables; run on the writer"""
+    untyped = conn.execute('SELECT id, message FROM requests WHERE request_type IS NULL').fetchall()
+    conn.executemany('UPDATE requests SET request_type = ? WHERE id = ?',
+                     [(classify_request(message), request_id) for request_id, message in untyped])
+
+    conn.execute('DELETE FROM dashboard_counters')
+    for sql in (
+        "SELECT 'requests', '', COUNT(*) FROM requests",
+        "SELECT 'requests_by_level', COALESCE(urgency_level, ''), COUNT(*) FROM requests GROUP BY 2",
+        f"SELECT 'requests_by_type', COALESCE(request_type, '{OTHER_REQUEST_TYPE}'), COUNT(*) FROM requests GROUP BY 2",
+        "SELECT 'requests_by_status', COALESCE(status, 'open'), COUNT(*) FROM requests GROUP BY 2",
+        "SELECT 'volunteers_by_status', COALESCE(status, ''), COUNT(*) FROM volunteers GROUP BY 2",
+        "SELECT 'areas', '', COUNT(*) FROM affected_areas",
+    ):
+        conn.execute(f'INSERT INTO dashboard_counters (metric, bucket, value) {sql}')
+    return len(untyped)
+
+
+def read_counters(conn):
+    """``{metric: {bucket: value}}`` snapshot of every counter"""
+    counters = {}
+    for metric, bucket, value in conn.execute('SELECT metric, bucket, value FROM dashboard_counters'):
+        counters.setdefault(metric, {})[bucket] = value
+    return counters
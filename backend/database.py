@@ -0,0 +1,182 @@
+"""SQLite data access layer for the OptiRelief API.
+
+All endpoints share one ``Database`` instance instead of opening a fresh
+``sqlite3.connect`` per request.  The database runs in WAL mode so readers
+never queue behind the writer, reads are served from a bounded pool of
+connections and every write goes through a single writer connection.  Work
+is executed on dedicated thread pools so ``async def`` handlers never block
+the event loop on disk I/O.
+"""
+import asyncio
+import os
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from metrics import observe_db_call
+
+DB_PATH = os.environ.get('OPTIRELIEF_DB', 'optirelief.db')
+POOL_SIZE = int(os.environ.get('OPTIRELIEF_DB_POOL_SIZE', '8'))
+
+# Size of each connection's prepared statement cache; every query in the
+# API is a constant SQL string so statements are compiled once per connection
+STATEMENT_CACHE_SIZE = 256
+
+
+class Database:
+    """Bounded pool of WAL-mode read connections plus one writer connection"""
+
+    def __init__(self, path=DB_PATH, pool_size=POOL_SIZE):
+        self.path = path
+        self.pool_size = pool_size
+        self._readers = queue.LifoQueue(maxsize=pool_size)
+        self._opened = 0
+        self._open_lock = threading.Lock()
+        self._writer = None
+        self._write_lock = threading.Lock()
+        self._read_executor = None
+        self._write_executor = None
+
+    def _connect(self):
+        conn = sqlite3.connect(
+            self.path,
+            timeout=30,
+            check_same_thread=False,
+            cached_statements=STATEMENT_CACHE_SIZE,
+        )
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute('PRAGMA busy_timeout=30000')
+        conn.execute('PRAGMA temp_store=MEMORY')
+        return conn
+
+    @contextmanager
+    def reader(self):
+        """Borrow a read connection, opening one lazily up to ``pool_size``"""
+        try:
+            conn = self._readers.get_nowait()
+        except queue.Empty:
+            conn = None
+            with self._open_lock:
+                if self._opened < self.pool_size:
+                    self._opened += 1
+                    conn = self._connect()
+            if conn is None:
+                conn = self._readers.get()
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            self._readers.put(conn)
+
+    @contextmanager
+    def writer(self):
+        """Exclusive access to the writer connection; commits on success"""
+        with self._write_lock:
+            if self._writer is None:
+                self._writer = self._connect()
+            try:
+                yield self._writer
+                self._writer.commit()
+            except BaseException:
+                self._writer.rollback()
+                raise
+
+    def _executors(self):
+        if self._read_executor is None:
+            with self._open_lock:
+                if self._read_executor is None:
+                    self._write_executor = ThreadPoolExecutor(
+                        max_workers=1, thread_name_prefix='optirelief-db-write')
+                    self._read_executor = ThreadPoolExecutor(
+                        max_workers=self.pool_size, thread_name_prefix='optirelief-db-read')
+        return self._read_executor, self._write_executor
+
+    def _call(self, fn, args, write):
+        with (self.writer() if write else self.reader()) as conn:
+            return fn(conn, *args)
+
+    async def run(self, fn, *args, write=False):
+        """Run ``fn(conn, *args)`` on a pooled connection off the event loop"""
+        read_executor, write_executor = self._executors()
+        executor = write_executor if write else read_executor
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+        try:
+            return await loop.run_in_executor(executor, self._call, fn, args, write)
+        finally:
+            observe_db_call(time.perf_counter() - start, write)
+
+    async def fetchall(self, sql, params=()):
+        return await self.run(lambda conn: conn.execute(sql, params).fetchall())
+
+    async def fetchone(self, sql, params=()):
+        return await self.run(lambda conn: conn.execute(sql, params).fetchone())
+
+    async def execute(self, sql, params=()):
+        """Execute a single write statement and return its ``lastrowid``"""
+        return await self.run(lambda conn: conn.execute(sql, params).lastrowid, write=True)
+
+    async def executemany(self, sql, seq_of_params):
+        return await self.run(lambda conn: conn.executemany(sql, seq_of_params).rowcount, write=True)
+
+    def close(self):
+        if self._read_executor is not None:
+            self._read_executor.shutdown(wait=True)
+            self._write_executor.shutdown(wait=True)
+            self._read_executor = self._write_executor = None
+        with self._write_lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+        while True:
+            try:
+                self._readers.get_nowait().close()
+            except queue.Empty:
+                break
+        self._opened = 0
+
+
+class LoadedCache:
+    """A value loaded from the database once and again after ``invalidate()``.
+
+    ``load(conn)`` builds the value; subclasses may define ``_load`` instead.
+    A load that overlaps an ``invalidate()`` is returned to its caller but
+    not kept, so a change made while loading is never hidden.
+    """
+
+    def __init__(self, database, load=None):
+        self.database = database
+        self.version = 0
+        self._value = None
+        self._lock = asyncio.Lock()
+        if load is not None:
+            self._load = load
+
+    async def get(self):
+        value = self._value
+        if value is not None:
+            return value
+        async with self._lock:
+            if self._value is None:
+                version = self.version
+                value = await self.database.run(self._load)
+                if version == self.version:
+                    self._value = value
+                return value
+            return self._value
+
+    def peek(self):
+        """The cached value, or None if it has not been loaded"""
+        return self._value
+
+    def invalidate(self):
+        self.version += 1
+        self._value = None
+
+
+db = Database()
@@ -0,0 +1,207 @@
+"""Shortest-path trees from dispatch centers, repaired as roads change.
+
+Routes from (or to -- roads are undirected) a dispatch center are read
+straight off a cached shortest-path tree rooted at the center.  When a
+road closes, reopens or changes length the trees are repaired rather
+than rebuilt:
+
+* A cheaper (or reopened) road can only shorten paths through it, so a
+  Dijkstra is resumed from its far end and stops where nothing improves.
+* A dearer (or closed) road only matters if it is a tree edge.  Then just
+  the subtree hanging below it is detached, re-seeded from its best
+  neighbours outside the subtree and re-settled; the rest of the tree is
+  untouched.
+
+Either way the work is proportional to the part of the tree that actually
+changes, usually a handful of nodes.
+
+Trees are never built while a request waits: a route to a center without
+one is answered by a targeted search, and a center that keeps being asked
+for gets its tree built in the background.
+"""
+import asyncio
+import heapq
+import time
+from collections import Counter, OrderedDict
+
+from road_graph import INF, RoadGraph, center_location, shared_graph
+
+# Trees kept at once; the least recently used center is dropped beyond this
+MAX_TREES = 64
+# Larger graphs build new trees in a solver worker when a pool is given
+INLINE_TREE_NODES = 20_000
+# A center's tree is built once routes to it have missed this many times
+WARM_AFTER_MISSES = 2
+
+
+def _settle(graph, dist, prev, heap):
+    """Resume Dijkstra from ``heap``; returns how many nodes got shorter"""
+    indptr, indices, weights = graph.indptr, graph.indices, graph.weights
+    changed = 0
+    while heap:
+        d, u = heapq.heappop(heap)
+        if d > dist[u]:
+            continue
+        changed += 1
+        for k in range(indptr[u], indptr[u + 1]):
+            v = indices[k]
+            nd = d + weights[k]
+            if nd < dist[v]:
+                dist[v] = nd
+                prev[v] = u
+                heapq.heappush(heap, (nd, v))
+    return changed
+
+
+def _subtree(graph, prev, root):
+    """Nodes whose tree path runs through ``root``, ``root`` included"""
+    nodes = [root]
+    for x in nodes:
+        for y, _ in graph.neighbors(x):
+            if prev[y] == x:
+                nodes.append(y)
+    return nodes
+
+
+def repair_tree(graph, dist, prev, a, b, old, new):
+    """Update the tree ``(dist, prev)`` in place for road ``a``-``b`` (node
+    indices of ``graph``, the graph after the change) going from weight
+    ``old`` to ``new``; None means no road.  Returns how many nodes moved.
+    """
+    missing = len(graph) - len(dist)
+    if missing:
+        dist.extend([INF] * missing)
+        prev.extend([-1] * missing)
+    old = INF if old is None else old
+    new = INF if new is None else new
+    if a == b or new == old:
+        return 0
+
+    if new < old:
+        heap = []
+        for x, y in ((a, b), (b, a)):
+            if dist[x] + new < dist[y]:
+                dist[y] = dist[x] + new
+                prev[y] = x
+                heapq.heappush(heap, (dist[y], y))
+        return _settle(graph, dist, prev, heap)
+
+    if prev[b] == a:
+        child = b
+    elif prev[a] == b:
+        child = a
+    else:
+        # Not on any shortest path in this tree
+        return 0
+    detached = _subtree(graph, prev, child)
+    for x in detached:
+        dist[x] = INF
+        prev[x] = -1
+    # Best way back in from outside the subtree; detached nodes are still
+    # INF here, so only attached neighbours count
+    heap = []
+    for x in detached:
+        for y, w in graph.neighbors(x):
+            if dist[y] + w < dist[x]:
+                dist[x] = dist[y] + w
+                prev[x] = y
+        if dist[x] < INF:
+            heapq.heappush(heap, (dist[x], x))
+    _settle(graph, dist, prev, heap)
+    return len(detached)
+
+
+class CenterTreeCache:
+    """Shortest-path trees rooted at dispatch center nodes of the cached road graph"""
+
+    def __init__(self, database, road_graph, solvers=None):
+        self.database = database
+        self.road_graph = road_graph
+        self.solvers = solvers
+        self._graph = None
+        self._centers = set()
+        # node index -> [dist, prev], least recently used first
+        self._trees = OrderedDict()
+        # node index -> routes that found no tree since it was last cached
+        self._misses = Counter()
+        self._warming = None
+
+    def _load_centers(self, conn):
+        return {center_location(row[0]) for row in conn.execute('SELECT id FROM dispatch_centers')}
+
+    async def _current(self):
+        graph = await self.road_graph.get()
+        if graph is not self._graph:
+            # Reloaded rather than patched: trees and centers start over
+            centers = await self.database.run(self._load_centers)
+            if graph is not await self.road_graph.get():
+                return graph
+            self._graph, self._centers = graph, centers
+            self._trees.clear()
+            self._misses.clear()
+        return graph
+
+    async def cached(self, node):
+        """``(graph, dist, prev)`` if ``node`` is a center with a cached tree, else None.
+
+        Misses are counted, and a center that keeps missing has its tree
+        built in the background, one at a time.
+        """
+        graph = await self._current()
+        if graph is not self._graph or node not in self._centers or node not in graph:
+            return None
+        root = graph.index[node]
+        tree = self._trees.get(root)
+        if tree is not None:
+            self._trees.move_to_end(root)
+            return graph, tree[0], tree[1]
+        self._misses[root] += 1
+        if self._misses[root] >= WARM_AFTER_MISSES and (self._warming is None or self._warming.done()):
+            self._warming = asyncio.get_running_loop().create_task(self._build(graph, root))
+        return None
+
+    async def _build(self, graph, root):
+        try:
+            if self.solvers is None or len(graph) <= INLINE_TREE_NODES:
+                dist, prev = graph.shortest_path_tree(root)
+            else:
+                dist, prev = await self.solvers.run(
+                    RoadGraph.shortest_path_tree, shared_graph(graph), root, name='center_tree'
+                )
+        except Exception:
+            # Nobody waits on this tree; the next miss tries again
+            return
+        # Repairs only reach cached trees, so one built from an older graph
+        # is thrown away
+        if graph is not self._graph:
+            return
+        del self._misses[root]
+        self._trees[root] = [dist, prev]
+        while len(self._trees) > MAX_TREES:
+            self._trees.popitem(last=False)
+
+    def edge_changed(self, old_graph, graph, from_loc, to_loc, old, new):
+        """Repair every cached tree for one road change from ``old_graph`` to ``graph``"""
+        start = time.perf_counter()
+        if old_graph is None or old_graph is not self._graph:
+            self._graph = None
+            self._trees.clear()
+            self._misses.clear()
+            return {'trees': 0, 'nodes_updated': 0, 'repair_ms': 0.0}
+        a, b = graph.index[from_loc], graph.index[to_loc]
+        updated = 0
+        for dist, prev in self._trees.values():
+            updated += repair_tree(graph, dist, prev, a, b, old, new)
+        self._graph = graph
+        return {
+            'trees': len(self._trees),
+            'nodes_updated': updated,
+            'repair_ms': round((time.perf_counter() - start) * 1000, 3)
+        }
+
+    def path(self, graph, dist, prev, root, node):
+        """``(path, distance)`` from the tree root to ``node``, or ``(None, INF)``"""
+        target = graph.index.get(node)
+        if target is None or dist[target] == INF:
+            return None, INF
+        return graph.path_from_tree(prev, root, target), dist[target]
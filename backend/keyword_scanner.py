@@ -0,0 +1,122 @@
+"""Multi-keyword scanner for incoming distress messages.
+
+An Aho-Corasick automaton is compiled once from the urgent keyword lexicon
+and finds every keyword in a single pass over the message, so the cost no
+longer grows with the number of keywords.
+"""
+from collections import deque
+
+from database import LoadedCache
+from metrics import instrument
+
+# Seed lexicon; each match adds its weight to the urgency score
+DEFAULT_KEYWORDS = [
+    'urgent', 'emergency', 'help', 'critical', 'injured', 'trapped',
+    'fire', 'flood', 'collapse', 'medical', 'rescue', 'immediate',
+    'danger', 'severe', 'casualty', 'ambulance', 'hospital'
+]
+DEFAULT_WEIGHT = 10
+
+
+def urgency_level_for(urgency_score):
+    """Map a 0-100 urgency score to its level"""
+    if urgency_score >= 80:
+        return 'Critical'
+    elif urgency_score >= 60:
+        return 'High'
+    elif urgency_score >= 40:
+        return 'Medium'
+    return 'Low'
+
+
+class KeywordScanner:
+    """Aho-Corasick automaton over a list of ``(keyword, weight)`` pairs.
+
+    Matching is case-insensitive.  A keyword written in a cased script (Latin,
+    Cyrillic, Greek, ...) must start at a word boundary, so 'fire' matches
+    'fires' and 'firefighters' but not 'campfire'; keywords in scripts
+    without case (e.g. CJK, which is written without spaces) match anywhere.
+    """
+
+    def __init__(self, keywords):
+        self.keywords = []
+        self.weights = []
+        self._bounded = []
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]
+
+        seen = set()
+        for keyword, weight in keywords:
+            pattern = keyword.lower()
+            if not pattern or pattern in seen:
+                continue
+            seen.add(pattern)
+            k = len(self.keywords)
+            self.keywords.append(keyword)
+            self.weights.append(weight)
+            self._bounded.append(pattern[0].lower() != pattern[0].upper())
+
+            state = 0
+            for ch in pattern:
+                nxt = self._goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[state][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                state = nxt
+            self._out[state].append((k, len(pattern)))
+
+        # Breadth-first pass wiring failure links and merging the outputs of
+        # each state's longest proper suffix; depth-1 states fail to the root
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                f = self._fail[state]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                self._fail[nxt] = self._goto[f].get(ch, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def __len__(self):
+        return len(self.keywords)
+
+    def count(self, text):
+        """Occurrences of each keyword in ``text``, indexed like ``keywords``"""
+        counts = [0] * len(self.keywords)
+        text = text.lower()
+        goto, fail, out, bounded = self._goto, self._fail, self._out, self._bounded
+        state = 0
+        for end, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for k, length in out[state]:
+                start = end - length + 1
+                if bounded[k] and start > 0 and text[start - 1].isalnum():
+                    continue
+                counts[k] += 1
+        return counts
+
+    @instrument(name='keyword_score', size='text')
+    def score(self, text):
+        """``(keywords_found, urgency_score)`` for a message, score capped at 100"""
+        found_keywords = []
+        urgency_score = 0
+        for keyword, weight, n in zip(self.keywords, self.weights, self.count(text)):
+            if n:
+                found_keywords.append(keyword)
+                urgency_score += n * weight
+        return found_keywords, min(urgency_score, 100)
+
+
+class KeywordLexicon(LoadedCache):
+    """Compiles the ``urgent_keywords`` table once and again after changes"""
+
+    def _load(self, conn):
+        rows = conn.execute('SELECT keyword, weight FROM urgent_keywords ORDER BY rowid').fetchall()
+        return KeywordScanner(rows)
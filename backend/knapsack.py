@@ -0,0 +1,248 @@
+"""Supply packing engine for ``/api/optimize-supply`` and ``/api/optimize-fleet``.
+
+Solves the bounded knapsack problem over the ``quantity`` of each supply
+item.  Quantities are binary-split into 1, 2, 4, ... sized pieces so the
+problem becomes a 0/1 knapsack over O(sum log q) pieces, and each DP row is
+computed with NumPy.  Only one row of values is kept (O(capacity) memory);
+the take/skip decision of every piece is stored as a packed bitset for
+backtracking.  Very large instances fall back to a greedy ratio heuristic.
+"""
+from math import gcd
+
+from lazy_imports import lazy_import
+from metrics import instrument
+
+np = lazy_import('numpy')
+
+# Largest pieces x capacity table solved exactly: 'auto' falls back to
+# greedy beyond it and 'exact' refuses.  The backtracking bitset for this
+# many cells is about 25 MB
+EXACT_CELL_LIMIT = 200_000_000
+
+MODES = ('auto', 'exact', 'greedy')
+
+INF = float('infinity')
+
+
+def _is_count(value):
+    """Whether ``value`` is a non-negative whole number (5.0 counts)"""
+    return isinstance(value, (int, float)) and 0 <= value < INF and int(value) == value
+
+
+def _split_quantity(quantity):
+    """Binary splitting: 13 -> 1, 2, 4, 6"""
+    pieces = []
+    k = 1
+    while quantity > 0:
+        take = min(k, quantity)
+        pieces.append(take)
+        quantity -= take
+        k *= 2
+    return pieces
+
+
+def _build_table(weights, utilities, limits, capacity, dtype):
+    """Run the DP and return the pieces with their packed take/skip bits"""
+    pieces = [(i, k) for i in range(len(weights)) for k in _split_quantity(limits[i])]
+    dp = np.zeros(capacity + 1, dtype=dtype)
+    taken = []
+    for i, k in pieces:
+        pw, pu = weights[i] * k, utilities[i] * k
+        candidate = dp[:capacity + 1 - pw] + pu
+        take = candidate > dp[pw:]
+        np.copyto(dp[pw:], candidate, where=take)
+        taken.append(np.packbits(take))
+    return pieces, taken
+
+
+def _backtrack(weights, pieces, taken, capacity):
+    """Optimal counts for any capacity up to the one the table was built for"""
+    counts = [0] * len(weights)
+    w = capacity
+    for p in range(len(pieces) - 1, -1, -1):
+        i, k = pieces[p]
+        j = w - weights[i] * k
+        if j >= 0 and (taken[p][j >> 3] >> (7 - (j & 7))) & 1:
+            counts[i] += k
+            w = j
+    return counts
+
+
+def _solve_greedy(weights, utilities, limits, capacity):
+    """Fill by utility/weight ratio; at least half of the optimum"""
+    order = sorted(range(len(weights)), key=lambda i: utilities[i] / weights[i], reverse=True)
+
+    def fill(counts, remaining):
+        for i in order:
+            c = min(limits[i] - counts[i], remaining // weights[i])
+            counts[i] += c
+            remaining -= c * weights[i]
+        return counts
+
+    greedy = fill([0] * len(weights), capacity)
+
+    # The classic 1/2-approximation also considers the single most valuable
+    # stack of one item, topped up greedily
+    best = max(range(len(weights)), key=lambda i: utilities[i] * limits[i], default=None)
+    if best is not None:
+        stacked = [0] * len(weights)
+        stacked[best] = limits[best]
+        stacked = fill(stacked, capacity - limits[best] * weights[best])
+        if sum(c * u for c, u in zip(stacked, utilities)) > sum(c * u for c, u in zip(greedy, utilities)):
+            return stacked
+    return greedy
+
+
+class PackingPlan:
+    """Bounded knapsack over a fixed stock of ``items``.
+
+    ``stock[i]`` is how many units of ``items[i]`` are available (defaults to
+    each item's ``quantity``, or 1).  An exact plan keeps its DP bitset, so
+    ``manifest()`` can also answer any smaller capacity over the same stock
+    without re-solving.
+    """
+
+    def __init__(self, items, capacity, stock=None, mode='auto'):
+        if mode not in MODES:
+            raise ValueError(f"Mode must be one of {', '.join(MODES)}")
+        if not _is_count(capacity):
+            raise ValueError("Capacity must be a non-negative integer")
+        if stock is None:
+            stock = [item.get('quantity', 1) for item in items]
+
+        self.items = items
+        self.capacity = int(capacity)
+        self._free = []
+        self._index = []
+        self._taken = None
+
+        weights, utilities, limits = [], [], []
+        for i, item in enumerate(items):
+            weight, utility, quantity = item['weight'], item['utility'], stock[i]
+            if not _is_count(weight):
+                raise ValueError(f"Weight of {item.get('item_name', i)} must be a non-negative integer")
+            if not _is_count(quantity):
+                raise ValueError(f"Quantity of {item.get('item_name', i)} must be a non-negative integer")
+            if not isinstance(utility, (int, float)):
+                raise ValueError(f"Utility of {item.get('item_name', i)} must be a number")
+            quantity = int(quantity)
+            if quantity <= 0 or utility <= 0:
+                continue
+            if weight == 0:
+                self._free.append((i, quantity))
+                continue
+            limit = min(quantity, self.capacity // int(weight))
+            if limit > 0:
+                self._index.append(i)
+                weights.append(int(weight))
+                utilities.append(utility)
+                limits.append(limit)
+
+        self.fits_all = sum(w * q for w, q in zip(weights, limits)) <= self.capacity
+        self._limits = limits
+        self._utilities = utilities
+
+        # Scale weights by their common divisor to shrink the DP row
+        self._divisor = 0
+        for w in weights:
+            self._divisor = gcd(self._divisor, w)
+        self._weights = [w // self._divisor for w in weights] if weights else []
+        scaled_capacity = self.capacity // self._divisor if weights else 0
+
+        pieces = sum(len(_split_quantity(q)) for q in limits)
+        fits_table = pieces * (scaled_capacity + 1) <= EXACT_CELL_LIMIT
+        if mode == 'auto':
+            mode = 'exact' if self.fits_all or fits_table else 'greedy'
+        elif mode == 'exact' and not (self.fits_all or fits_table):
+            raise ValueError(
+                f"Too large to solve exactly ({pieces} pieces x capacity {scaled_capacity}); use mode 'auto' or 'greedy'"
+            )
+        self.mode = mode
+
+        if mode == 'exact' and not self.fits_all:
+            integral = all(isinstance(u, int) for u in utilities)
+            self._pieces, self._taken = _build_table(
+                self._weights, utilities, limits, scaled_capacity, np.int64 if integral else np.float64
+            )
+
+    def can_answer(self, capacity):
+        """Whether ``manifest(capacity)`` is optimal without re-solving"""
+        if capacity == self.capacity:
+            return True
+        return self._taken is not None and 0 <= capacity <= self.capacity
+
+    def manifest(self, capacity=None):
+        """Units of each item to pack, parallel to ``items``"""
+        capacity = self.capacity if capacity is None else capacity
+        if not self.can_answer(capacity):
+            raise ValueError("Capacity outside what this plan can answer")
+
+        counts = [0] * len(self.items)
+        for i, quantity in self._free:
+            counts[i] = quantity
+        if not self._index:
+            return counts
+
+        if self.fits_all and capacity == self.capacity:
+            solved = self._limits
+        elif self._taken is not None:
+            solved = _backtrack(self._weights, self._pieces, self._taken, capacity // self._divisor)
+        else:
+            solved = _solve_greedy(self._weights, self._utilities, self._limits, capacity // self._divisor)
+        for i, c in zip(self._index, solved):
+            counts[i] = c
+        return counts
+
+    def utility(self, counts):
+        return sum(c * item['utility'] for c, item in zip(counts, self.items))
+
+
+@instrument(size='items')
+def pack_supplies(items, capacity, mode='auto'):
+    """Bounded knapsack over ``items``; each may be taken up to ``quantity`` times.
+
+    Items without a ``quantity`` are treated as a single unit.  Returns
+    ``(counts, total_utility, mode)`` where ``counts[i]`` is how many units of
+    ``items[i]`` to pack and ``mode`` is the solver actually used.
+    """
+    plan = PackingPlan(items, capacity, mode=mode)
+    counts = plan.manifest()
+    return counts, plan.utility(counts), plan.mode
+
+
+@instrument(size='items')
+def pack_fleet(items, capacities, stock=None, mode='auto'):
+    """Load several vehicles from one shared stock.
+
+    Vehicles are filled largest first, each with an optimal bounded knapsack
+    over whatever stock is left.  An exact plan is reused for the following
+    vehicles while its manifest is still in stock: the optimum over a stock
+    stays optimal over any sub-stock that still contains it.  Returns
+    ``(manifests, remaining_stock)`` where ``manifests[v]`` is
+    ``(counts, utility, mode)`` for ``capacities[v]``.
+    """
+    stock = list(stock) if stock is not None else [item.get('quantity', 1) for item in items]
+    manifests = [None] * len(capacities)
+    plan = None
+    for v in sorted(range(len(capacities)), key=lambda v: capacities[v], reverse=True):
+        counts = None
+        if plan is not None and plan.can_answer(capacities[v]):
+            counts = plan.manifest(capacities[v])
+            if any(c > s for c, s in zip(counts, stock)):
+                counts = None
+        if counts is None:
+            plan = PackingPlan(items, capacities[v], stock=stock, mode=mode)
+            counts = plan.manifest()
+        stock = [s - c for s, c in zip(stock, counts)]
+        manifests[v] = (counts, plan.utility(counts), plan.mode)
+    return manifests, stock
+
+
+@instrument(size='items')
+def knapsack_01(items, capacity):
+    """0/1 Knapsack: each item is packed at most once"""
+    counts, total_utility, _ = pack_supplies(
+        [dict(item, quantity=1) for item in items], capacity, mode='exact'
+    )
+    selected_items = [item for item, count in zip(items, counts) if count]
+    return selected_items, total_utility
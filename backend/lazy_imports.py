@@ -0,0 +1,34 @@
+"""Deferred imports for heavy optional-path dependencies.
+
+NumPy is only needed by the optimization endpoints, but importing it costs a
+noticeable slice of a cold start.  Modules bind ``np = lazy_import('numpy')``
+instead, and the real import happens on first attribute access -- or earlier
+if ``warm`` pulls it in on a background thread once the server is up.
+"""
+import importlib
+
+
+class LazyModule:
+    """Stand-in for a module that is imported on first attribute access"""
+
+    def __init__(self, name):
+        self.__dict__['_name'] = name
+
+    def __getattr__(self, attr):
+        value = getattr(importlib.import_module(self._name), attr)
+        # Later lookups of the same attribute skip __getattr__ entirely
+        self.__dict__[attr] = value
+        return value
+
+    def __repr__(self):
+        return f'<lazy module {self._name!r}>'
+
+
+def lazy_import(name):
+    return LazyModule(name)
+
+
+def warm(*names):
+    """Import ``names`` now; safe to call from a worker thread"""
+    for name in names:
+        importlib.import_module(name)
@@ -0,0 +1,90 @@
+"""Server-sent event feed of changes for live dashboards.
+
+Every change is appended once, already serialized, to a bounded in-memory
+log under a sequence number.  Subscribers keep only a cursor into that log
+and wait on a shared wake-up event, so publishing costs the same no matter
+how many clients are connected and no per-client queue grows.  A client
+that reconnects with ``Last-Event-ID`` (or ``?since=``) is replayed what it
+missed; one that fell out of the log is told to reload instead.
+"""
+import asyncio
+import json
+from collections import deque
+from itertools import islice
+
+# Events kept for clients resuming after a disconnect
+HISTORY_SIZE = 10000
+
+# Seconds between keep-alive comments on an idle stream
+KEEPALIVE_SECONDS = 15
+
+
+def _frame(seq, event, data):
+    return f'id: {seq}\nevent: {event}\ndata: {json.dumps(data)}\n\n'.encode()
+
+
+class EventLog:
+    """Append-only, bounded log of ``(seq, topic, frame)`` entries"""
+
+    def __init__(self, history=HISTORY_SIZE):
+        self.seq = 0
+        self._entries = deque(maxlen=history)
+        self._wakeup = asyncio.Event()
+
+    def publish(self, event, data):
+        """Record an event such as ``message.created``; its topic is the part before the dot"""
+        self.seq += 1
+        self._entries.append((self.seq, event.split('.', 1)[0], _frame(self.seq, event, data)))
+        # Wake every waiting subscriber at once and arm a fresh event
+        wakeup, self._wakeup = self._wakeup, asyncio.Event()
+        wakeup.set()
+        return self.seq
+
+    def since(self, seq):
+        """Entries after ``seq``, or None if some of them were already dropped"""
+        if seq >= self.seq:
+            return []
+        oldest = self._entries[0][0] if self._entries else self.seq + 1
+        if seq + 1 < oldest:
+            return None
+        # New entries sit at the right end; walk only those
+        newer = list(islice(reversed(self._entries), self.seq - seq))
+        newer.reverse()
+        return newer
+
+    async def wait(self, seq, timeout):
+        """Block until an event after ``seq`` exists or ``timeout`` passes"""
+        if self.seq > seq:
+            return
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    async def stream(self, since=None, topics=None):
+        """Byte frames for one subscriber, replaying from ``since`` if given"""
+        if since is None or since > self.seq:
+            # Fresh subscribers and ones from before a restart start at the head
+            if since is not None:
+                yield _frame(self.seq, 'reset', {'seq': self.seq})
+            else:
+                yield _frame(self.seq, 'ready', {'seq': self.seq})
+            cursor = self.seq
+        else:
+            cursor = since
+
+        while True:
+            entries = self.since(cursor)
+            if entries is None:
+                # Fell behind the retained history: the client must reload
+                cursor = self.seq
+                yield _frame(cursor, 'reset', {'seq': cursor})
+                continue
+            for seq, topic, frame in entries:
+                if topics is None or topic in topics:
+                    yield frame
+                cursor = seq
+            if not entries:
+                await self.wait(cursor, KEEPALIVE_SECONDS)
+                if self.seq == cursor:
+                    yield b': keep-alive\n\n'
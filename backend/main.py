@@ -1,16 +1,104 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import Body, FastAPI, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-import sqlite3
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+import asyncio
+import base64
 import json
-from datetime import datetime
-import random
+import os
+from datetime import datetime, timezone
 from typing import List, Dict, Any, Optional
-import heapq
-import networkx as nx
-import numpy as np
 
-app = FastAPI(title="OptiRelief API", description="Smart Resource Distribution for Disaster Relief")
+from area_priority import AreaPriorityIndex
+from area_scoring import (
+    DEFAULT_WEIGHTS as DEFAULT_URGENCY_WEIGHTS, DELAY_CAP_HOURS, POPULATION_CAP, SEVERITY_SCALE,
+    AreaColumnCache, top_k, urgency_scores
+)
+from batch_routing import route_table
+from contraction import HierarchyCache
+import dashboard
+from database import db
+from dynamic_routing import CenterTreeCache
+from keyword_scanner import DEFAULT_WEIGHT as DEFAULT_KEYWORD_WEIGHT, KeywordLexicon, urgency_level_for
+from knapsack import pack_fleet, pack_supplies
+from lazy_imports import warm
+from live_updates import EventLog
+from message_search import fts_query, search_messages
+from metrics import MetricsMiddleware, instrument, phase, registry as metrics_registry
+from migrations import migrate
+from profiler import MAX_DURATION_S as MAX_PROFILE_SECONDS, SamplingProfiler
+from response_cache import ResponseCache
+from result_cache import ResultCache
+from road_graph import RoadGraph, RoadGraphCache, center_location, shared_graph
+from route_matrix import DispatchRoutes
+from solver_jobs import SolverJobs, SolverPool, SolverTimeout, TooManyJobs
+from spatial_index import CenterIndexCache
+from tour_planner import UnreachableStops, plan_tour
+from volunteer_assignment import assign_volunteers_optimal
+
+class TimedJSONResponse(JSONResponse):
+    """JSON responses whose encoding time counts toward the request's metrics"""
+
+    def render(self, content):
+        with phase('encode'):
+            return super().render(content)
+
+app = FastAPI(
+    title="OptiRelief API",
+    description="Smart Resource Distribution for Disaster Relief",
+    default_response_class=TimedJSONResponse
+)
+
+solvers = SolverPool()
+road_graph = RoadGraphCache(db)
+center_trees = CenterTreeCache(db, road_graph, solvers)
+dispatch_routes = DispatchRoutes(center_trees, solvers)
+hierarchy = HierarchyCache()
+keyword_lexicon = KeywordLexicon(db)
+live_events = EventLog()
+solver_jobs = SolverJobs(on_update=lambda job: live_events.publish('job.updated', job))
+responses = ResponseCache()
+results = ResultCache(
+    max_entries=int(os.environ.get('OPTIRELIEF_RESULT_CACHE_ENTRIES', '1024')),
+    ttl=int(os.environ.get('OPTIRELIEF_RESULT_CACHE_TTL', '3600')),
+    database=db if os.environ.get('OPTIRELIEF_RESULT_CACHE_PERSIST', '1') == '1' else None
+)
+center_index = CenterIndexCache(db)
+profiler = SamplingProfiler()
+
+# The sampling profiler endpoints only work when this is set to 1
+PROFILER_ENABLED = os.environ.get('OPTIRELIEF_PROFILER') == '1'
+
+# Solver inputs up to these sizes run on the event loop; larger ones go to
+# a worker process (see solver_jobs.py)
+INLINE_KNAPSACK_CELLS = 1_000_000  # items x total capacity
+INLINE_ASSIGNMENT_PAIRS = 50_000  # volunteers x region slots
+INLINE_ROUTE_NODES = 20_000
+INLINE_TOUR_STOPS = 10
+
+# Committed fleet plans are re-solved this many times when the stock
+# changes between planning and applying them
+FLEET_COMMIT_ATTEMPTS = 3
+
+# Largest /api/multi-dispatch request; it returns a route for every pair
+MAX_DISPATCH_CENTERS = 200
+
+# Largest /api/routes/batch tables, in source x target pairs
+MAX_ROUTE_BATCH_PAIRS = 250_000
+MAX_ROUTE_BATCH_PATH_PAIRS = 10_000
+
+# Background jobs run for this long unless submitted with timeout_s
+JOB_TIMEOUT_S = 300
+MAX_JOB_TIMEOUT_S = 3600
+
+# Tour improvement stops after this long unless the request asks otherwise
+TOUR_TIME_BUDGET_MS = 1000
+MAX_TOUR_TIME_BUDGET_MS = 30000
+
+# Bulk ingestion writes messages in transactions of this many rows, and
+# at most MAX_PENDING_CHUNKS transactions may queue for the writer at once
+INGEST_CHUNK_SIZE = 500
+MAX_PENDING_CHUNKS = 8
+ingest_slots = asyncio.Semaphore(MAX_PENDING_CHUNKS)
 
 # Enable CORS
 from fastapi.middleware.cors import CORSMiddleware
@@ -26,360 +114,71 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
+app.add_middleware(MetricsMiddleware)
 
 
 # Database initialization
 def init_database():
-    conn = sqlite3.connect('optirelief.db')
-    cursor = conn.cursor()
-    
-    # Create tables
-    cursor.executescript('''
-        CREATE TABLE IF NOT EXISTS affected_areas (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT NOT NULL,
-            severity INTEGER NOT NULL,
-            population INTEGER NOT NULL,
-            delay_time INTEGER NOT NULL,
-            urgency_score REAL DEFAULT 0
-        );
-        
-        CREATE TABLE IF NOT EXISTS volunteers (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT NOT NULL,
-            skills TEXT NOT NULL,
-            location TEXT NOT NULL,
-            status TEXT DEFAULT 'available',
-            assigned_to TEXT
-        );
-        
-        CREATE TABLE IF NOT EXISTS supply_items (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            item_name TEXT NOT NULL,
-            weight INTEGER NOT NULL,
-            utility INTEGER NOT NULL,
-            quantity INTEGER NOT NULL
-        );
-        
-        CREATE TABLE IF NOT EXISTS requests (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            message TEXT NOT NULL,
-            source TEXT NOT NULL,
-            timestamp TEXT DEFAULT CURRENT_TIMESTAMP,
-            urgency_score INTEGER DEFAULT 0,
-            urgency_level TEXT DEFAULT 'low',
-            keywords_found TEXT
-        );
-        
-        CREATE TABLE IF NOT EXISTS location_graph (
-            from_loc TEXT,
-            to_loc TEXT,
-            distance INTEGER,
-            PRIMARY KEY (from_loc, to_loc)
-        );
-        
-        CREATE TABLE IF NOT EXISTS dispatch_centers (
-            id TEXT PRIMARY KEY,
-            name TEXT NOT NULL,
-            latitude REAL NOT NULL,
-            longitude REAL NOT NULL
-        );
-    ''')
-    
-    # Insert sample data
-    sample_areas = [
-        ('Downtown District', 8, 50000, 2),
-        ('Riverside Community', 6, 25000, 4),
-        ('Industrial Zone', 9, 15000, 1),
-        ('Suburban Area', 4, 80000, 6),
-        ('Mountain Village', 7, 5000, 8)
-    ]
-    
-    sample_volunteers = [
-        ('Alice Johnson', 'Medical, First Aid', 'Downtown', 'available'),
-        ('Bob Smith', 'Search and Rescue, Engineering', 'Riverside', 'available'),
-        ('Carol Davis', 'Communications, Logistics', 'Industrial', 'available'),
-        ('David Wilson', 'Medical, Psychology', 'Suburban', 'available'),
-        ('Eve Brown', 'Engineering, Technical', 'Mountain', 'available'),
-        ('Frank Miller', 'Logistics, Transportation', 'Downtown', 'available')
-    ]
-    
-    sample_supplies = [
-        ('Water Bottles', 2, 9, 100),
-        ('Medical Kit', 5, 10, 20),
-        ('Blankets', 3, 7, 50),
-        ('Food Rations', 4, 8, 75),
-        ('Flashlights', 1, 6, 40),
-        ('Radio Equipment', 8, 9, 10),
-        ('Tents', 15, 8, 15),
-        ('Batteries', 1, 5, 200)
-    ]
-    
-    sample_locations = [
-        ('A', 'B', 10),
-        ('A', 'C', 15),
-        ('B', 'C', 12),
-        ('B', 'D', 8),
-        ('C', 'D', 20),
-        ('C', 'E', 18),
-        ('D', 'E', 6),
-        ('E', 'F', 14),
-        ('F', 'A', 25)
-    ]
-    
-    sample_centers = [
-        ('center_a', 'Emergency Response Center A', 40.7128, -74.0060),
-        ('center_b', 'Relief Distribution Hub B', 40.7614, -73.9776),
-        ('center_c', 'Medical Support Base C', 40.6892, -74.0445),
-        ('center_d', 'Logistics Center D', 40.7489, -73.9857),
-        ('center_e', 'Command Post E', 40.7282, -74.0776)
-    ]
-    
-    cursor.executemany('INSERT OR IGNORE INTO affected_areas (name, severity, population, delay_time) VALUES (?, ?, ?, ?)', sample_areas)
-    cursor.executemany('INSERT OR IGNORE INTO volunteers (name, skills, location, status) VALUES (?, ?, ?, ?)', sample_volunteers)
-    cursor.executemany('INSERT OR IGNORE INTO supply_items (item_name, weight, utility, quantity) VALUES (?, ?, ?, ?)', sample_supplies)
-    cursor.executemany('INSERT OR IGNORE INTO location_graph (from_loc, to_loc, distance) VALUES (?, ?, ?)', sample_locations)
-    cursor.executemany('INSERT OR IGNORE INTO dispatch_centers (id, name, latitude, longitude) VALUES (?, ?, ?, ?)', sample_centers)
-    
-    conn.commit()
-    conn.close()
+    # A single PRAGMA read once the schema is current
+    with db.writer() as conn:
+        migrate(conn)
 
-# Initialize database on startup
 init_database()
 
-# Algorithm Implementations
+@app.on_event("startup")
+async def warm_heavy_imports():
+    # NumPy is imported lazily; load it on a worker thread while the server
+    # starts accepting requests rather than before
+    asyncio.get_running_loop().run_in_executor(None, warm, 'numpy')
 
-def merge_sort_priority(areas):
-    """Merge Sort implementation for priority sorting"""
-    if len(areas) <= 1:
-        return areas
-    
-    mid = len(areas) // 2
-    left = merge_sort_priority(areas[:mid])
-    right = merge_sort_priority(areas[mid:])
-    
-    return merge(left, right)
+@app.on_event("shutdown")
+async def close_solvers():
+    await solver_jobs.close()
+    solvers.close()
 
-def merge(left, right):
-    """Merge function for merge sort"""
-    result = []
-    i = j = 0
-    
-    while i < len(left) and j < len(right):
-        # Calculate urgency scores
-        left_score = calculate_urgency_score(left[i])
-        right_score = calculate_urgency_score(right[j])
-        
-        if left_score >= right_score:
-            result.append(left[i])
-            i += 1
-        else:
-            result.append(right[j])
-            j += 1
-    
-    result.extend(left[i:])
-    result.extend(right[j:])
-    return result
+@app.on_event("shutdown")
+def close_database():
+    db.close()
+
+@app.exception_handler(SolverTimeout)
+async def solver_timeout(request: Request, exc: SolverTimeout):
+    return JSONResponse(status_code=504, content={'detail': str(exc)})
+
+def knapsack_cells(items, capacities):
+    """Rough dynamic-programming table size of a packing request"""
+    try:
+        return len(items) * sum(capacities)
+    except TypeError:
+        # Left to the solver to reject
+        return 0
 
-def calculate_urgency_score(area):
+# Algorithm Implementations
+
+def calculate_urgency_score(area, weights=DEFAULT_URGENCY_WEIGHTS):
     """Calculate urgency score based on severity, population, and delay"""
-    severity_weight = 40
-    population_weight = 30
-    delay_weight = 30
-    
     # Normalize values
-    severity_normalized = area['severity'] / 10
-    population_normalized = min(area['population'] / 100000, 1)
-    delay_normalized = min(area['delay_time'] / 24, 1)
+    severity_normalized = area['severity'] / SEVERITY_SCALE
+    population_normalized = min(area['population'] / POPULATION_CAP, 1)
+    delay_normalized = min(area['delay_time'] / DELAY_CAP_HOURS, 1)
     
-    score = (severity_normalized * severity_weight + 
-             population_normalized * population_weight + 
-             delay_normalized * delay_weight)
+    score = (severity_normalized * weights['severity'] + 
+             population_normalized * weights['population'] + 
+             delay_normalized * weights['delay'])
     
     return score
 
-def dijkstra_shortest_path(graph, start, end):
-    """Dijkstra's algorithm for shortest path"""
+@instrument(size='graph')
+def dijkstra_shortest_path(graph, start, end, astar=False):
+    """Heap-based Dijkstra (or A*) shortest path on a RoadGraph"""
     if start == end:
         return [start], 0
     
-    distances = {node: float('infinity') for node in graph.nodes()}
-    distances[start] = 0
-    previous = {}
-    unvisited = list(graph.nodes())
-    
-    while unvisited:
-        current = min(unvisited, key=lambda node: distances[node])
-        if distances[current] == float('infinity'):
-            break
-            
-        unvisited.remove(current)
-        
-        if current == end:
-            path = []
-            while current in previous:
-                path.append(current)
-                current = previous[current]
-            path.append(start)
-            return path[::-1], distances[end]
-        
-        for neighbor in graph.neighbors(current):
-            if neighbor in unvisited:
-                edge_weight = graph[current][neighbor].get('weight', 1)
-                new_distance = distances[current] + edge_weight
-                
-                if new_distance < distances[neighbor]:
-                    distances[neighbor] = new_distance
-                    previous[neighbor] = current
-    
-    return None, float('infinity')
-
-def knapsack_01(items, capacity):
-    """0/1 Knapsack dynamic programming solution"""
-    n = len(items)
-    dp = [[0 for _ in range(capacity + 1)] for _ in range(n + 1)]
-    
-    for i in range(1, n + 1):
-        for w in range(1, capacity + 1):
-            weight = items[i-1]['weight']
-            utility = items[i-1]['utility']
-            
-            if weight <= w:
-                dp[i][w] = max(dp[i-1][w], dp[i-1][w-weight] + utility)
-            else:
-                dp[i][w] = dp[i-1][w]
-    
-    # Backtrack to find selected items
-    selected_items = []
-    w = capacity
-    for i in range(n, 0, -1):
-        if dp[i][w] != dp[i-1][w]:
-            selected_items.append(items[i-1])
-            w -= items[i-1]['weight']
-    
-    return selected_items, dp[n][capacity]
-
-def boyer_moore_search(text, pattern):
-    """Boyer-Moore string matching algorithm"""
-    def build_bad_char_table(pattern):
-        table = {}
-        for i in range(len(pattern)):
-            table[pattern[i]] = i
-        return table
-    
-    text = text.lower()
-    pattern = pattern.lower()
-    bad_char_table = build_bad_char_table(pattern)
-    
-    matches = []
-    m = len(pattern)
-    n = len(text)
-    s = 0
-    
-    while s <= n - m:
-        j = m - 1
-        
-        while j >= 0 and pattern[j] == text[s + j]:
-            j -= 1
-        
-        if j < 0:
-            matches.append(s)
-            s += (m - bad_char_table.get(text[s + m], -1) - 1) if s + m < n else 1
-        else:
-            s += max(1, j - bad_char_table.get(text[s + j], -1))
-    
-    return matches
-
-def floyd_warshall(graph_matrix):
-    """Floyd-Warshall algorithm for all-pairs shortest paths"""
-    n = len(graph_matrix)
-    dist = [row[:] for row in graph_matrix]  # Deep copy
-    
-    for k in range(n):
-        for i in range(n):
-            for j in range(n):
-                if dist[i][k] + dist[k][j] < dist[i][j]:
-                    dist[i][j] = dist[i][k] + dist[k][j]
-    
-    return dist
+    return graph.shortest_path(start, end, astar=astar)
 
-def backtrack_volunteer_assignment(volunteers, regions):
-    """Backtracking algorithm for volunteer assignment"""
-    assignments = []
-    used_volunteers = set()
-    
-    def can_assign(volunteer, region):
-        # Simple matching logic based on skills and location
-        if volunteer['id'] in used_volunteers:
-            return False
-        
-        skills = volunteer['skills'].lower()
-        location = volunteer['location'].lower()
-        region_lower = region.lower()
-        
-        # Calculate match score
-        skill_match = 0
-        if 'medical' in skills and ('medical' in region_lower or 'hospital' in region_lower):
-            skill_match += 30
-        if 'rescue' in skills and ('rescue' in region_lower or 'emergency' in region_lower):
-            skill_match += 30
-        if 'engineering' in skills and ('engineering' in region_lower or 'technical' in region_lower):
-            skill_match += 25
-        if 'logistics' in skills:
-            skill_match += 20
-        
-        # Location proximity bonus
-        if location in region_lower or region_lower in location:
-            skill_match += 20
-        
-        return skill_match >= 40
-    
-    def backtrack(region_idx):
-        if region_idx >= len(regions):
-            return True
-        
-        region = regions[region_idx]
-        
-        for volunteer in volunteers:
-            if can_assign(volunteer, region):
-                match_score = calculate_match_score(volunteer, region)
-                assignments.append({
-                    'volunteer': volunteer,
-                    'region': region,
-                    'match_score': match_score
-                })
-                used_volunteers.add(volunteer['id'])
-                
-                if backtrack(region_idx + 1):
-                    return True
-                
-                assignments.pop()
-                used_volunteers.remove(volunteer['id'])
-        
-        # Try to continue without assigning anyone to this region
-        return backtrack(region_idx + 1)
-    
-    def calculate_match_score(volunteer, region):
-        skills = volunteer['skills'].lower()
-        location = volunteer['location'].lower()
-        region_lower = region.lower()
-        
-        score = 50  # Base score
-        
-        if 'medical' in skills:
-            score += 20
-        if 'rescue' in skills:
-            score += 15
-        if 'engineering' in skills:
-            score += 10
-        if location in region_lower:
-            score += 15
-        
-        return min(score, 100)
-    
-    backtrack(0)
-    return assignments
+area_priority = AreaPriorityIndex(db, calculate_urgency_score)
+area_columns = AreaColumnCache(db)
 
 # API Endpoints
 
@@ -387,143 +186,272 @@ def backtrack_volunteer_assignment(volunteers, regions):
 async def root():
     return {"message": "OptiRelief API - Smart Resource Distribution for Disaster Relief"}
 
+@app.get("/metrics")
+async def get_metrics():
+    return PlainTextResponse(metrics_registry.render(), media_type='text/plain; version=0.0.4; charset=utf-8')
+
+def require_profiler():
+    if not PROFILER_ENABLED:
+        raise HTTPException(status_code=404, detail="Profiler is disabled; start the server with OPTIRELIEF_PROFILER=1")
+
+@app.post("/api/profiler/start")
+async def start_profiler(request_data: Optional[dict] = Body(None)):
+    require_profiler()
+    options = request_data or {}
+    interval_ms = options.get('interval_ms', 5)
+    duration_s = options.get('duration_s', 30)
+    if not isinstance(interval_ms, (int, float)) or not 1 <= interval_ms <= 1000:
+        raise HTTPException(status_code=400, detail="interval_ms must be between 1 and 1000")
+    if not isinstance(duration_s, (int, float)) or not 0 < duration_s <= MAX_PROFILE_SECONDS:
+        raise HTTPException(status_code=400, detail=f"duration_s must be between 0 and {MAX_PROFILE_SECONDS}")
+    
+    try:
+        profiler.start(interval_ms, duration_s)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return profiler.report(limit=0)
+
+@app.post("/api/profiler/stop")
+async def stop_profiler(limit: int = 100):
+    require_profiler()
+    await asyncio.to_thread(profiler.stop)
+    return profiler.report(limit)
+
+@app.get("/api/profiler")
+async def get_profile(limit: int = 100, format: str = 'json'):
+    require_profiler()
+    if format == 'collapsed':
+        # One "frame;frame;frame count" line per stack, for flame graph tools
+        return PlainTextResponse(profiler.collapsed())
+    if format != 'json':
+        raise HTTPException(status_code=400, detail="format must be 'json' or 'collapsed'")
+    return profiler.report(limit)
+
 @app.get("/api/dashboard/stats")
 async def get_dashboard_stats():
-    conn = sqlite3.connect('optirelief.db')
-    cursor = conn.cursor()
+    # Counters are maintained by triggers, so this never scans a table
+    counters = await db.run(dashboard.read_counters)
+    requests_by_status = counters.get('requests_by_status', {})
+    volunteers_by_status = counters.get('volunteers_by_status', {})
     
     stats = {
-        'totalRequests': cursor.execute('SELECT COUNT(*) FROM requests').fetchone()[0],
-        'activeVolunteers': cursor.execute('SELECT COUNT(*) FROM volunteers WHERE status = "available"').fetchone()[0],
-        'deliveriesInProgress': random.randint(5, 15),
-        'resolvedCases': random.randint(20, 50)
+        'totalRequests': counters.get('requests', {}).get('', 0),
+        'activeVolunteers': volunteers_by_status.get('available', 0),
+        'deliveriesInProgress': requests_by_status.get('in_progress', 0),
+        'resolvedCases': requests_by_status.get('resolved', 0),
+        'affectedAreas': counters.get('areas', {}).get('', 0)
     }
     
-    conn.close()
     return stats
 
 @app.get("/api/dashboard/request-types")
 async def get_request_types():
-    return [
-        {'name': 'Medical', 'value': 35},
-        {'name': 'Food/Water', 'value': 28},
-        {'name': 'Shelter', 'value': 22},
-        {'name': 'Transportation', 'value': 15}
-    ]
+    counters = await db.run(dashboard.read_counters)
+    by_type = counters.get('requests_by_type', {})
+    names = list(dashboard.REQUEST_TYPES) + [dashboard.OTHER_REQUEST_TYPE]
+    return [{'name': name, 'value': by_type.get(name, 0)} for name in names]
 
 @app.get("/api/dashboard/priority-distribution")
 async def get_priority_distribution():
+    counters = await db.run(dashboard.read_counters)
+    # Older rows may carry lower-case levels
+    by_level = {}
+    for level, count in counters.get('requests_by_level', {}).items():
+        by_level[level.lower()] = by_level.get(level.lower(), 0) + count
     return [
-        {'priority': 'Critical', 'count': 8},
-        {'priority': 'High', 'count': 15},
-        {'priority': 'Medium', 'count': 22},
-        {'priority': 'Low', 'count': 12}
+        {'priority': level, 'count': by_level.get(level.lower(), 0)}
+        for level in dashboard.PRIORITY_LEVELS
     ]
 
+@app.post("/api/dashboard/rebuild")
+async def rebuild_dashboard():
+    classified = await db.run(dashboard.rebuild, write=True)
+    counters = await db.run(dashboard.read_counters)
+    return {'rebuilt': True, 'classified_requests': classified, 'counters': counters}
+
 @app.get("/api/areas")
-async def get_areas():
-    conn = sqlite3.connect('optirelief.db')
-    cursor = conn.cursor()
-    
-    cursor.execute('SELECT id, name, severity, population, delay_time, urgency_score FROM affected_areas')
-    areas = []
-    
-    for row in cursor.fetchall():
-        area = {
-            'id': row[0],
-            'name': row[1],
-            'severity': row[2],
-            'population': row[3],
-            'delay_time': row[4],
-            'urgency_score': row[5]
-        }
-        areas.append(area)
+async def get_areas(request: Request):
+    async def load():
+        # Backfills stored scores first, so the cached list is never stale
+        await area_priority.get()
+        rows = await db.fetchall('SELECT id, name, severity, population, delay_time, urgency_score FROM affected_areas')
+        areas = []
+        
+        for row in rows:
+            area = {
+                'id': row[0],
+                'name': row[1],
+                'severity': row[2],
+                'population': row[3],
+                'delay_time': row[4],
+                'urgency_score': row[5]
+            }
+            areas.append(area)
+        
+        return areas
     
-    conn.close()
-    return areas
+    return await responses.respond(request, 'areas', ('affected_areas',), load)
+
+@app.get("/api/areas/top")
+async def get_top_areas(
+    k: int = 20,
+    severity_weight: float = DEFAULT_URGENCY_WEIGHTS['severity'],
+    population_weight: float = DEFAULT_URGENCY_WEIGHTS['population'],
+    delay_weight: float = DEFAULT_URGENCY_WEIGHTS['delay']
+):
+    if k < 1:
+        raise HTTPException(status_code=400, detail="k must be at least 1")
+    
+    columns = await area_columns.get()
+    weights = {'severity': severity_weight, 'population': population_weight, 'delay': delay_weight}
+    
+    # Score every area at once, then partially select the k most urgent
+    scores = urgency_scores(columns.severity, columns.population, columns.delay_time, weights)
+    return [columns.area(i, scores[i]) for i in top_k(scores, columns.ids, k)]
 
 @app.post("/api/areas")
 async def add_area(area_data: dict):
-    conn = sqlite3.connect('optirelief.db')
-    cursor = conn.cursor()
-    
-    cursor.execute(
-        'INSERT INTO affected_areas (name, severity, population, delay_time) VALUES (?, ?, ?, ?)',
-        (area_data['name'], area_data['severity'], area_data['population'], area_data['delay_time'])
+    urgency_score = calculate_urgency_score(area_data)
+    area_id = await db.execute(
+        'INSERT INTO affected_areas (name, severity, population, delay_time, urgency_score) VALUES (?, ?, ?, ?, ?)',
+        (area_data['name'], area_data['severity'], area_data['population'], area_data['delay_time'], urgency_score)
     )
+    area_priority.set(area_id, urgency_score)
+    area_columns.invalidate()
+    responses.bump('affected_areas')
+    live_events.publish('area.created', {
+        'id': area_id,
+        'name': area_data['name'],
+        'severity': area_data['severity'],
+        'population': area_data['population'],
+        'delay_time': area_data['delay_time'],
+        'urgency_score': urgency_score
+    })
+    
+    return {"message": "Area added successfully", "id": area_id}
+
+@app.put("/api/areas/{area_id}")
+async def update_area(area_id: int, area_data: dict):
+    fields = [field for field in ('name', 'severity', 'population', 'delay_time') if field in area_data]
+    if not fields:
+        raise HTTPException(status_code=400, detail="Nothing to update")
+    
+    def save_area(conn):
+        row = conn.execute(
+            'SELECT name, severity, population, delay_time FROM affected_areas WHERE id = ?', (area_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        area = dict(zip(('name', 'severity', 'population', 'delay_time'), row))
+        area.update({field: area_data[field] for field in fields})
+        area['urgency_score'] = calculate_urgency_score(area)
+        conn.execute(
+            'UPDATE affected_areas SET name = ?, severity = ?, population = ?, delay_time = ?, urgency_score = ? WHERE id = ?',
+            (area['name'], area['severity'], area['population'], area['delay_time'], area['urgency_score'], area_id)
+        )
+        return area
+    
+    area = await db.run(save_area, write=True)
+    if area is None:
+        raise HTTPException(status_code=404, detail="Area not found")
+    area_priority.set(area_id, area['urgency_score'])
+    area_columns.invalidate()
+    responses.bump('affected_areas')
+    live_events.publish('area.updated', {'id': area_id, **area})
     
-    conn.commit()
-    conn.close()
-    return {"message": "Area added successfully"}
+    return {'id': area_id, **area}
 
 @app.post("/api/sort-priority")
-async def sort_priority():
-    conn = sqlite3.connect('optirelief.db')
-    cursor = conn.cursor()
-    
-    cursor.execute('SELECT id, name, severity, population, delay_time FROM affected_areas')
-    areas = []
+async def sort_priority(limit: Optional[int] = None):
+    # Scores are maintained on every write, so the order comes straight from
+    # the urgency index (or the top of the in-memory heap) without sorting
+    heap = await area_priority.get()
+    
+    if limit is not None:
+        top = heap.top(limit)
+        rows = await db.fetchall(
+            f"SELECT id, name, severity, population, delay_time, urgency_score FROM affected_areas "
+            f"WHERE id IN ({', '.join('?' * len(top))})",
+            [area_id for area_id, _ in top]
+        )
+        by_id = {row[0]: row for row in rows}
+        rows = [by_id[area_id] for area_id, _ in top if area_id in by_id]
+    else:
+        rows = await db.fetchall(
+            'SELECT id, name, severity, population, delay_time, urgency_score FROM affected_areas '
+            'ORDER BY urgency_score DESC, id'
+        )
     
-    for row in cursor.fetchall():
-        area = {
+    sorted_areas = []
+    for row in rows:
+        sorted_areas.append({
             'id': row[0],
             'name': row[1],
             'severity': row[2],
             'population': row[3],
-            'delay_time': row[4]
-        }
-        areas.append(area)
-    
-    # Sort using merge sort
-    sorted_areas = merge_sort_priority(areas)
-    
-    # Update urgency scores in database
-    for area in sorted_areas:
-        urgency_score = calculate_urgency_score(area)
-        cursor.execute(
-            'UPDATE affected_areas SET urgency_score = ? WHERE id = ?',
-            (urgency_score, area['id'])
-        )
-        area['urgency_score'] = urgency_score
-    
-    conn.commit()
-    conn.close()
+            'delay_time': row[4],
+            'urgency_score': row[5]
+        })
     
     return sorted_areas
 
+# Mock location data
+LOCATIONS = [
+    {'id': 'A', 'name': 'Emergency Center A', 'coordinates': [40.7128, -74.0060]},
+    {'id': 'B', 'name': 'Relief Hub B', 'coordinates': [40.7614, -73.9776]},
+    {'id': 'C', 'name': 'Medical Base C', 'coordinates': [40.6892, -74.0445]},
+    {'id': 'D', 'name': 'Supply Depot D', 'coordinates': [40.7489, -73.9857]},
+    {'id': 'E', 'name': 'Command Post E', 'coordinates': [40.7282, -74.0776]},
+    {'id': 'F', 'name': 'Distribution Point F', 'coordinates': [40.7505, -73.9934]}
+]
+
 @app.get("/api/locations")
-async def get_locations():
-    # Mock location data
-    locations = [
-        {'id': 'A', 'name': 'Emergency Center A', 'coordinates': [40.7128, -74.0060]},
-        {'id': 'B', 'name': 'Relief Hub B', 'coordinates': [40.7614, -73.9776]},
-        {'id': 'C', 'name': 'Medical Base C', 'coordinates': [40.6892, -74.0445]},
-        {'id': 'D', 'name': 'Supply Depot D', 'coordinates': [40.7489, -73.9857]},
-        {'id': 'E', 'name': 'Command Post E', 'coordinates': [40.7282, -74.0776]},
-        {'id': 'F', 'name': 'Distribution Point F', 'coordinates': [40.7505, -73.9934]}
-    ]
-    return locations
+async def get_locations(request: Request):
+    async def load():
+        return LOCATIONS
+    
+    return await responses.respond(request, 'locations', (), load)
+
+async def center_route(start, end):
+    """``(graph, path, distance)`` read off a dispatch center's shortest-path
+    tree when either end is a center whose tree is cached, else None"""
+    for root, target in ((start, end), (end, start)):
+        tree = await center_trees.cached(root)
+        if tree is not None:
+            graph, dist, prev = tree
+            path, distance = center_trees.path(graph, dist, prev, graph.index[root], target)
+            if path is not None and root == end:
+                path.reverse()
+            return graph, path, distance
+    return None
 
 @app.get("/api/shortest-route")
-async def get_shortest_route(start: str = None, end: str = None):
+async def get_shortest_route(start: str = None, end: str = None, algorithm: str = 'dijkstra'):
     if not start or not end:
         raise HTTPException(status_code=400, detail="Start and end locations required")
+    if algorithm not in ('dijkstra', 'astar'):
+        raise HTTPException(status_code=400, detail="Algorithm must be 'dijkstra' or 'astar'")
     
-    conn = sqlite3.connect('optirelief.db')
-    cursor = conn.cursor()
-    
-    # Build graph
-    cursor.execute('SELECT from_loc, to_loc, distance FROM location_graph')
-    edges = cursor.fetchall()
-    
-    G = nx.Graph()
-    for from_loc, to_loc, distance in edges:
-        G.add_edge(from_loc, to_loc, weight=distance)
-    
-    conn.close()
+    graph = await road_graph.get()
     
     try:
-        path, distance = dijkstra_shortest_path(G, start, end)
+        astar = algorithm == 'astar'
+        # Cached trees and the hierarchy give Dijkstra's answer; an explicit
+        # A* request runs A*
+        found = await center_route(start, end) if start != end and not astar else None
+        ch = hierarchy.get(graph) if found is None and not astar else None
+        if found is not None:
+            graph, path, distance = found
+        elif ch is not None:
+            # Built offline for exactly this graph; stale after any road change
+            path, distance = ch.shortest_path(start, end)
+        elif start == end or len(graph) <= INLINE_ROUTE_NODES:
+            path, distance = dijkstra_shortest_path(graph, start, end, astar=astar)
+        else:
+            # Same search as dijkstra_shortest_path, without importing main in the worker
+            path, distance = await solvers.run(
+                RoadGraph.shortest_path, shared_graph(graph), start, end, astar, name='dijkstra_shortest_path'
+            )
         
         if path is None:
             raise HTTPException(status_code=404, detail="No route found")
@@ -531,7 +459,7 @@ async def get_shortest_route(start: str = None, end: str = None):
         # Create steps
         steps = []
         for i in range(len(path) - 1):
-            edge_weight = G[path[i]][path[i+1]]['weight']
+            edge_weight = graph.edge_weight(path[i], path[i+1])
             steps.append({
                 'from': path[i],
                 'to': path[i+1],
@@ -545,80 +473,403 @@ async def get_shortest_route(start: str = None, end: str = None):
             'steps': steps
         }
     
+    except (HTTPException, SolverTimeout):
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.get("/api/supply-items")
-async def get_supply_items():
-    conn = sqlite3.connect('optirelief.db')
-    cursor = conn.cursor()
+@app.post("/api/routes/batch")
+async def batch_routes(request_data: dict):
+    """Distance matrix (and optionally paths) from one or many sources to many targets"""
+    sources = request_data.get('sources')
+    if sources is None and 'source' in request_data:
+        sources = [request_data['source']]
+    targets = request_data.get('targets')
+    include_paths = bool(request_data.get('paths', False))
+    for name, nodes in (('sources', sources), ('targets', targets)):
+        if not isinstance(nodes, list) or not nodes or not all(isinstance(node, str) for node in nodes):
+            raise HTTPException(status_code=400, detail=f"{name} must be a non-empty list of locations")
+    limit = MAX_ROUTE_BATCH_PATH_PAIRS if include_paths else MAX_ROUTE_BATCH_PAIRS
+    if len(sources) * len(targets) > limit:
+        raise HTTPException(status_code=400, detail=f"At most {limit} source x target pairs per request")
+    
+    graph = await road_graph.get()
+    
+    unknown = [location for location in dict.fromkeys(sources + targets) if location not in graph]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown locations: {', '.join(unknown)}")
+    
+    async def build():
+        # One search per distinct node on the smaller side
+        searches = min(len(set(sources)), len(set(targets)))
+        table = await solvers.call(
+            route_table, shared_graph(graph), sources, targets, include_paths,
+            inline=searches * len(graph) <= INLINE_ROUTE_NODES
+        )
+        response = {
+            'sources': sources,
+            'targets': targets,
+            'distances': table['distances'],
+            'searches': table['searches']
+        }
+        if include_paths:
+            response['paths'] = table['paths']
+        return response
     
-    cursor.execute('SELECT id, item_name, weight, utility, quantity FROM supply_items')
-    items = []
+    return await results.get_or_compute('routes-batch', [sources, targets, include_paths, graph.signature], build)
+
+@app.post("/api/tour")
+async def plan_delivery_tour(request_data: dict):
+    depot = request_data.get('depot')
+    stops = request_data.get('stops') or []
+    return_to_depot = request_data.get('return_to_depot', True)
+    time_budget_ms = request_data.get('time_budget_ms', TOUR_TIME_BUDGET_MS)
+    if not isinstance(depot, str) or not isinstance(stops, list) or not stops or not all(isinstance(s, str) for s in stops):
+        raise HTTPException(status_code=400, detail="A depot and at least one stop are required")
+    if not isinstance(time_budget_ms, (int, float)) or not 0 <= time_budget_ms <= MAX_TOUR_TIME_BUDGET_MS:
+        raise HTTPException(status_code=400, detail=f"time_budget_ms must be between 0 and {MAX_TOUR_TIME_BUDGET_MS}")
+    
+    graph = await road_graph.get()
+    
+    unknown = [location for location in [depot, *stops] if location not in graph]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown locations: {', '.join(map(str, unknown))}")
     
-    for row in cursor.fetchall():
-        items.append({
-            'id': row[0],
-            'item_name': row[1],
-            'weight': row[2],
-            'utility': row[3],
-            'quantity': row[4]
-        })
+    try:
+        tour = await solvers.call(
+            plan_tour, shared_graph(graph), depot, stops, bool(return_to_depot), time_budget_ms,
+            inline=len(stops) <= INLINE_TOUR_STOPS
+        )
+    except UnreachableStops as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    tour['depot'] = depot
+    tour['estimated_time'] = int(tour['total_distance'] * 5)  # Assume 5 min per unit
+    return tour
+
+@app.post("/api/location-graph")
+async def add_road_edge(edge_data: dict):
+    from_loc, to_loc, distance = edge_data.get('from_loc'), edge_data.get('to_loc'), edge_data.get('distance')
+    if not isinstance(from_loc, str) or not isinstance(to_loc, str):
+        raise HTTPException(status_code=400, detail="from_loc and to_loc are required")
+    if not isinstance(distance, (int, float)) or distance < 0:
+        raise HTTPException(status_code=400, detail="Distance must be a non-negative number")
+    
+    def save_edge(conn):
+        # Roads are undirected, so a row stored in the reverse direction is
+        # the same road.  Existing roads change through the actions below,
+        # which keep their closure state and log an event
+        existing = conn.execute(
+            'SELECT 1 FROM location_graph WHERE (from_loc = ? AND to_loc = ?) OR (from_loc = ? AND to_loc = ?)',
+            (from_loc, to_loc, to_loc, from_loc)
+        ).fetchone()
+        if existing is not None:
+            raise HTTPException(
+                status_code=409,
+                detail="Road already exists; use /api/location-graph/reweight, /close or /reopen to change it"
+            )
+        conn.execute(
+            'INSERT INTO location_graph (from_loc, to_loc, distance) VALUES (?, ?, ?)',
+            (from_loc, to_loc, distance)
+        )
+    
+    async with road_edits:
+        await db.run(save_edge, write=True)
+        await apply_road_change(from_loc, to_loc, distance)
+    return {"message": "Road edge saved successfully"}
+
+# Road edits commit and patch the cached graph one at a time, so the graph
+# applies them in the order the table did
+road_edits = asyncio.Lock()
+
+# Road actions and the live event each publishes
+ROAD_ACTIONS = {'close': 'road.closed', 'reopen': 'road.reopened', 'reweight': 'road.reweighted'}
+
+async def apply_road_change(from_loc, to_loc, distance):
+    """Patch the cached graph and what is derived from it after a committed
+    change of one road to ``distance`` (None when closed)"""
+    old_graph, graph = road_graph.apply_edge(from_loc, to_loc, distance)
+    repair = center_trees.edge_changed(
+        old_graph, graph, from_loc, to_loc,
+        old_graph.weight_or_none(from_loc, to_loc) if old_graph is not None else None,
+        graph.weight_or_none(from_loc, to_loc) if graph is not None else None
+    )
+    return repair
+
+@app.post("/api/location-graph/{action}")
+async def change_road(action: str, edge_data: dict):
+    """Close, reopen or reweight an existing road.
+
+    ``reported_at`` (ISO-8601, default now) orders reports: one older than
+    the road's last change is rejected.  Cached center routes are repaired
+    in place rather than recomputed.
+    """
+    if action not in ROAD_ACTIONS:
+        raise HTTPException(status_code=404, detail=f"Action must be one of: {', '.join(ROAD_ACTIONS)}")
+    from_loc, to_loc = edge_data.get('from_loc'), edge_data.get('to_loc')
+    distance = edge_data.get('distance')
+    note = edge_data.get('note')
+    if not isinstance(from_loc, str) or not isinstance(to_loc, str):
+        raise HTTPException(status_code=400, detail="from_loc and to_loc are required")
+    if action == 'reweight' and (not isinstance(distance, (int, float)) or distance < 0):
+        raise HTTPException(status_code=400, detail="Distance must be a non-negative number")
+    if 'reported_at' in edge_data:
+        reported_at = to_db_timestamp(edge_data['reported_at'], 'reported_at')
+    else:
+        reported_at = datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+    
+    def record(conn):
+        row = conn.execute(
+            'SELECT from_loc, to_loc, distance, closed_at, updated_at FROM location_graph '
+            'WHERE (from_loc = ? AND to_loc = ?) OR (from_loc = ? AND to_loc = ?)',
+            (from_loc, to_loc, to_loc, from_loc)
+        ).fetchone()
+        if row is None:
+            raise HTTPException(status_code=404, detail="Road not found")
+        stored_from, stored_to, stored_distance, closed_at, updated_at = row
+        if updated_at is not None and reported_at < updated_at:
+            raise HTTPException(status_code=409, detail=f"Road has a newer report from {updated_at}")
+        if action == 'close' and closed_at is not None:
+            raise HTTPException(status_code=409, detail="Road is already closed")
+        if action == 'reopen' and closed_at is None:
+            raise HTTPException(status_code=409, detail="Road is not closed")
+        
+        if action == 'close':
+            closed_at = reported_at
+        elif action == 'reopen':
+            closed_at = None
+        new_distance = distance if action == 'reweight' else stored_distance
+        conn.execute(
+            'UPDATE location_graph SET distance = ?, closed_at = ?, updated_at = ? WHERE from_loc = ? AND to_loc = ?',
+            (new_distance, closed_at, reported_at, stored_from, stored_to)
+        )
+        event_id = conn.execute(
+            'INSERT INTO road_events (from_loc, to_loc, action, distance, reported_at, note) VALUES (?, ?, ?, ?, ?, ?)',
+            (stored_from, stored_to, action, new_distance, reported_at, note)
+        ).lastrowid
+        edge = {
+            'from_loc': stored_from,
+            'to_loc': stored_to,
+            'distance': new_distance,
+            'closed': closed_at is not None,
+            'closed_at': closed_at,
+            'updated_at': reported_at
+        }
+        return event_id, edge
+    
+    async with road_edits:
+        event_id, edge = await db.run(record, write=True)
+        repair = await apply_road_change(edge['from_loc'], edge['to_loc'], None if edge['closed'] else edge['distance'])
     
-    conn.close()
-    return items
+    live_events.publish(ROAD_ACTIONS[action], {'event_id': event_id, **edge})
+    return {'event_id': event_id, 'edge': edge, 'repair': repair}
+
+@app.get("/api/location-graph/events")
+async def get_road_events(since_id: int = 0, limit: int = 100):
+    """Road closures, reopenings and reweights in the order they were recorded"""
+    rows = await db.fetchall(
+        'SELECT id, from_loc, to_loc, action, distance, reported_at, note, recorded_at FROM road_events '
+        'WHERE id > ? ORDER BY id LIMIT ?',
+        (since_id, max(1, min(limit, 1000)))
+    )
+    return [
+        {
+            'id': row[0], 'from_loc': row[1], 'to_loc': row[2], 'action': row[3], 'distance': row[4],
+            'reported_at': row[5], 'note': row[6], 'recorded_at': row[7]
+        }
+        for row in rows
+    ]
+
+@app.get("/api/location-graph/closures")
+async def get_road_closures():
+    rows = await db.fetchall(
+        'SELECT from_loc, to_loc, distance, closed_at FROM location_graph WHERE closed_at IS NOT NULL ORDER BY closed_at'
+    )
+    return [{'from_loc': row[0], 'to_loc': row[1], 'distance': row[2], 'closed_at': row[3]} for row in rows]
+
+@app.get("/api/supply-items")
+async def get_supply_items(request: Request):
+    async def load():
+        rows = await db.fetchall('SELECT id, item_name, weight, utility, quantity FROM supply_items')
+        items = []
+        
+        for row in rows:
+            items.append({
+                'id': row[0],
+                'item_name': row[1],
+                'weight': row[2],
+                'utility': row[3],
+                'quantity': row[4]
+            })
+        
+        return items
+    
+    return await responses.respond(request, 'supply-items', ('supply_items',), load)
 
 @app.post("/api/supply-items")
 async def add_supply_item(item_data: dict):
-    conn = sqlite3.connect('optirelief.db')
-    cursor = conn.cursor()
-    
-    cursor.execute(
+    await db.execute(
         'INSERT INTO supply_items (item_name, weight, utility, quantity) VALUES (?, ?, ?, ?)',
         (item_data['item_name'], item_data['weight'], item_data['utility'], item_data['quantity'])
     )
+    responses.bump('supply_items')
     
-    conn.commit()
-    conn.close()
     return {"message": "Supply item added successfully"}
 
 @app.post("/api/optimize-supply")
 async def optimize_supply(request_data: dict):
     items = request_data['items']
     capacity = request_data['capacity']
+    mode = request_data.get('mode', 'auto')
+    
+    async def solve():
+        try:
+            counts, total_utility, used_mode = await solvers.call(
+                pack_supplies, items, capacity, mode,
+                inline=knapsack_cells(items, [capacity]) <= INLINE_KNAPSACK_CELLS
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        
+        selected_items = [dict(item, selected_quantity=count) for item, count in zip(items, counts) if count]
+        
+        total_weight = sum(item['weight'] * item['selected_quantity'] for item in selected_items)
+        available_utility = sum(item['utility'] * item.get('quantity', 1) for item in items)
+        efficiency = (total_utility / available_utility) * 100 if available_utility else 0
+        
+        return {
+            'selected_items': selected_items,
+            'total_weight': total_weight,
+            'total_utility': total_utility,
+            'efficiency': efficiency,
+            'mode': used_mode
+        }
     
-    selected_items, total_utility = knapsack_01(items, capacity)
+    return await results.get_or_compute('optimize-supply', [items, capacity, mode], solve)
+
+@app.post("/api/optimize-fleet")
+async def optimize_fleet(request_data: dict):
+    vehicles = request_data['vehicles']
+    mode = request_data.get('mode', 'auto')
+    commit = request_data.get('commit', False)
+    
+    if not vehicles:
+        raise HTTPException(status_code=400, detail="At least 1 vehicle required")
+    if commit and 'items' in request_data:
+        raise HTTPException(status_code=400, detail="Committed plans are loaded from supply_items; omit items")
+    
+    capacities = [vehicle['capacity'] for vehicle in vehicles]
+    
+    def load_stock(conn):
+        rows = conn.execute('SELECT id, item_name, weight, utility, quantity FROM supply_items').fetchall()
+        return [
+            {'id': row[0], 'item_name': row[1], 'weight': row[2], 'utility': row[3], 'quantity': row[4]}
+            for row in rows
+        ]
+    
+    def commit_plan(conn, items, remaining):
+        # Re-read on the writer connection so concurrent plans never hand
+        # out the same stock twice; a plan over stale stock is discarded
+        if load_stock(conn) != items:
+            return False
+        conn.executemany(
+            'UPDATE supply_items SET quantity = ? WHERE id = ?',
+            [(quantity, item['id']) for item, quantity in zip(items, remaining)]
+        )
+        return True
     
-    total_weight = sum(item['weight'] for item in selected_items)
-    efficiency = (total_utility / sum(item['utility'] for item in items)) * 100 if items else 0
+    async def plan(items):
+        return await solvers.call(
+            pack_fleet, items, capacities, mode=mode,
+            inline=knapsack_cells(items, capacities) <= INLINE_KNAPSACK_CELLS
+        )
+    
+    try:
+        if commit:
+            # Solve on a snapshot, outside the writer, and re-plan if the
+            # stock changed before the plan could be applied
+            for _ in range(FLEET_COMMIT_ATTEMPTS):
+                items = await db.run(load_stock)
+                manifests, remaining = await plan(items)
+                if await db.run(commit_plan, items, remaining, write=True):
+                    break
+            else:
+                raise HTTPException(status_code=409, detail="Supply stock kept changing while planning; try again")
+            responses.bump('supply_items')
+        else:
+            items = request_data['items'] if 'items' in request_data else await db.run(load_stock)
+            manifests, remaining = await plan(items)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    plans = []
+    for vehicle, (counts, utility, used_mode) in zip(vehicles, manifests):
+        loaded = [dict(item, selected_quantity=count) for item, count in zip(items, counts) if count]
+        plans.append({
+            'vehicle': vehicle.get('id', vehicle.get('name')),
+            'capacity': vehicle['capacity'],
+            'selected_items': loaded,
+            'total_weight': sum(item['weight'] * item['selected_quantity'] for item in loaded),
+            'total_utility': utility,
+            'mode': used_mode
+        })
     
     return {
-        'selected_items': selected_items,
-        'total_weight': total_weight,
-        'total_utility': total_utility,
-        'efficiency': efficiency
+        'vehicles': plans,
+        'total_weight': sum(plan['total_weight'] for plan in plans),
+        'total_utility': sum(plan['total_utility'] for plan in plans),
+        'remaining_stock': [
+            {'id': item.get('id'), 'item_name': item.get('item_name'), 'quantity': quantity}
+            for item, quantity in zip(items, remaining)
+        ],
+        'committed': commit
     }
 
 @app.get("/api/volunteers")
-async def get_volunteers():
-    conn = sqlite3.connect('optirelief.db')
-    cursor = conn.cursor()
-    
-    cursor.execute('SELECT id, name, skills, location, status, assigned_to FROM volunteers')
-    volunteers = []
+async def get_volunteers(request: Request):
+    async def load():
+        rows = await db.fetchall('SELECT id, name, skills, location, status, assigned_to FROM volunteers')
+        volunteers = []
+        
+        for row in rows:
+            volunteers.append({
+                'id': row[0],
+                'name': row[1],
+                'skills': row[2],
+                'location': row[3],
+                'status': row[4],
+                'assigned_to': row[5]
+            })
+        
+        return volunteers
     
-    for row in cursor.fetchall():
-        volunteers.append({
-            'id': row[0],
-            'name': row[1],
-            'skills': row[2],
-            'location': row[3],
-            'status': row[4],
-            'assigned_to': row[5]
-        })
+    return await responses.respond(request, 'volunteers', ('volunteers',), load)
+
+@app.put("/api/volunteers/{volunteer_id}")
+async def update_volunteer(volunteer_id: int, volunteer_data: dict):
+    status = volunteer_data.get('status')
+    if status not in dashboard.VOLUNTEER_STATUSES:
+        raise HTTPException(status_code=400, detail=f"Status must be one of {', '.join(dashboard.VOLUNTEER_STATUSES)}")
+    assigned_to = volunteer_data.get('assigned_to') if status == 'assigned' else None
+    
+    changed = await db.executemany(
+        'UPDATE volunteers SET status = ?, assigned_to = ? WHERE id = ?', [(status, assigned_to, volunteer_id)]
+    )
+    if not changed:
+        raise HTTPException(status_code=404, detail="Volunteer not found")
+    responses.bump('volunteers')
     
-    conn.close()
-    return volunteers
+    volunteer = {'id': volunteer_id, 'status': status, 'assigned_to': assigned_to}
+    live_events.publish('volunteer.updated', volunteer)
+    return volunteer
+
+# Regions filled by /api/assign-volunteers when the request names none
+DEFAULT_ASSIGNMENT_REGIONS = [
+    'Downtown Emergency Zone',
+    'Riverside Medical Area',
+    'Industrial Rescue Zone',
+    'Suburban Relief Center'
+]
 
 @app.get("/api/regions")
 async def get_regions():
@@ -631,14 +882,12 @@ async def get_regions():
     ]
 
 @app.post("/api/assign-volunteers")
-async def assign_volunteers():
-    conn = sqlite3.connect('optirelief.db')
-    cursor = conn.cursor()
-    
-    cursor.execute('SELECT id, name, skills, location, status FROM volunteers WHERE status = "available"')
+async def assign_volunteers(request_data: Optional[dict] = Body(None)):
+    request_data = request_data or {}
+    rows = await db.fetchall("SELECT id, name, skills, location, status FROM volunteers WHERE status = 'available'")
     volunteers = []
     
-    for row in cursor.fetchall():
+    for row in rows:
         volunteers.append({
             'id': row[0],
             'name': row[1],
@@ -647,35 +896,140 @@ async def assign_volunteers():
             'status': row[4]
         })
     
-    regions = [
-        'Downtown Emergency Zone',
-        'Riverside Medical Area', 
-        'Industrial Rescue Zone',
-        'Suburban Relief Center'
-    ]
-    
-    assignments = backtrack_volunteer_assignment(volunteers, regions)
-    
-    total_coverage = (len(assignments) / len(regions)) * 100 if regions else 0
-    unassigned_volunteers = len(volunteers) - len(assignments)
-    
-    conn.close()
+    # Regions may be plain names or {"name", "capacity"} for several volunteers
+    regions = []
+    capacities = []
+    for region in request_data.get('regions', DEFAULT_ASSIGNMENT_REGIONS):
+        if isinstance(region, dict):
+            name = region.get('name')
+            capacity = region.get('capacity', 1)
+            if not isinstance(capacity, int) or capacity < 0:
+                raise HTTPException(status_code=400, detail="Region capacity must be a non-negative integer")
+        else:
+            name = region
+            capacity = 1
+        if not isinstance(name, str) or not name:
+            raise HTTPException(status_code=400, detail="Region name must be a non-empty string")
+        regions.append(name)
+        capacities.append(capacity)
+    
+    async def solve():
+        assignments = await solvers.call(
+            assign_volunteers_optimal, volunteers, regions, capacities,
+            inline=len(volunteers) * sum(capacities) <= INLINE_ASSIGNMENT_PAIRS
+        )
+        
+        covered_regions = len({assignment['region'] for assignment in assignments})
+        total_coverage = (covered_regions / len(regions)) * 100 if regions else 0
+        unassigned_volunteers = len(volunteers) - len(assignments)
+        
+        return {
+            'assignments': assignments,
+            'total_coverage': int(total_coverage),
+            'unassigned_volunteers': unassigned_volunteers
+        }
     
-    return {
-        'assignments': assignments,
-        'total_coverage': int(total_coverage),
-        'unassigned_volunteers': unassigned_volunteers
-    }
+    # Keyed by the available volunteers themselves, so any change to them is a new entry
+    return await results.get_or_compute('assign-volunteers', [volunteers, regions, capacities], solve)
+
+# Page size of /api/messages when no limit is given, and the largest allowed
+MESSAGE_PAGE_SIZE = 100
+MAX_MESSAGE_PAGE_SIZE = 1000
+# Time windows holding fewer messages than this are read whole through the
+# timestamp index and sorted, rather than found by walking urgency order
+TIME_WINDOW_SORT_ROWS = 5000
+
+def encode_message_cursor(urgency_score, message_id):
+    return base64.urlsafe_b64encode(f'{urgency_score}:{message_id}'.encode()).decode().rstrip('=')
+
+def decode_message_cursor(cursor):
+    """``(urgency_score, id)`` of the last row of the previous page"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        urgency_score, message_id = raw.split(':')
+        return int(urgency_score), int(message_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def to_db_timestamp(value, name):
+    """ISO-8601 bound as the UTC 'YYYY-MM-DD HH:MM:SS' text SQLite stores"""
+    try:
+        moment = datetime.fromisoformat(value)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"{name} must be an ISO-8601 timestamp")
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return moment.strftime('%Y-%m-%d %H:%M:%S')
 
 @app.get("/api/messages")
-async def get_messages():
-    conn = sqlite3.connect('optirelief.db')
-    cursor = conn.cursor()
+async def get_messages(
+    response: Response,
+    limit: int = MESSAGE_PAGE_SIZE,
+    cursor: Optional[str] = None,
+    urgency_level: Optional[str] = None,
+    source: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None
+):
+    """Messages by urgency (highest first, newest first on ties), one page at a time.
+    
+    When more rows follow, the ``X-Next-Cursor`` header holds the cursor for
+    the next page.  Pages are seeks on the (urgency_score, id) indexes, so
+    each costs O(limit) however many messages are stored; a time window
+    with few messages is read through the timestamp index instead.
+    """
+    if not 1 <= limit <= MAX_MESSAGE_PAGE_SIZE:
+        raise HTTPException(status_code=400, detail=f"Limit must be between 1 and {MAX_MESSAGE_PAGE_SIZE}")
+    
+    conditions = []
+    params = []
+    if urgency_level is not None:
+        conditions.append('urgency_level = ?')
+        params.append(urgency_level)
+    if source is not None:
+        conditions.append('source = ?')
+        params.append(source)
+    # (operator, bound) pairs on timestamp
+    window = []
+    if since is not None:
+        window.append(('>=', to_db_timestamp(since, 'since')))
+    if until is not None:
+        window.append(('<', to_db_timestamp(until, 'until')))
+    
+    # SQLite cannot tell how many rows a time range holds, so it may scan
+    # the urgency order row by row for a narrow window, or read and sort
+    # every row of a wide one.  Count the window first, stopping at the
+    # threshold, and pick the index: a unary + keeps timestamp off it
+    indexed_by = ''
+    if window:
+        bounds = [bound for _, bound in window]
+        count = await db.fetchone(
+            'SELECT count(*) FROM (SELECT 1 FROM requests WHERE '
+            f"{' AND '.join(f'timestamp {op} ?' for op, _ in window)} LIMIT ?)",
+            (*bounds, TIME_WINDOW_SORT_ROWS)
+        )
+        narrow = count[0] < TIME_WINDOW_SORT_ROWS
+        if narrow:
+            indexed_by = 'INDEXED BY idx_requests_timestamp '
+        column = 'timestamp' if narrow else '+timestamp'
+        conditions += [f'{column} {op} ?' for op, _ in window]
+        params += bounds
+    if cursor is not None:
+        conditions.append('(urgency_score, id) < (?, ?)')
+        params.extend(decode_message_cursor(cursor))
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+    
+    rows = await db.fetchall(
+        'SELECT id, message, source, timestamp, urgency_score, urgency_level, keywords_found FROM requests '
+        f'{indexed_by}{where} ORDER BY urgency_score DESC, id DESC LIMIT ?',
+        (*params, limit + 1)
+    )
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers['X-Next-Cursor'] = encode_message_cursor(rows[-1][4], rows[-1][0])
     
-    cursor.execute('SELECT id, message, source, timestamp, urgency_score, urgency_level, keywords_found FROM requests ORDER BY urgency_score DESC')
     messages = []
-    
-    for row in cursor.fetchall():
+    for row in rows:
         keywords = json.loads(row[6]) if row[6] else []
         messages.append({
             'id': row[0],
@@ -687,141 +1041,474 @@ async def get_messages():
             'keywords_found': keywords
         })
     
-    conn.close()
     return messages
 
+@app.get("/api/messages/search")
+async def search_messages_endpoint(
+    q: str,
+    limit: int = 20,
+    offset: int = 0,
+    mark_start: str = '<mark>',
+    mark_end: str = '</mark>'
+):
+    """Messages matching every word of ``q``, best BM25 rank first.
+    
+    Each result carries a ``snippet`` of the message with the matched words
+    wrapped in ``mark_start``/``mark_end``.  ``next_offset`` is set when
+    another page follows.
+    """
+    query = fts_query(q)
+    if query is None:
+        raise HTTPException(status_code=400, detail="Search text must contain at least one word")
+    if not 1 <= limit <= MAX_MESSAGE_PAGE_SIZE:
+        raise HTTPException(status_code=400, detail=f"Limit must be between 1 and {MAX_MESSAGE_PAGE_SIZE}")
+    if offset < 0:
+        raise HTTPException(status_code=400, detail="Offset must not be negative")
+    
+    rows = await db.run(search_messages, query, limit, offset, (mark_start, mark_end))
+    
+    results = []
+    for row in rows[:limit]:
+        results.append({
+            'id': row[0],
+            'message': row[1],
+            'source': row[2],
+            'timestamp': row[3],
+            'urgency_score': row[4],
+            'urgency_level': row[5],
+            'keywords_found': json.loads(row[6]) if row[6] else [],
+            'snippet': row[7],
+            'rank': row[8]
+        })
+    
+    return {
+        'query': q,
+        'results': results,
+        'next_offset': offset + limit if len(rows) > limit else None
+    }
+
+@app.put("/api/messages/{message_id}")
+async def update_message(message_id: int, message_data: dict):
+    status = message_data.get('status')
+    if status not in dashboard.REQUEST_STATUSES:
+        raise HTTPException(status_code=400, detail=f"Status must be one of {', '.join(dashboard.REQUEST_STATUSES)}")
+    
+    changed = await db.executemany('UPDATE requests SET status = ? WHERE id = ?', [(status, message_id)])
+    if not changed:
+        raise HTTPException(status_code=404, detail="Message not found")
+    
+    live_events.publish('message.updated', {'id': message_id, 'status': status})
+    return {'id': message_id, 'status': status}
+
 @app.post("/api/analyze-message")
 async def analyze_message(request_data: dict):
     message = request_data['message']
     source = request_data['source']
     
-    urgent_keywords = [
-        'urgent', 'emergency', 'help', 'critical', 'injured', 'trapped',
-        'fire', 'flood', 'collapse', 'medical', 'rescue', 'immediate',
-        'danger', 'severe', 'casualty', 'ambulance', 'hospital'
-    ]
-    
-    found_keywords = []
-    urgency_score = 0
-    
-    for keyword in urgent_keywords:
-        matches = boyer_moore_search(message, keyword)
-        if matches:
-            found_keywords.append(keyword)
-            urgency_score += len(matches) * 10
-    
-    # Cap the score at 100
-    urgency_score = min(urgency_score, 100)
-    
-    # Determine urgency level
-    if urgency_score >= 80:
-        urgency_level = 'Critical'
-    elif urgency_score >= 60:
-        urgency_level = 'High'
-    elif urgency_score >= 40:
-        urgency_level = 'Medium'
-    else:
-        urgency_level = 'Low'
-    
-    conn = sqlite3.connect('optirelief.db')
-    cursor = conn.cursor()
-    
-    cursor.execute(
-        'INSERT INTO requests (message, source, urgency_score, urgency_level, keywords_found) VALUES (?, ?, ?, ?, ?)',
-        (message, source, urgency_score, urgency_level, json.dumps(found_keywords))
-    )
-    
-    message_id = cursor.lastrowid
-    conn.commit()
-    conn.close()
+    # Single pass over the message for every keyword in the lexicon
+    scanner = await keyword_lexicon.get()
+    record = score_message(scanner, message, source)
     
+    await db.run(insert_requests, [record], write=True)
+    live_events.publish('message.created', {'messages': [record]})
+    return record
+
+def score_message(scanner, message, source):
+    """Analyze one message into the record returned by the API"""
+    found_keywords, urgency_score = scanner.score(message)
     return {
-        'id': message_id,
+        'id': None,
         'message': message,
         'source': source,
         'timestamp': datetime.now().isoformat(),
         'urgency_score': urgency_score,
-        'urgency_level': urgency_level,
-        'keywords_found': found_keywords
+        'urgency_level': urgency_level_for(urgency_score),
+        'keywords_found': found_keywords,
+        'request_type': dashboard.classify_request(message)
     }
 
-@app.get("/api/dispatch-centers")
-async def get_dispatch_centers():
-    conn = sqlite3.connect('optirelief.db')
-    cursor = conn.cursor()
+def insert_requests(conn, records):
+    """Write analyzed messages in one transaction and fill in their ids"""
+    conn.executemany(
+        'INSERT INTO requests (message, source, urgency_score, urgency_level, keywords_found, request_type) VALUES (?, ?, ?, ?, ?, ?)',
+        [(r['message'], r['source'], r['urgency_score'], r['urgency_level'], json.dumps(r['keywords_found']), r['request_type'])
+         for r in records]
+    )
+    # Ids are consecutive: this connection is the only writer
+    last_id = conn.execute('SELECT last_insert_rowid()').fetchone()[0]
+    first_id = last_id - len(records) + 1
+    for offset, record in enumerate(records):
+        record['id'] = first_id + offset
+    return records
+
+def validate_message(entry):
+    """Error text for a malformed ingestion entry, or None"""
+    if not isinstance(entry, dict):
+        return "Entry must be an object"
+    if not isinstance(entry.get('message'), str) or not isinstance(entry.get('source'), str):
+        return "Entry needs string 'message' and 'source' fields"
+    return None
+
+async def ingest_chunk(scanner, entries):
+    """Score a chunk of messages and write it in one grouped transaction"""
+    records = [score_message(scanner, entry['message'], entry['source']) for entry in entries]
+    async with ingest_slots:
+        await db.run(insert_requests, records, write=True)
+    # One event per committed chunk rather than per message
+    live_events.publish('message.created', {'messages': records})
+    return records
+
+@app.post("/api/analyze-messages")
+async def analyze_messages(request_data: dict):
+    entries = request_data['messages']
     
-    cursor.execute('SELECT id, name, latitude, longitude FROM dispatch_centers')
-    centers = []
+    for i, entry in enumerate(entries):
+        error = validate_message(entry)
+        if error:
+            raise HTTPException(status_code=400, detail=f"Message {i}: {error}")
     
-    for row in cursor.fetchall():
-        centers.append({
-            'id': row[0],
-            'name': row[1],
-            'coordinates': [row[2], row[3]]
-        })
+    # Shed load instead of queueing more work behind a saturated writer
+    if ingest_slots.locked():
+        raise HTTPException(status_code=503, detail="Ingestion queue is full", headers={'Retry-After': '1'})
+    
+    scanner = await keyword_lexicon.get()
+    results = []
+    for start in range(0, len(entries), INGEST_CHUNK_SIZE):
+        results.extend(await ingest_chunk(scanner, entries[start:start + INGEST_CHUNK_SIZE]))
+    
+    return {'count': len(results), 'results': results}
+
+class NDJSONStreamingResponse(StreamingResponse):
+    """StreamingResponse that leaves ``receive`` to the handler.
+
+    Starlette's StreamingResponse listens for disconnects on ``receive``,
+    which would swallow request body chunks the generator has not read yet.
+    """
+    media_type = 'application/x-ndjson'
+    
+    async def __call__(self, scope, receive, send):
+        await send({'type': 'http.response.start', 'status': self.status_code, 'headers': self.raw_headers})
+        async for chunk in self.body_iterator:
+            if not isinstance(chunk, bytes):
+                chunk = chunk.encode(self.charset)
+            await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+        await send({'type': 'http.response.body', 'body': b'', 'more_body': False})
+
+@app.post("/api/analyze-messages/stream")
+async def analyze_message_stream(request: Request):
+    """Ingest NDJSON messages and stream back one NDJSON result per line.
+    
+    The body is read only as fast as results are written to the database
+    and consumed by the client, so a slow writer or reader pushes back on
+    the sender through TCP flow control.
+    """
+    scanner = await keyword_lexicon.get()
+    
+    async def results():
+        buffer = b''
+        line_number = 0
+        pending = []
+        
+        async def flush():
+            records = await ingest_chunk(scanner, [entry for _, entry in pending])
+            pending.clear()
+            return ''.join(json.dumps(record) + '\n' for record in records)
+        
+        def parse(line):
+            nonlocal line_number
+            line_number += 1
+            if not line.strip():
+                return None
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                return json.dumps({'line': line_number, 'error': "Invalid JSON"}) + '\n'
+            error = validate_message(entry)
+            if error:
+                return json.dumps({'line': line_number, 'error': error}) + '\n'
+            pending.append((line_number, entry))
+            return None
+        
+        async for piece in request.stream():
+            buffer += piece
+            *lines, buffer = buffer.split(b'\n')
+            for line in lines:
+                error = parse(line)
+                if error:
+                    yield error
+                if len(pending) >= INGEST_CHUNK_SIZE:
+                    yield await flush()
+            # Flush whatever arrived with this network read so a slow trickle
+            # of messages is still answered promptly
+            if pending:
+                yield await flush()
+        
+        error = parse(buffer)
+        if error:
+            yield error
+        if pending:
+            yield await flush()
+    
+    return NDJSONStreamingResponse(results())
+
+@app.get("/api/keywords")
+async def get_keywords():
+    rows = await db.fetchall('SELECT keyword, weight FROM urgent_keywords ORDER BY rowid')
+    return [{'keyword': row[0], 'weight': row[1]} for row in rows]
+
+@app.post("/api/keywords")
+async def add_keywords(keyword_data: dict):
+    # Accepts one {"keyword", "weight"} entry or {"keywords": [...]} for bulk loads
+    entries = keyword_data.get('keywords', [keyword_data])
+    rows = [(entry['keyword'].strip(), entry.get('weight', DEFAULT_KEYWORD_WEIGHT)) for entry in entries]
+    if any(not keyword for keyword, _ in rows):
+        raise HTTPException(status_code=400, detail="Keywords must not be empty")
+    
+    await db.executemany(
+        'INSERT INTO urgent_keywords (keyword, weight) VALUES (?, ?) '
+        'ON CONFLICT (keyword) DO UPDATE SET weight = excluded.weight',
+        rows
+    )
+    keyword_lexicon.invalidate()
+    return {"message": f"{len(rows)} keywords saved successfully"}
+
+@app.delete("/api/keywords/{keyword}")
+async def delete_keyword(keyword: str):
+    await db.execute('DELETE FROM urgent_keywords WHERE keyword = ?', (keyword,))
+    keyword_lexicon.invalidate()
+    return {"message": "Keyword deleted successfully"}
+
+@app.get("/api/events")
+async def stream_events(request: Request, since: Optional[int] = None, topics: Optional[str] = None):
+    """Server-sent events for message, area and volunteer changes.
+    
+    ``topics`` narrows the feed, e.g. ``?topics=message,area``.  Each event carries a sequence number as its id.  Reconnecting with
+    ``Last-Event-ID`` (sent automatically by EventSource) or ``?since=``
+    replays what was missed; a ``reset`` event means the client must
+    reload its lists and continue from the sequence number it carries.
+    """
+    last_event_id = request.headers.get('last-event-id')
+    if last_event_id is not None:
+        try:
+            since = int(last_event_id)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Last-Event-ID must be a sequence number")
+    topic_set = {topic.strip() for topic in topics.split(',') if topic.strip()} if topics else None
+    
+    return StreamingResponse(
+        live_events.stream(since, topic_set),
+        media_type='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@app.get("/api/dispatch-centers")
+async def get_dispatch_centers(request: Request):
+    async def load():
+        rows = await db.fetchall('SELECT id, name, latitude, longitude FROM dispatch_centers')
+        centers = []
+        
+        for row in rows:
+            centers.append({
+                'id': row[0],
+                'name': row[1],
+                'coordinates': [row[2], row[3]]
+            })
+        
+        return centers
+    
+    return await responses.respond(request, 'dispatch-centers', ('dispatch_centers',), load)
+
+def validate_coordinates(lat, lon):
+    if not -90 <= lat <= 90:
+        raise HTTPException(status_code=400, detail="lat must be between -90 and 90")
+    if not -180 <= lon <= 180:
+        raise HTTPException(status_code=400, detail="lon must be between -180 and 180")
+
+def nearby_centers(matches):
+    return [{**center, 'distance_km': round(km, 3)} for center, km in matches]
+
+@app.get("/api/dispatch-centers/nearest")
+async def get_nearest_centers(lat: float, lon: float, k: int = 5):
+    validate_coordinates(lat, lon)
+    if k < 1:
+        raise HTTPException(status_code=400, detail="k must be at least 1")
+    
+    index = await center_index.get()
+    return nearby_centers(index.nearest(lat, lon, k))
+
+@app.get("/api/dispatch-centers/within")
+async def get_centers_within(lat: float, lon: float, radius_km: float, limit: Optional[int] = None):
+    validate_coordinates(lat, lon)
+    if radius_km < 0:
+        raise HTTPException(status_code=400, detail="radius_km must be non-negative")
+    if limit is not None and limit < 1:
+        raise HTTPException(status_code=400, detail="limit must be at least 1")
+    
+    index = await center_index.get()
+    return nearby_centers(index.within(lat, lon, radius_km, limit))
+
+@app.post("/api/dispatch-centers")
+async def upsert_dispatch_centers(request_data: Any = Body(...)):
+    # One center object, a list of them or {"centers": [...]}
+    if isinstance(request_data, dict) and 'centers' in request_data:
+        request_data = request_data['centers']
+    centers = request_data if isinstance(request_data, list) else [request_data]
+    
+    rows = []
+    for center in centers:
+        try:
+            row = (str(center['id']), str(center['name']), float(center['latitude']), float(center['longitude']))
+        except (TypeError, KeyError, ValueError):
+            raise HTTPException(status_code=400, detail="Each center needs id, name, latitude and longitude")
+        validate_coordinates(row[2], row[3])
+        rows.append(row)
+    if not rows:
+        raise HTTPException(status_code=400, detail="No centers given")
+    
+    await db.executemany(
+        'INSERT OR REPLACE INTO dispatch_centers (id, name, latitude, longitude) VALUES (?, ?, ?, ?)', rows
+    )
+    center_index.invalidate()
+    road_graph.invalidate()
+    responses.bump('dispatch_centers')
     
-    conn.close()
-    return centers
+    return {"message": "Dispatch centers saved successfully", "count": len(rows)}
 
 @app.post("/api/multi-dispatch")
 async def multi_dispatch(request_data: dict):
-    selected_centers = request_data['centers']
+    selected_centers = request_data.get('centers')
     
+    if not isinstance(selected_centers, list) or not all(isinstance(c, str) for c in selected_centers):
+        raise HTTPException(status_code=400, detail="centers must be a list of dispatch center ids")
     if len(selected_centers) < 2:
         raise HTTPException(status_code=400, detail="At least 2 centers required")
+    if len(selected_centers) > MAX_DISPATCH_CENTERS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_DISPATCH_CENTERS} centers per request")
     
-    # Create distance matrix (mock data for demonstration)
-    n = len(selected_centers)
-    INF = float('inf')
-    
-    # Generate mock distance matrix
-    distance_matrix = []
-    for i in range(n):
-        row = []
-        for j in range(n):
-            if i == j:
-                row.append(0)
-            else:
-                # Generate consistent random distances
-                distance = abs(hash(f"{selected_centers[i]}{selected_centers[j]}")) % 50 + 10
-                row.append(distance)
-        distance_matrix.append(row)
-    
-    # Apply Floyd-Warshall
-    result_matrix = floyd_warshall(distance_matrix)
-    
-    # Generate optimal routes
-    optimal_routes = []
-    for i in range(n):
-        for j in range(n):
-            if i != j:
-                optimal_routes.append({
-                    'from': selected_centers[i],
-                    'to': selected_centers[j],
-                    'cost': result_matrix[i][j],
-                    'path': [selected_centers[i], selected_centers[j]]  # Simplified path
-                })
-    
-    total_cost = sum(route['cost'] for route in optimal_routes)
-    
-    # Generate dispatch plans
-    dispatch_plan = []
-    for i, center in enumerate(selected_centers):
-        destinations = [selected_centers[j] for j in range(n) if i != j]
-        total_time = sum(result_matrix[i][j] for j in range(n) if i != j) * 5  # 5 min per unit
+    distinct = list(dict.fromkeys(selected_centers))
+    rows = await db.fetchall(
+        f"SELECT id FROM dispatch_centers WHERE id IN ({', '.join('?' * len(distinct))})", distinct
+    )
+    known = {row[0] for row in rows}
+    unknown = [c for c in distinct if c not in known]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown dispatch centers: {', '.join(unknown)}")
+    
+    graph = await road_graph.get()
+    
+    async def build():
+        # Rows for the selected centers only: cached center trees where
+        # there are any, one targeted search for each of the rest
+        n = len(selected_centers)
+        result_matrix, paths = await dispatch_routes.table(graph, [center_location(c) for c in selected_centers])
         
-        dispatch_plan.append({
-            'center': center,
-            'destinations': destinations,
-            'total_time': int(total_time)
-        })
+        # Generate optimal routes
+        optimal_routes = []
+        for i in range(n):
+            for j in range(n):
+                if i != j:
+                    optimal_routes.append({
+                        'from': selected_centers[i],
+                        'to': selected_centers[j],
+                        'cost': result_matrix[i][j],
+                        'path': paths[i][j] or []
+                    })
+        
+        total_cost = sum(route['cost'] for route in optimal_routes if route['cost'] is not None)
+        
+        # Generate dispatch plans
+        dispatch_plan = []
+        for i, center in enumerate(selected_centers):
+            destinations = [selected_centers[j] for j in range(n) if i != j and result_matrix[i][j] is not None]
+            total_time = sum(result_matrix[i][j] or 0 for j in range(n) if i != j) * 5  # 5 min per unit
+        
+            dispatch_plan.append({
+                'center': center,
+                'destinations': destinations,
+                'total_time': int(total_time)
+            })
+        
+        return {
+            'cost_matrix': result_matrix,
+            'optimal_routes': optimal_routes,
+            'total_cost': total_cost,
+            'dispatch_plan': dispatch_plan
+        }
     
-    return {
-        'cost_matrix': result_matrix,
-        'optimal_routes': optimal_routes,
-        'total_cost': total_cost,
-        'dispatch_plan': dispatch_plan
-    }
+    # The graph signature stands for the road network the routes came from
+    return await results.get_or_compute('multi-dispatch', [selected_centers, graph.signature], build)
+
+@app.get("/api/result-cache")
+async def get_result_cache_stats():
+    return results.stats()
+
+@app.delete("/api/result-cache")
+async def clear_result_cache():
+    await results.clear()
+    return {"message": "Result cache cleared"}
+
+# Endpoints that can run as background jobs, keyed by the job's solver name
+JOB_SOLVERS = {
+    'optimize-supply': optimize_supply,
+    'optimize-fleet': optimize_fleet,
+    'assign-volunteers': assign_volunteers,
+    'multi-dispatch': multi_dispatch,
+    'tour': plan_delivery_tour,
+    'routes-batch': batch_routes,
+    'shortest-route': lambda params: get_shortest_route(
+        params.get('start'), params.get('end'), params.get('algorithm', 'dijkstra')
+    ),
+}
+
+def find_job(job_id):
+    job = solver_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@app.post("/api/jobs", status_code=202)
+async def submit_job(request_data: dict):
+    """Run a solver endpoint in the background; poll /api/jobs/{id} for it"""
+    solver = request_data.get('solver')
+    params = request_data.get('params') or {}
+    timeout_s = request_data.get('timeout_s', JOB_TIMEOUT_S)
+    if solver not in JOB_SOLVERS:
+        raise HTTPException(status_code=400, detail=f"solver must be one of: {', '.join(JOB_SOLVERS)}")
+    if not isinstance(params, dict):
+        raise HTTPException(status_code=400, detail="params must be an object")
+    if not isinstance(timeout_s, (int, float)) or not 0 < timeout_s <= MAX_JOB_TIMEOUT_S:
+        raise HTTPException(status_code=400, detail=f"timeout_s must be between 0 and {MAX_JOB_TIMEOUT_S}")
+    
+    try:
+        job = solver_jobs.submit(solver, lambda: JOB_SOLVERS[solver](params), timeout_s)
+    except TooManyJobs as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    
+    return solver_jobs.status(job)
+
+@app.get("/api/jobs/{job_id}")
+async def get_job(job_id: str):
+    return solver_jobs.status(find_job(job_id))
+
+@app.get("/api/jobs/{job_id}/result")
+async def get_job_result(job_id: str):
+    job = find_job(job_id)
+    
+    if job['status'] == 'succeeded':
+        return job['result']
+    if job['status'] in ('queued', 'running'):
+        return JSONResponse(status_code=202, content=solver_jobs.status(job))
+    if job['status'] == 'cancelled':
+        raise HTTPException(status_code=409, detail="Job was cancelled")
+    raise HTTPException(status_code=job['error']['status_code'], detail=job['error']['detail'])
+
+@app.delete("/api/jobs/{job_id}")
+async def cancel_job(job_id: str):
+    job = find_job(job_id)
+    if not solver_jobs.cancel(job_id):
+        raise HTTPException(status_code=409, detail=f"Job already {job['status']}")
+    
+    return {"message": "Job cancelled", "id": job_id}
 
 if __name__ == "__main__":
     import uvicorn
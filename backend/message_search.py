@@ -0,0 +1,49 @@
+"""Ranked full-text search over stored distress messages.
+
+Backed by the ``requests_fts`` FTS5 index (see ``migrations``).  Free text
+from operators is turned into a safe FTS5 query -- every word quoted, all
+words required, a trailing ``*`` kept as a prefix match -- so punctuation
+in a search box can never be parsed as query syntax.
+"""
+import re
+
+_WORD = re.compile(r'\w+\*?')
+
+SNIPPET_TOKENS = 12
+
+
+def fts_query(text):
+    """FTS5 MATCH expression for free text, or None if it has no words"""
+    terms = []
+    for word in _WORD.findall(text):
+        if word.endswith('*'):
+            terms.append(f'"{word[:-1]}"*')
+        else:
+            terms.append(f'"{word}"')
+    return ' '.join(terms) or None
+
+
+def search_messages(conn, query, limit, offset, mark=('<mark>', '</mark>')):
+    """Best-ranked matches for ``query`` (an ``fts_query`` expression).
+
+    Returns up to ``limit + 1`` rows so the caller can tell whether another
+    page follows.
+    """
+    # Rank and snippet only inside FTS5, then join the page to requests
+    rows = conn.execute(
+        '''
+        SELECT r.id, r.message, r.source, r.timestamp, r.urgency_score, r.urgency_level, r.keywords_found,
+               m.snippet, m.rank
+        FROM (
+            SELECT rowid, snippet(requests_fts, 0, ?, ?, '…', ?) AS snippet, rank
+            FROM requests_fts
+            WHERE requests_fts MATCH ?
+            ORDER BY rank
+            LIMIT ? OFFSET ?
+        ) m
+        JOIN requests r ON r.id = m.rowid
+        ORDER BY m.rank
+        ''',
+        (mark[0], mark[1], SNIPPET_TOKENS, query, limit + 1, offset)
+    ).fetchall()
+    return rows
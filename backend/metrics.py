@@ -0,0 +1,240 @@
+"""In-process performance metrics, exposed in Prometheus text format.
+
+Three sources feed the registry:
+
+* ``MetricsMiddleware`` times every HTTP request by route template and
+  status, and splits each request's time into phases -- database calls,
+  instrumented algorithms and JSON encoding -- so a slow endpoint shows
+  where its time went.
+* ``@instrument`` wraps algorithm functions, recording latency, input size
+  and failures.  Nested or recursive instrumented calls are attributed to
+  the outermost one only.
+* ``Database.run`` reports every pooled call via ``observe_db_call``.
+
+Everything is plain Python with one lock per metric family, so recording
+costs a few microseconds and needs no client library.
+"""
+import bisect
+import contextvars
+import functools
+import inspect
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+# Seconds
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Items, nodes, characters...
+SIZE_BUCKETS = (1, 10, 100, 1000, 10_000, 100_000, 1_000_000)
+
+# Seconds spent per phase in the current request, or None outside one
+_request_phases = contextvars.ContextVar('request_phases', default=None)
+_in_algorithm = contextvars.ContextVar('in_algorithm', default=False)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values, extra=''):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic totals per label combination"""
+
+    kind = 'counter'
+
+    def __init__(self, name, help_text, labels=()):
+        self.name, self.help_text, self.labels = name, help_text, tuple(labels)
+        self._values = defaultdict(float)
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, *label_values):
+        with self._lock:
+            self._values[label_values] += amount
+
+    def samples(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        for label_values, value in values:
+            yield f'{self.name}{_labels(self.labels, label_values)} {_number(value)}'
+
+
+class Histogram:
+    """Bucketed observations per label combination"""
+
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        self.name, self.help_text, self.labels = name, help_text, tuple(labels)
+        self.buckets = tuple(buckets)
+        # label values -> [per-bucket counts (+Inf last), sum, count]
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        slot = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][slot] += 1
+            series[1] += value
+            series[2] += 1
+
+    def samples(self):
+        with self._lock:
+            series = sorted((key, (list(counts), total, count)) for key, (counts, total, count) in self._series.items())
+        for label_values, (counts, total, count) in series:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                le = _labels(self.labels, label_values, f'le="{_number(bound)}"')
+                yield f'{self.name}_bucket{le} {cumulative}'
+            yield f'{self.name}_sum{_labels(self.labels, label_values)} {_number(total)}'
+            yield f'{self.name}_count{_labels(self.labels, label_values)} {count}'
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._families = []
+
+    def register(self, family):
+        self._families.append(family)
+        return family
+
+    def render(self):
+        """Every family in the Prometheus text exposition format"""
+        lines = []
+        for family in self._families:
+            lines.append(f'# HELP {family.name} {family.help_text}')
+            lines.append(f'# TYPE {family.name} {family.kind}')
+            lines.extend(family.samples())
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+http_duration = registry.register(Histogram(
+    'optirelief_http_request_duration_seconds', 'HTTP request latency by route template',
+    ('method', 'route', 'status')))
+http_phase_seconds = registry.register(Counter(
+    'optirelief_http_request_phase_seconds_total', 'Request time spent in database calls, algorithms and encoding',
+    ('route', 'phase')))
+algorithm_duration = registry.register(Histogram(
+    'optirelief_algorithm_duration_seconds', 'Latency of instrumented algorithm calls', ('algorithm',)))
+algorithm_input_size = registry.register(Histogram(
+    'optirelief_algorithm_input_size', 'Input size of instrumented algorithm calls', ('algorithm',), SIZE_BUCKETS))
+algorithm_errors = registry.register(Counter(
+    'optirelief_algorithm_errors_total', 'Instrumented algorithm calls that raised', ('algorithm',)))
+db_duration = registry.register(Histogram(
+    'optirelief_db_call_duration_seconds', 'Database calls, including waiting for a pooled connection', ('mode',)))
+
+
+def add_phase(phase, seconds):
+    """Charge ``seconds`` to ``phase`` of the request being handled, if any"""
+    phases = _request_phases.get()
+    if phases is not None:
+        phases[phase] += seconds
+
+
+@contextmanager
+def phase(name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        add_phase(name, time.perf_counter() - start)
+
+
+def observe_db_call(seconds, write):
+    db_duration.observe(seconds, 'write' if write else 'read')
+    add_phase('db', seconds)
+
+
+def instrument(name=None, size=None):
+    """Record latency, call count and errors of the decorated function.
+
+    ``size`` names a parameter whose ``len()`` is recorded as the input
+    size of each call.
+    """
+    def decorate(fn):
+        label = name or fn.__name__
+        position = list(inspect.signature(fn).parameters).index(size) if size else None
+
+        def input_size(args, kwargs):
+            value = args[position] if position < len(args) else kwargs.get(size)
+            return len(value) if value is not None else 0
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if _in_algorithm.get():
+                return fn(*args, **kwargs)
+            token = _in_algorithm.set(True)
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            except Exception:
+                algorithm_errors.inc(1, label)
+                raise
+            finally:
+                elapsed = time.perf_counter() - start
+                _in_algorithm.reset(token)
+                algorithm_duration.observe(elapsed, label)
+                if position is not None:
+                    algorithm_input_size.observe(input_size(args, kwargs), label)
+                add_phase('algorithm', elapsed)
+
+        return wrapper
+    return decorate
+
+
+def route_label(scope):
+    """Route template of a handled request, so paths with ids share a series"""
+    route = scope.get('route')
+    path = getattr(route, 'path', None)
+    return path if path is not None else 'unmatched'
+
+
+class MetricsMiddleware:
+    """ASGI middleware timing each HTTP request and its phases"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        phases = defaultdict(float)
+        token = _request_phases.set(phases)
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - start
+            _request_phases.reset(token)
+            route = route_label(scope)
+            http_duration.observe(elapsed, scope['method'], route, str(status))
+            for name, seconds in phases.items():
+                http_phase_seconds.inc(seconds, route, name)
@@ -0,0 +1,325 @@
+"""Versioned schema migrations for the OptiRelief database.
+
+``PRAGMA user_version`` records how many entries of ``MIGRATIONS`` have been
+applied.  A boot against an up-to-date database reads that one pragma and
+does nothing else; otherwise each pending migration runs in its own
+transaction together with the version bump, so a crash never leaves a
+migration half applied or applied twice.
+
+Every migration also tolerates databases created before versioning existed
+(``CREATE ... IF NOT EXISTS``, guarded column additions, seeding only empty
+tables), so those are brought up to date without duplicating rows.
+"""
+import sqlite3
+
+import dashboard
+from keyword_scanner import DEFAULT_KEYWORDS, DEFAULT_WEIGHT as DEFAULT_KEYWORD_WEIGHT
+
+SAMPLE_AREAS = [
+    ('Downtown District', 8, 50000, 2),
+    ('Riverside Community', 6, 25000, 4),
+    ('Industrial Zone', 9, 15000, 1),
+    ('Suburban Area', 4, 80000, 6),
+    ('Mountain Village', 7, 5000, 8)
+]
+
+SAMPLE_VOLUNTEERS = [
+    ('Alice Johnson', 'Medical, First Aid', 'Downtown', 'available'),
+    ('Bob Smith', 'Search and Rescue, Engineering', 'Riverside', 'available'),
+    ('Carol Davis', 'Communications, Logistics', 'Industrial', 'available'),
+    ('David Wilson', 'Medical, Psychology', 'Suburban', 'available'),
+    ('Eve Brown', 'Engineering, Technical', 'Mountain', 'available'),
+    ('Frank Miller', 'Logistics, Transportation', 'Downtown', 'available')
+]
+
+SAMPLE_SUPPLIES = [
+    ('Water Bottles', 2, 9, 100),
+    ('Medical Kit', 5, 10, 20),
+    ('Blankets', 3, 7, 50),
+    ('Food Rations', 4, 8, 75),
+    ('Flashlights', 1, 6, 40),
+    ('Radio Equipment', 8, 9, 10),
+    ('Tents', 15, 8, 15),
+    ('Batteries', 1, 5, 200)
+]
+
+SAMPLE_LOCATIONS = [
+    ('A', 'B', 10),
+    ('A', 'C', 15),
+    ('B', 'C', 12),
+    ('B', 'D', 8),
+    ('C', 'D', 20),
+    ('C', 'E', 18),
+    ('D', 'E', 6),
+    ('E', 'F', 14),
+    ('F', 'A', 25)
+]
+
+SAMPLE_CENTERS = [
+    ('center_a', 'Emergency Response Center A', 40.7128, -74.0060),
+    ('center_b', 'Relief Distribution Hub B', 40.7614, -73.9776),
+    ('center_c', 'Medical Support Base C', 40.6892, -74.0445),
+    ('center_d', 'Logistics Center D', 40.7489, -73.9857),
+    ('center_e', 'Command Post E', 40.7282, -74.0776)
+]
+
+
+def execute_script(conn, script):
+    """Run ``script`` statement by statement inside the open transaction.
+
+    ``executescript`` would commit first, breaking per-migration atomicity.
+    """
+    statement = ''
+    for line in script.splitlines(keepends=True):
+        statement += line
+        if sqlite3.complete_statement(statement):
+            conn.execute(statement)
+            statement = ''
+    if statement.strip():
+        conn.execute(statement)
+
+
+def add_column(conn, table, column, definition):
+    """Add a column unless a pre-versioning schema already has it"""
+    columns = [row[1] for row in conn.execute(f'PRAGMA table_info({table})')]
+    if column not in columns:
+        conn.execute(f'ALTER TABLE {table} ADD COLUMN {column} {definition}')
+
+
+def _seed_if_empty(conn, table, sql, rows):
+    if conn.execute(f'SELECT 1 FROM {table} LIMIT 1').fetchone() is None:
+        conn.executemany(sql, rows)
+
+
+def create_base_schema(conn):
+    execute_script(conn, '''
+        CREATE TABLE IF NOT EXISTS affected_areas (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            severity INTEGER NOT NULL,
+            population INTEGER NOT NULL,
+            delay_time INTEGER NOT NULL,
+            urgency_score REAL DEFAULT 0
+        );
+
+        CREATE TABLE IF NOT EXISTS volunteers (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            skills TEXT NOT NULL,
+            location TEXT NOT NULL,
+            status TEXT DEFAULT 'available',
+            assigned_to TEXT
+        );
+
+        CREATE TABLE IF NOT EXISTS supply_items (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            item_name TEXT NOT NULL,
+            weight INTEGER NOT NULL,
+            utility INTEGER NOT NULL,
+            quantity INTEGER NOT NULL
+        );
+
+        CREATE TABLE IF NOT EXISTS requests (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            message TEXT NOT NULL,
+            source TEXT NOT NULL,
+            timestamp TEXT DEFAULT CURRENT_TIMESTAMP,
+            urgency_score INTEGER DEFAULT 0,
+            urgency_level TEXT DEFAULT 'low',
+            keywords_found TEXT
+        );
+
+        CREATE TABLE IF NOT EXISTS location_graph (
+            from_loc TEXT,
+            to_loc TEXT,
+            distance INTEGER,
+            PRIMARY KEY (from_loc, to_loc)
+        );
+
+        CREATE TABLE IF NOT EXISTS dispatch_centers (
+            id TEXT PRIMARY KEY,
+            name TEXT NOT NULL,
+            latitude REAL NOT NULL,
+            longitude REAL NOT NULL
+        );
+    ''')
+
+    _seed_if_empty(conn, 'affected_areas',
+                   'INSERT INTO affected_areas (name, severity, population, delay_time) VALUES (?, ?, ?, ?)',
+                   SAMPLE_AREAS)
+    _seed_if_empty(conn, 'volunteers',
+                   'INSERT INTO volunteers (name, skills, location, status) VALUES (?, ?, ?, ?)',
+                   SAMPLE_VOLUNTEERS)
+    _seed_if_empty(conn, 'supply_items',
+                   'INSERT INTO supply_items (item_name, weight, utility, quantity) VALUES (?, ?, ?, ?)',
+                   SAMPLE_SUPPLIES)
+    _seed_if_empty(conn, 'location_graph',
+                   'INSERT OR IGNORE INTO location_graph (from_loc, to_loc, distance) VALUES (?, ?, ?)',
+                   SAMPLE_LOCATIONS)
+    _seed_if_empty(conn, 'dispatch_centers',
+                   'INSERT OR IGNORE INTO dispatch_centers (id, name, latitude, longitude) VALUES (?, ?, ?, ?)',
+                   SAMPLE_CENTERS)
+
+
+def index_area_urgency(conn):
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_affected_areas_urgency ON affected_areas (urgency_score DESC, id)')
+
+
+def create_route_matrix(conn):
+    execute_script(conn, '''
+        CREATE TABLE IF NOT EXISTS route_matrix (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            graph_signature TEXT NOT NULL,
+            nodes TEXT NOT NULL,
+            distances BLOB NOT NULL,
+            next_hops BLOB NOT NULL,
+            integral INTEGER NOT NULL,
+            updated_at TEXT DEFAULT CURRENT_TIMESTAMP
+        );
+    ''')
+
+
+def create_urgent_keywords(conn):
+    execute_script(conn, '''
+        CREATE TABLE IF NOT EXISTS urgent_keywords (
+            keyword TEXT PRIMARY KEY COLLATE NOCASE,
+            weight INTEGER NOT NULL DEFAULT 10
+        );
+    ''')
+    _seed_if_empty(conn, 'urgent_keywords',
+                   'INSERT OR IGNORE INTO urgent_keywords (keyword, weight) VALUES (?, ?)',
+                   [(keyword, DEFAULT_KEYWORD_WEIGHT) for keyword in DEFAULT_KEYWORDS])
+
+
+def create_dashboard_counters(conn):
+    add_column(conn, 'requests', 'request_type', 'TEXT')
+    add_column(conn, 'requests', 'status', "TEXT DEFAULT 'open'")
+    execute_script(conn, '''
+        CREATE TABLE IF NOT EXISTS dashboard_counters (
+            metric TEXT NOT NULL,
+            bucket TEXT NOT NULL,
+            value INTEGER NOT NULL,
+            PRIMARY KEY (metric, bucket)
+        );
+    ''' + dashboard.TRIGGERS)
+    dashboard.rebuild(conn)
+
+
+def index_request_pages(conn):
+    # Keyset pages of /api/messages walk these backwards, with or without an
+    # equality filter on level or source
+    execute_script(conn, '''
+        CREATE INDEX IF NOT EXISTS idx_requests_urgency ON requests (urgency_score, id);
+        CREATE INDEX IF NOT EXISTS idx_requests_level_urgency ON requests (urgency_level, urgency_score, id);
+        CREATE INDEX IF NOT EXISTS idx_requests_source_urgency ON requests (source, urgency_score, id);
+    ''')
+
+
+def create_message_search(conn):
+    # External-content index over requests: the text is stored once, in
+    # requests, and triggers keep the index in step with every write
+    execute_script(conn, '''
+        CREATE VIRTUAL TABLE IF NOT EXISTS requests_fts USING fts5(
+            message, source,
+            content='requests', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2'
+        );
+
+        CREATE TRIGGER IF NOT EXISTS requests_fts_insert AFTER INSERT ON requests BEGIN
+            INSERT INTO requests_fts (rowid, message, source) VALUES (NEW.id, NEW.message, NEW.source);
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS requests_fts_delete AFTER DELETE ON requests BEGIN
+            INSERT INTO requests_fts (requests_fts, rowid, message, source)
+            VALUES ('delete', OLD.id, OLD.message, OLD.source);
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS requests_fts_update AFTER UPDATE OF message, source ON requests BEGIN
+            INSERT INTO requests_fts (requests_fts, rowid, message, source)
+            VALUES ('delete', OLD.id, OLD.message, OLD.source);
+            INSERT INTO requests_fts (rowid, message, source) VALUES (NEW.id, NEW.message, NEW.source);
+        END;
+    ''')
+    conn.execute("INSERT INTO requests_fts (requests_fts) VALUES ('rebuild')")
+
+
+def create_result_cache(conn):
+    execute_script(conn, '''
+        CREATE TABLE IF NOT EXISTS result_cache (
+            key TEXT PRIMARY KEY,
+            namespace TEXT NOT NULL,
+            value BLOB NOT NULL,
+            expires_at REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_result_cache_expiry ON result_cache (expires_at);
+    ''')
+
+
+def track_road_changes(conn):
+    # Closed roads keep their row (and distance) so reopening restores them
+    add_column(conn, 'location_graph', 'closed_at', 'TEXT')
+    add_column(conn, 'location_graph', 'updated_at', 'TEXT')
+    execute_script(conn, '''
+        CREATE TABLE IF NOT EXISTS road_events (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            from_loc TEXT NOT NULL,
+            to_loc TEXT NOT NULL,
+            action TEXT NOT NULL,
+            distance INTEGER,
+            reported_at TEXT NOT NULL,
+            note TEXT,
+            recorded_at TEXT DEFAULT CURRENT_TIMESTAMP
+        );
+    ''')
+
+
+def index_request_timestamps(conn):
+    # Narrow since/until windows of /api/messages are read through this
+    execute_script(conn, '''
+        CREATE INDEX IF NOT EXISTS idx_requests_timestamp ON requests (timestamp);
+    ''')
+
+
+def drop_route_matrix(conn):
+    # Multi-dispatch reads center rows off center trees and targeted
+    # searches; the all-pairs table is no longer kept
+    conn.execute('DROP TABLE IF EXISTS route_matrix')
+
+
+# Append only: a migration's position is its version number
+MIGRATIONS = [
+    create_base_schema,
+    index_area_urgency,
+    create_route_matrix,
+    create_urgent_keywords,
+    create_dashboard_counters,
+    index_request_pages,
+    create_message_search,
+    create_result_cache,
+    track_road_changes,
+    index_request_timestamps,
+    drop_route_matrix,
+]
+
+
+def schema_version(conn):
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+
+def migrate(conn):
+    """Apply pending migrations; returns how many ran"""
+    if schema_version(conn) >= len(MIGRATIONS):
+        return 0
+
+    applied = 0
+    while True:
+        # Re-read under the write lock in case another process migrated first
+        conn.execute('BEGIN IMMEDIATE')
+        version = schema_version(conn)
+        if version >= len(MIGRATIONS):
+            conn.commit()
+            return applied
+        MIGRATIONS[version](conn)
+        conn.execute(f'PRAGMA user_version = {version + 1}')
+        conn.commit()
+        applied += 1
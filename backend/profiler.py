@@ -0,0 +1,110 @@
+"""Opt-in sampling profiler for hot-path investigations.
+
+While running, a background thread snapshots the stack of every other
+thread at a fixed interval with ``sys._current_frames()`` and counts
+identical stacks.  Idle threads (waiting on a lock, queue or the event
+loop's selector) are skipped, so the counts show where the server is
+actually busy.  The report is available as JSON or in the collapsed
+"frame;frame;frame count" format that flamegraph tools read.
+
+Sampling a few hundred times a second costs little, but the profiler only
+runs between ``start()`` and ``stop()`` and stops by itself after
+``duration_s`` so a forgotten session does not linger.
+"""
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+# Threads whose innermost frame is in one of these files are idle (thread.py
+# is the executor worker loop waiting for work)
+IDLE_FILES = ('threading.py', 'queue.py', 'selectors.py', 'thread.py')
+
+MAX_DURATION_S = 300
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    return f'{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})'
+
+
+def collapse(frame):
+    """Stack of ``frame`` as a root-first "a;b;c" string"""
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    return ';'.join(reversed(labels))
+
+
+class SamplingProfiler:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+        self._stacks = Counter()
+        self.samples = 0
+        self.interval_ms = None
+        self.started_at = None
+        self.stopped_at = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, interval_ms=5, duration_s=30):
+        """Begin a new session, discarding the previous report"""
+        with self._lock:
+            if self.running:
+                raise RuntimeError('Profiler is already running')
+            self._stacks = Counter()
+            self.samples = 0
+            self.interval_ms = interval_ms
+            self.started_at = time.time()
+            self.stopped_at = None
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._sample, args=(interval_ms / 1000, min(duration_s, MAX_DURATION_S)),
+                name='optirelief-profiler', daemon=True
+            )
+            self._thread.start()
+
+    def stop(self):
+        thread = self._thread
+        if thread is not None:
+            self._stop.set()
+            thread.join()
+
+    def _sample(self, interval, duration):
+        own = threading.get_ident()
+        deadline = time.monotonic() + duration
+        while not self._stop.wait(interval) and time.monotonic() < deadline:
+            frames = sys._current_frames()
+            busy = []
+            for thread_id, frame in frames.items():
+                if thread_id == own or os.path.basename(frame.f_code.co_filename) in IDLE_FILES:
+                    continue
+                busy.append(collapse(frame))
+            del frames
+            with self._lock:
+                self._stacks.update(busy)
+                self.samples += 1
+        self.stopped_at = time.time()
+
+    def report(self, limit=100):
+        with self._lock:
+            stacks = self._stacks.most_common(limit)
+            samples = self.samples
+        return {
+            'running': self.running,
+            'interval_ms': self.interval_ms,
+            'started_at': self.started_at,
+            'stopped_at': self.stopped_at,
+            'samples': samples,
+            'stacks': [{'stack': stack, 'count': count} for stack, count in stacks]
+        }
+
+    def collapsed(self):
+        with self._lock:
+            return ''.join(f'{stack} {count}\n' for stack, count in self._stacks.most_common())
@@ -0,0 +1,78 @@
+"""Pre-serialized responses for rarely changing reference data.
+
+Each cached endpoint names the tables it reads.  Writes bump an in-process
+version counter per table; a cached body is reused until one of its
+tables' versions moves.  Bodies carry a content-hash ETag, so a client
+revalidating with ``If-None-Match`` gets a bodiless 304 when nothing
+changed -- without a query or any JSON encoding.
+"""
+import asyncio
+import hashlib
+import json
+from collections import defaultdict
+
+from fastapi import Response
+
+from metrics import phase
+
+
+def _etag(body):
+    return '"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"'
+
+
+def etag_matches(if_none_match, etag):
+    """Whether an ``If-None-Match`` header value covers ``etag``"""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(','):
+        candidate = candidate.strip()
+        if candidate.startswith('W/'):
+            candidate = candidate[2:]
+        if candidate == '*' or candidate == etag:
+            return True
+    return False
+
+
+class ResponseCache:
+    """JSON bodies and ETags keyed by endpoint, checked against table versions"""
+
+    def __init__(self):
+        self.versions = defaultdict(int)
+        self._entries = {}
+        self._locks = defaultdict(asyncio.Lock)
+
+    def bump(self, *tables):
+        """Record a committed write to ``tables``"""
+        for table in tables:
+            self.versions[table] += 1
+
+    def _current(self, key, version):
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] == version:
+            return entry
+        return None
+
+    async def _entry(self, key, tables, build):
+        version = tuple(self.versions[table] for table in tables)
+        entry = self._current(key, version)
+        if entry is not None:
+            return entry
+        async with self._locks[key]:
+            entry = self._current(key, version)
+            if entry is None:
+                content = await build()
+                with phase('encode'):
+                    body = json.dumps(content, ensure_ascii=False, separators=(',', ':')).encode()
+                entry = (version, body, _etag(body))
+                # Only keep it if no write landed while building
+                if version == tuple(self.versions[table] for table in tables):
+                    self._entries[key] = entry
+            return entry
+
+    async def respond(self, request, key, tables, build):
+        """Cached response for ``key``, rebuilt by ``await build()`` when stale"""
+        _, body, etag = await self._entry(key, tables, build)
+        headers = {'ETag': etag, 'Cache-Control': 'no-cache'}
+        if etag_matches(request.headers.get('if-none-match'), etag):
+            return Response(status_code=304, headers=headers)
+        return Response(content=body, media_type='application/json', headers=headers)
@@ -0,0 +1,171 @@
+"""Memoized optimization results, addressed by the content they depend on.
+
+A result is keyed by a hash of its endpoint, the request payload in
+canonical form (sorted keys, no whitespace) and a fingerprint of the stored
+data the solve reads -- the road graph signature, the available volunteers
+and so on.  Because the key names the inputs themselves rather than
+in-process table versions, a stored result stays valid across restarts
+and goes stale only by falling out of the cache.
+
+Entries live in an LRU bounded by count, encoded size and age.  With a
+database attached, every new result is also written to the
+``result_cache`` table, and a miss in memory checks there before solving,
+so warm results survive a restart.  Concurrent identical requests share a
+single solve.
+"""
+import asyncio
+import hashlib
+import json
+import time
+from collections import OrderedDict
+
+from metrics import Counter, registry
+
+result_cache_requests = registry.register(Counter(
+    'optirelief_result_cache_requests_total', 'Result cache lookups by endpoint and outcome',
+    ('namespace', 'outcome')))
+result_cache_evictions = registry.register(Counter(
+    'optirelief_result_cache_evictions_total', 'Results dropped from memory by reason', ('reason',)))
+
+# Persisted rows are trimmed after this many inserts
+PRUNE_EVERY = 64
+
+
+def _encode(value, canonical=False):
+    return json.dumps(value, sort_keys=canonical, ensure_ascii=False, separators=(',', ':')).encode()
+
+
+def cache_key(namespace, payload):
+    """Hex digest naming ``payload`` (any JSON-compatible value) under ``namespace``"""
+    return hashlib.blake2b(namespace.encode() + b'\0' + _encode(payload, canonical=True), digest_size=16).hexdigest()
+
+
+class ResultCache:
+    def __init__(self, max_entries=1024, max_bytes=64 * 1024 * 1024, ttl=3600, database=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.database = database
+        # key -> (expires_at, value, size), least recently used first
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._pending = {}
+        self._inserts = 0
+        self.hits = 0
+        self.misses = 0
+
+    def _lookup(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= time.time():
+            self._drop(key, 'expired')
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def _drop(self, key, reason):
+        _, _, size = self._entries.pop(key)
+        self._bytes -= size
+        result_cache_evictions.inc(1, reason)
+
+    def _store(self, key, value, size, expires_at):
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._drop(key, 'replaced')
+        self._entries[key] = (expires_at, value, size)
+        self._bytes += size
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            self._drop(next(iter(self._entries)), 'size')
+
+    def _load(self, conn, key):
+        return conn.execute(
+            'SELECT value, expires_at FROM result_cache WHERE key = ? AND expires_at > ?', (key, time.time())
+        ).fetchone()
+
+    def _save(self, conn, key, namespace, body, expires_at, prune):
+        conn.execute(
+            'INSERT OR REPLACE INTO result_cache (key, namespace, value, expires_at) VALUES (?, ?, ?, ?)',
+            (key, namespace, body, expires_at)
+        )
+        if prune:
+            conn.execute('DELETE FROM result_cache WHERE expires_at <= ?', (time.time(),))
+            conn.execute(
+                'DELETE FROM result_cache WHERE key NOT IN '
+                '(SELECT key FROM result_cache ORDER BY expires_at DESC LIMIT ?)',
+                (self.max_entries,)
+            )
+
+    async def get_or_compute(self, namespace, payload, compute):
+        """Cached result for ``payload``, else ``await compute()`` (stored unless it raises)"""
+        key = cache_key(namespace, payload)
+        entry = self._lookup(key)
+        if entry is not None:
+            self.hits += 1
+            result_cache_requests.inc(1, namespace, 'hit')
+            return entry[1]
+
+        pending = self._pending.get(key)
+        if pending is not None:
+            self.hits += 1
+            result_cache_requests.inc(1, namespace, 'shared')
+            return await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        self._pending[key] = future
+        try:
+            value = await self._fill(namespace, key, compute)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Waiters see the exception; nobody else has to retrieve it
+            future.exception()
+            raise
+        else:
+            future.set_result(value)
+            return value
+        finally:
+            del self._pending[key]
+
+    async def _fill(self, namespace, key, compute):
+        if self.database is not None:
+            row = await self.database.run(self._load, key)
+            if row is not None:
+                self.hits += 1
+                result_cache_requests.inc(1, namespace, 'stored')
+                value = json.loads(row[0])
+                self._store(key, value, len(row[0]), row[1])
+                return value
+
+        self.misses += 1
+        result_cache_requests.inc(1, namespace, 'miss')
+        value = await compute()
+        body = _encode(value)
+        expires_at = time.time() + self.ttl
+        self._store(key, value, len(body), expires_at)
+        if self.database is not None:
+            self._inserts += 1
+            await self.database.run(
+                self._save, key, namespace, body, expires_at, self._inserts % PRUNE_EVERY == 0, write=True
+            )
+        return value
+
+    def stats(self):
+        return {
+            'entries': len(self._entries),
+            'bytes': self._bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'max_entries': self.max_entries,
+            'max_bytes': self.max_bytes,
+            'ttl_s': self.ttl
+        }
+
+    async def clear(self):
+        self._entries.clear()
+        self._bytes = 0
+        if self.database is not None:
+            await self.database.run(lambda conn: conn.execute('DELETE FROM result_cache'), write=True)
@@ -0,0 +1,336 @@
+"""In-memory road graph built from the ``location_graph`` table.
+
+The table is loaded once into a compressed sparse row (CSR) adjacency
+structure and kept until an edge changes.  Searches use a binary heap, so a
+point-to-point query costs O((V + E) log V) instead of rebuilding a
+``networkx.Graph`` and scanning every node on each request.
+"""
+import copy
+import hashlib
+import heapq
+import math
+from array import array
+
+from database import LoadedCache
+from solver_jobs import Shared
+
+INF = float('infinity')
+EARTH_RADIUS_KM = 6371.0
+# Graph signatures are sums of per-edge hashes modulo this
+SIGNATURE_MODULUS = 1 << 128
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance between two coordinates in kilometres"""
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = (math.sin((lat2 - lat1) / 2) ** 2 +
+         math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def _edge_hash(u, v, distance):
+    if v < u:
+        u, v = v, u
+    digest = hashlib.blake2b(repr((u, v, distance)).encode(), digest_size=16).digest()
+    return int.from_bytes(digest, 'big')
+
+
+def _replace_rows(indptr, indices, weights, rows):
+    """CSR arrays with whole rows replaced; ``rows`` maps row -> (indices, weights)"""
+    new_indptr = array('q')
+    new_indices = array('q')
+    new_weights = array(weights.typecode)
+    done = 0
+    delta = 0
+    for i in sorted(rows):
+        # Rows before i move by the growth of the rows replaced so far
+        segment = indptr[done:i + 1]
+        new_indptr += array('q', [p + delta for p in segment]) if delta else segment
+        new_indices += indices[indptr[done]:indptr[i]]
+        new_weights += weights[indptr[done]:indptr[i]]
+        row_indices, row_weights = rows[i]
+        new_indices += row_indices
+        new_weights += row_weights
+        delta += len(row_indices) - (indptr[i + 1] - indptr[i])
+        done = i + 1
+    segment = indptr[done:]
+    new_indptr += array('q', [p + delta for p in segment]) if delta else segment
+    new_indices += indices[indptr[done]:]
+    new_weights += weights[indptr[done]:]
+    return new_indptr, new_indices, new_weights
+
+
+class RoadGraph:
+    """Undirected weighted graph stored as CSR arrays"""
+
+    def __init__(self, edges, coordinates=None, isolated=()):
+        # Undirected edges keyed by node pair; a later row for the same pair
+        # replaces the earlier one, matching networkx.Graph.add_edge
+        pairs = {}
+        nodes = {}
+        for from_loc, to_loc, distance in edges:
+            nodes.setdefault(from_loc, len(nodes))
+            nodes.setdefault(to_loc, len(nodes))
+            key = (from_loc, to_loc) if from_loc <= to_loc else (to_loc, from_loc)
+            pairs[key] = distance
+        # Endpoints of closed roads stay addressable, just unreachable
+        for node in isolated:
+            nodes.setdefault(node, len(nodes))
+
+        self.nodes = list(nodes)
+        self.index = nodes
+        n = len(self.nodes)
+
+        adjacency = [[] for _ in range(n)]
+        for (u, v), distance in pairs.items():
+            i, j = nodes[u], nodes[v]
+            adjacency[i].append((j, distance))
+            if i != j:
+                adjacency[j].append((i, distance))
+
+        # Integer distances stay integers so responses keep their JSON types
+        integral = all(isinstance(d, int) for d in pairs.values())
+        self.indptr = array('q', [0])
+        self.indices = array('q')
+        self.weights = array('q' if integral else 'd')
+        for neighbors in adjacency:
+            for j, distance in neighbors:
+                self.indices.append(j)
+                self.weights.append(distance)
+            self.indptr.append(len(self.indices))
+
+        self.edge_count = len(pairs)
+        # Identifies the edge set, so derived data (e.g. the all-pairs route
+        # matrix) can tell whether it was computed from this graph.  A sum of
+        # edge hashes rather than a hash of the sorted edges, so with_edge()
+        # can update it without visiting every edge
+        self._signature_sum = sum(_edge_hash(u, v, d) for (u, v), d in pairs.items()) % SIGNATURE_MODULUS
+        self.signature = f'{self._signature_sum:032x}'
+        self._heuristic_scale = None
+        self.coordinates = None
+        if coordinates:
+            self._set_coordinates(coordinates)
+
+    def __contains__(self, node):
+        return node in self.index
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def neighbors(self, i):
+        """(neighbor index, weight) pairs of the node at index ``i``"""
+        start, stop = self.indptr[i], self.indptr[i + 1]
+        return zip(self.indices[start:stop], self.weights[start:stop])
+
+    def edge_weight(self, u, v):
+        i, j = self.index[u], self.index[v]
+        for k, w in self.neighbors(i):
+            if k == j:
+                return w
+        raise KeyError((u, v))
+
+    def weight_or_none(self, u, v):
+        if u not in self.index or v not in self.index:
+            return None
+        try:
+            return self.edge_weight(u, v)
+        except KeyError:
+            return None
+
+    def with_edge(self, u, v, distance):
+        """Copy of the graph with road ``u``-``v`` set to ``distance``, or removed if None.
+
+        Node indices are kept and new nodes appended, so arrays indexed by
+        node (shortest-path trees) stay valid for the copy.
+        """
+        old = self.weight_or_none(u, v)
+        graph = copy.copy(self)
+        for node in (u, v):
+            if node not in graph.index:
+                if graph.index is self.index:
+                    graph.nodes, graph.index = list(self.nodes), dict(self.index)
+                    graph.coordinates, graph._heuristic_scale = None, None
+                graph.index[node] = len(graph.nodes)
+                graph.nodes.append(node)
+                graph.indptr = graph.indptr + array('q', [graph.indptr[-1]])
+
+        i, j = graph.index[u], graph.index[v]
+        indptr, indices, weights = graph.indptr, graph.indices, graph.weights
+        if distance is not None and weights.typecode == 'q' and not isinstance(distance, int):
+            weights = array('d', weights)
+        slots = [k for a, b in ((i, j), (j, i)) for k in range(indptr[a], indptr[a + 1]) if indices[k] == b]
+        if distance is not None and old is not None:
+            # A reweight leaves the structure alone
+            weights = weights[:] if weights is graph.weights else weights
+            for k in slots:
+                weights[k] = distance
+        else:
+            # Rows are rebuilt from the original arrays, so a self-loop
+            # (i == j) is simply written twice, identically
+            rows = {}
+            for a, b in ((i, j), (j, i)):
+                row = [(indices[k], weights[k]) for k in range(indptr[a], indptr[a + 1]) if indices[k] != b]
+                if distance is not None:
+                    row.append((b, distance))
+                rows[a] = (array('q', [k for k, _ in row]), array(weights.typecode, [w for _, w in row]))
+            indptr, indices, weights = _replace_rows(indptr, indices, weights, rows)
+        graph.indptr, graph.indices, graph.weights = indptr, indices, weights
+
+        graph.edge_count += (distance is not None) - (old is not None)
+        total = self._signature_sum
+        if old is not None:
+            total -= _edge_hash(u, v, old)
+        if distance is not None:
+            total += _edge_hash(u, v, distance)
+        graph._signature_sum = total % SIGNATURE_MODULUS
+        graph.signature = f'{graph._signature_sum:032x}'
+
+        # A cheaper edge may lower the A* scale; a dearer or removed one
+        # leaves the old scale a valid lower bound
+        if distance is not None and graph.coordinates is not None:
+            km = haversine_km(*graph.coordinates[i], *graph.coordinates[j])
+            if km > 0:
+                graph._heuristic_scale = min(graph._heuristic_scale, distance / km)
+        return graph
+
+    def _set_coordinates(self, coordinates):
+        coords = [coordinates.get(node) for node in self.nodes]
+        if any(c is None for c in coords):
+            # A* needs a position for every node to stay admissible
+            return
+        self.coordinates = coords
+
+        # Edge weights are in route units, not kilometres, so scale the
+        # straight-line distance by the smallest units-per-km ratio of any
+        # edge; this keeps the heuristic a lower bound on the remaining cost
+        scale = INF
+        for i in range(len(self.nodes)):
+            for j, w in self.neighbors(i):
+                km = haversine_km(*coords[i], *coords[j])
+                if km > 0:
+                    scale = min(scale, w / km)
+        self._heuristic_scale = 0.0 if scale == INF else scale
+
+    @property
+    def supports_astar(self):
+        return self._heuristic_scale is not None
+
+    def _heuristic(self, target):
+        lat, lon = self.coordinates[target]
+        scale = self._heuristic_scale
+        coords = self.coordinates
+        return lambda i: scale * haversine_km(coords[i][0], coords[i][1], lat, lon)
+
+    def shortest_path_tree(self, source, targets=None, astar=False):
+        """Heap-based Dijkstra (or A*) from the node index ``source``.
+
+        Returns ``(dist, prev)`` lists indexed by node.  When ``targets`` is
+        given the search stops as soon as all of them are settled; ``astar``
+        requires exactly one target and coordinates for every node.
+        """
+        n = len(self.nodes)
+        dist = [INF] * n
+        prev = [-1] * n
+        dist[source] = 0
+        remaining = set(targets) if targets is not None else None
+
+        h = None
+        if astar and self.supports_astar and remaining is not None and len(remaining) == 1:
+            h = self._heuristic(next(iter(remaining)))
+
+        indptr, indices, weights = self.indptr, self.indices, self.weights
+        settled = [False] * n
+        heap = [(h(source) if h else 0, 0, source)]
+        while heap:
+            _, d, u = heapq.heappop(heap)
+            if settled[u]:
+                continue
+            settled[u] = True
+            if remaining is not None:
+                remaining.discard(u)
+                if not remaining:
+                    break
+            for k in range(indptr[u], indptr[u + 1]):
+                v = indices[k]
+                nd = d + weights[k]
+                if nd < dist[v]:
+                    dist[v] = nd
+                    prev[v] = u
+                    heapq.heappush(heap, (nd + h(v) if h else nd, nd, v))
+        return dist, prev
+
+    def path_from_tree(self, prev, source, target):
+        """Node ids on the tree path from ``source`` to ``target``"""
+        path = [target]
+        while target != source:
+            target = prev[target]
+            if target < 0:
+                return None
+            path.append(target)
+        return [self.nodes[i] for i in reversed(path)]
+
+    def shortest_path(self, start, end, astar=False):
+        """Shortest ``(path, distance)`` between two node ids"""
+        if start not in self.index or end not in self.index:
+            return None, INF
+        s, t = self.index[start], self.index[end]
+        dist, prev = self.shortest_path_tree(s, targets=(t,), astar=astar)
+        if dist[t] == INF:
+            return None, INF
+        return self.path_from_tree(prev, s, t), dist[t]
+
+
+def center_location(center_id):
+    """Graph node a dispatch center sits on.
+
+    Seed data names the center at location ``A`` ``center_a``; any other id
+    is taken to be the node id itself.
+    """
+    if center_id.startswith('center_'):
+        return center_id[len('center_'):].upper()
+    return center_id
+
+
+def center_coordinates(centers):
+    """Map graph node ids to dispatch center coordinates"""
+    coordinates = {}
+    for center_id, latitude, longitude in centers:
+        coordinates.setdefault(center_location(center_id), (latitude, longitude))
+    return coordinates
+
+
+def load_road_graph(conn):
+    """RoadGraph of the open roads in ``location_graph``"""
+    edges = conn.execute('SELECT from_loc, to_loc, distance FROM location_graph WHERE closed_at IS NULL').fetchall()
+    closed = conn.execute('SELECT from_loc, to_loc FROM location_graph WHERE closed_at IS NOT NULL').fetchall()
+    centers = conn.execute('SELECT id, latitude, longitude FROM dispatch_centers').fetchall()
+    return RoadGraph(edges, center_coordinates(centers), isolated=[node for row in closed for node in row])
+
+
+def shared_graph(graph):
+    """Road graph argument that solver workers keep between calls"""
+    return Shared(('road_graph', graph.signature, id(graph)), graph)
+
+
+class RoadGraphCache(LoadedCache):
+    """Loads the road graph once and reloads it after ``invalidate()``"""
+
+    def _load(self, conn):
+        return load_road_graph(conn)
+
+    def apply_edge(self, from_loc, to_loc, distance):
+        """Patch the cached graph for one committed road change instead of reloading it.
+
+        ``distance`` None means the road is closed or gone.  Returns the
+        ``(old, new)`` graphs, or ``(None, None)`` if none was loaded.
+        """
+        if isinstance(distance, float) and distance.is_integer():
+            # The INTEGER column stores 5.0 as 5; match what a reload would see
+            distance = int(distance)
+        # A load that started before this change must not be published
+        self.version += 1
+        old = self._value
+        if old is None:
+            return None, None
+        self._value = old.with_edge(from_loc, to_loc, distance)
+        return old, self._value
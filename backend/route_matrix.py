@@ -0,0 +1,65 @@
+"""Shortest routes between selected dispatch centers for ``/api/multi-dispatch``.
+
+Only the rows of the centers a request names are ever read, so nothing is
+computed or stored for the rest of the road network.  A center whose
+shortest-path tree is already cached (``dynamic_routing.CenterTreeCache``,
+repaired in place as roads change) is read straight off it; the others
+get one early-terminating search each through ``batch_routing.route_table``,
+which stops as soon as every selected center is settled.  A request over
+k centers therefore costs at most k partial searches, however large the
+graph, where an all-pairs table over every road node would need O(n^2)
+memory.
+"""
+from batch_routing import route_table
+from road_graph import shared_graph
+
+# Searches over at most this many nodes in total run on the event loop;
+# larger ones go to a solver worker when a pool is given
+INLINE_SEARCH_NODES = 20_000
+
+
+class DispatchRoutes:
+    """Center-to-center route tables from cached center trees and targeted searches"""
+
+    def __init__(self, center_trees, solvers=None):
+        self.center_trees = center_trees
+        self.solvers = solvers
+
+    async def table(self, graph, nodes):
+        """``(costs, paths)`` between every pair of ``nodes`` (center node ids).
+
+        ``costs[i][j]`` is the road distance from ``nodes[i]`` to ``nodes[j]``
+        and ``paths[i][j]`` the node ids along it, both None when there is
+        no route (or a node has no roads at all).
+        """
+        distinct = [node for node in dict.fromkeys(nodes) if node in graph]
+        # source -> target -> (distance, path)
+        rows = {}
+        searched = []
+        for node in distinct:
+            tree = await self.center_trees.cached(node)
+            if tree is None or tree[0] is not graph:
+                searched.append(node)
+                continue
+            _, dist, prev = tree
+            root = graph.index[node]
+            row = rows[node] = {}
+            for target in distinct:
+                path, distance = self.center_trees.path(graph, dist, prev, root, target)
+                row[target] = (distance, path) if path is not None else (None, None)
+
+        if searched:
+            if self.solvers is None or len(searched) * len(graph) <= INLINE_SEARCH_NODES:
+                found = route_table(graph, searched, distinct, paths=True)
+            else:
+                found = await self.solvers.run(
+                    route_table, shared_graph(graph), searched, distinct, True, name='dispatch_routes'
+                )
+            for source, distances, paths in zip(searched, found['distances'], found['paths']):
+                rows[source] = {target: (d, path) for target, d, path in zip(distinct, distances, paths)}
+
+        def cell(source, target):
+            return rows.get(source, {}).get(target, (None, None))
+
+        table = [[cell(source, target) for target in nodes] for source in nodes]
+        return [[d for d, _ in row] for row in table], [[path for _, path in row] for row in table]
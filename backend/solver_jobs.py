@@ -0,0 +1,319 @@
+"""Out-of-process execution for CPU-bound solvers.
+
+Knapsack packing, volunteer assignment, route matrices and tour planning
+are pure Python and hold the GIL, so running one on the event loop -- or
+on a thread -- stalls every other request.  ``SolverPool`` runs them in
+separate worker processes instead:
+
+* Each worker is a spawned process that takes one call at a time over a
+  pipe.  Workers start on first use and are reused afterwards.
+* Every call has a timeout.  A call that times out or whose caller is
+  cancelled has its worker killed -- pure Python loops cannot be
+  interrupted any other way -- and a fresh worker takes its place.
+* Exceptions raised by the solver are pickled back and re-raised in the
+  caller, so a ``ValueError`` still becomes a 400.
+* ``Shared(key, value)`` arguments are sent to a worker once and then
+  referenced by key, so a large road graph is not pickled on every call.
+
+``SolverJobs`` builds submit/poll/cancel jobs on top for inputs too large
+to wait for in one request.  Jobs live in memory and do not survive a
+restart.
+"""
+import asyncio
+import contextvars
+import multiprocessing
+import os
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from metrics import Counter, add_phase, algorithm_duration, algorithm_errors, registry
+
+# Seconds a pooled call may run when the caller does not say otherwise
+DEFAULT_TIMEOUT_S = 60
+# Shared values (e.g. road graphs) each worker keeps between calls
+MAX_SHARED_VALUES = 2
+
+# Job timeout of the job being run, which pooled calls inside it inherit
+_job_timeout = contextvars.ContextVar('job_timeout', default=None)
+_UNSET = object()
+
+solver_calls = registry.register(Counter(
+    'optirelief_solver_calls_total', 'Calls run in solver worker processes by outcome', ('algorithm', 'outcome')))
+
+
+class SolverTimeout(Exception):
+    pass
+
+
+class Shared:
+    """Call argument a worker keeps under ``key`` for later calls"""
+
+    def __init__(self, key, value):
+        self.key = key
+        self.value = value
+
+
+class _SharedRef:
+    def __init__(self, key):
+        self.key = key
+
+
+def _remember(store, key, value):
+    store[key] = value
+    store.move_to_end(key)
+    while len(store) > MAX_SHARED_VALUES:
+        store.popitem(last=False)
+
+
+def _worker_main(conn):
+    shared = OrderedDict()
+
+    def resolve(arg):
+        if isinstance(arg, Shared):
+            _remember(shared, arg.key, arg.value)
+            return arg.value
+        if isinstance(arg, _SharedRef):
+            shared.move_to_end(arg.key)
+            return shared[arg.key]
+        return arg
+
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            return
+        if message is None:
+            return
+        fn, args, kwargs = message
+        try:
+            start = time.perf_counter()
+            result = fn(*[resolve(arg) for arg in args], **kwargs)
+            reply = ('ok', result, time.perf_counter() - start)
+        except Exception as e:
+            reply = ('error', e, None)
+        try:
+            conn.send(reply)
+        except Exception as e:
+            # The result or exception could not be pickled
+            conn.send(('error', RuntimeError(f'{type(e).__name__}: {e}'), None))
+
+
+class _Worker:
+    def __init__(self, context):
+        conn, child_conn = context.Pipe()
+        self.process = context.Process(
+            target=_worker_main, args=(child_conn,), name='optirelief-solver', daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+        self.conn = conn
+        # Mirrors the worker's shared store so references are only sent
+        # for values it still holds
+        self.shared = OrderedDict()
+
+    def prepare(self, args):
+        prepared = []
+        for arg in args:
+            if isinstance(arg, Shared):
+                if arg.key in self.shared:
+                    self.shared.move_to_end(arg.key)
+                    arg = _SharedRef(arg.key)
+                else:
+                    _remember(self.shared, arg.key, True)
+            prepared.append(arg)
+        return prepared
+
+    def call(self, message):
+        self.conn.send(message)
+        return self.conn.recv()
+
+    def kill(self):
+        self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+    def close(self):
+        try:
+            self.conn.send(None)
+        except OSError:
+            pass
+        self.process.join(1)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.conn.close()
+
+
+class SolverPool:
+    """Worker processes for solver calls, at most ``workers`` at once"""
+
+    def __init__(self, workers=None, timeout=DEFAULT_TIMEOUT_S):
+        self.size = workers or int(os.environ.get('OPTIRELIEF_SOLVER_WORKERS', 0)) or os.cpu_count() or 1
+        self.timeout = timeout
+        # Spawned rather than forked: the server has threads and open
+        # SQLite connections that a forked child must not inherit
+        self._context = multiprocessing.get_context('spawn')
+        self._idle = []
+        self._workers = set()
+        self._slots = None
+        # Pipe sends and receives block, so they wait on threads of their own
+        self._threads = ThreadPoolExecutor(self.size, thread_name_prefix='optirelief-solver')
+
+    def _semaphore(self):
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.size)
+        return self._slots
+
+    async def run(self, fn, *args, timeout=_UNSET, name=None, **kwargs):
+        """``fn(*args, **kwargs)`` in a worker process.
+
+        ``timeout`` defaults to the surrounding job's timeout, or the pool's;
+        ``None`` waits indefinitely.  ``name`` labels the call's metrics.
+        """
+        if timeout is _UNSET:
+            timeout = _job_timeout.get() or self.timeout
+        label = name or fn.__name__
+        loop = asyncio.get_running_loop()
+        async with self._semaphore():
+            worker = self._idle.pop() if self._idle else None
+            if worker is None:
+                worker = await loop.run_in_executor(self._threads, _Worker, self._context)
+                self._workers.add(worker)
+            message = (fn, worker.prepare(args), kwargs)
+            try:
+                status, value, elapsed = await asyncio.wait_for(
+                    loop.run_in_executor(self._threads, worker.call, message), timeout
+                )
+            except BaseException as e:
+                # Timed out, cancelled or the worker died: it cannot be reused
+                self._workers.discard(worker)
+                worker.kill()
+                if isinstance(e, asyncio.TimeoutError):
+                    solver_calls.inc(1, label, 'timeout')
+                    raise SolverTimeout(f'{label} did not finish within {timeout:g}s') from None
+                solver_calls.inc(1, label, 'cancelled' if isinstance(e, asyncio.CancelledError) else 'crashed')
+                raise
+            self._idle.append(worker)
+        if status == 'error':
+            solver_calls.inc(1, label, 'error')
+            algorithm_errors.inc(1, label)
+            raise value
+        # Metrics recorded inside the worker stay there, so record them here
+        solver_calls.inc(1, label, 'ok')
+        algorithm_duration.observe(elapsed, label)
+        add_phase('algorithm', elapsed)
+        return value
+
+    async def call(self, fn, *args, inline=False, **kwargs):
+        """``fn`` on the event loop when ``inline``, else in a worker.
+
+        Small inputs finish faster than a round trip to another process.
+        """
+        if inline:
+            return fn(*[arg.value if isinstance(arg, Shared) else arg for arg in args], **kwargs)
+        return await self.run(fn, *args, **kwargs)
+
+    def close(self):
+        self._idle = []
+        for worker in list(self._workers):
+            worker.close()
+        self._workers.clear()
+        self._threads.shutdown(wait=False)
+
+
+class TooManyJobs(Exception):
+    pass
+
+
+class SolverJobs:
+    """Background solver runs, polled by id.
+
+    ``submit`` takes a zero-argument coroutine function and runs it as a
+    task under ``timeout``.  Statuses go ``queued`` -> ``running`` ->
+    ``succeeded``, ``failed``, ``cancelled`` or ``timed_out``.  An exception
+    with ``status_code`` and ``detail`` (an ``HTTPException``) is kept as
+    the job's error.  Finished jobs are forgotten after ``ttl`` seconds.
+    """
+
+    def __init__(self, max_active=64, ttl=900, on_update=None):
+        self.max_active = max_active
+        self.ttl = ttl
+        self.on_update = on_update
+        self._jobs = OrderedDict()
+        self._tasks = {}
+
+    def _prune(self):
+        cutoff = time.time() - self.ttl
+        for job_id, job in list(self._jobs.items()):
+            if job['finished_at'] is not None and job['finished_at'] < cutoff:
+                del self._jobs[job_id]
+
+    def _update(self, job, **changes):
+        job.update(changes)
+        if self.on_update is not None:
+            self.on_update(self.status(job))
+
+    def submit(self, kind, run, timeout):
+        self._prune()
+        if len(self._tasks) >= self.max_active:
+            raise TooManyJobs(f'{self.max_active} jobs are already queued or running')
+        job = {
+            'id': uuid.uuid4().hex,
+            'solver': kind,
+            'status': 'queued',
+            'timeout_s': timeout,
+            'submitted_at': time.time(),
+            'started_at': None,
+            'finished_at': None,
+            'error': None,
+            'result': None
+        }
+        self._jobs[job['id']] = job
+        self._tasks[job['id']] = asyncio.get_running_loop().create_task(self._run(job, run, timeout))
+        return job
+
+    async def _run(self, job, run, timeout):
+        _job_timeout.set(timeout)
+        self._update(job, status='running', started_at=time.time())
+        changes = {}
+        try:
+            changes['result'] = await asyncio.wait_for(run(), timeout)
+            changes['status'] = 'succeeded'
+        except (asyncio.TimeoutError, SolverTimeout):
+            changes['status'] = 'timed_out'
+            changes['error'] = {'status_code': 504, 'detail': f'Job did not finish within {timeout:g}s'}
+        except asyncio.CancelledError:
+            changes['status'] = 'cancelled'
+        except Exception as e:
+            changes['status'] = 'failed'
+            changes['error'] = {
+                'status_code': getattr(e, 'status_code', 500),
+                'detail': getattr(e, 'detail', None) or str(e) or type(e).__name__
+            }
+        finally:
+            del self._tasks[job['id']]
+            self._update(job, finished_at=time.time(), **changes)
+
+    def get(self, job_id):
+        self._prune()
+        return self._jobs.get(job_id)
+
+    def cancel(self, job_id):
+        """Cancel a queued or running job; False if it already finished"""
+        task = self._tasks.get(job_id)
+        if task is None:
+            return False
+        task.cancel()
+        return True
+
+    @staticmethod
+    def status(job):
+        return {key: value for key, value in job.items() if key != 'result'}
+
+    async def close(self):
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,166 @@
+"""Nearest-neighbour and radius queries over dispatch center coordinates.
+
+Points are placed on the unit sphere as 3-D vectors, where straight-line
+(chord) distance orders points exactly like great-circle distance, and
+indexed in a static KD-tree with bounding boxes per node.  Queries visit
+nodes best-first, skip any whose box is farther than the current answer and
+scan leaves with vectorized NumPy, so they touch a few leaves rather than
+every center.  Results are reported as haversine kilometres.
+"""
+import heapq
+import math
+
+from database import LoadedCache
+from lazy_imports import lazy_import
+from road_graph import EARTH_RADIUS_KM
+
+np = lazy_import('numpy')
+
+# Points per leaf; leaves are scanned with one vectorized distance computation
+LEAF_SIZE = 32
+
+
+def to_unit_vectors(latitudes, longitudes):
+    lat = np.radians(np.asarray(latitudes, dtype=np.float64))
+    lon = np.radians(np.asarray(longitudes, dtype=np.float64))
+    cos_lat = np.cos(lat)
+    return np.stack([cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)], axis=-1)
+
+
+def haversine_km_array(lat, lon, latitudes, longitudes):
+    """Great-circle kilometres from one coordinate to arrays of coordinates"""
+    lat1, lon1 = math.radians(lat), math.radians(lon)
+    lat2 = np.radians(np.asarray(latitudes, dtype=np.float64))
+    lon2 = np.radians(np.asarray(longitudes, dtype=np.float64))
+    a = (np.sin((lat2 - lat1) / 2) ** 2 +
+         math.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def _chord_for_km(km):
+    """Unit-sphere chord length spanning ``km`` along the surface"""
+    angle = min(km / EARTH_RADIUS_KM, math.pi)
+    return 2 * math.sin(angle / 2)
+
+
+class SpatialIndex:
+    """Static KD-tree over ``items`` located at parallel latitude/longitude lists"""
+
+    def __init__(self, items, latitudes, longitudes):
+        self.items = list(items)
+        self.latitudes = np.array(latitudes, dtype=np.float64)
+        self.longitudes = np.array(longitudes, dtype=np.float64)
+        xyz = to_unit_vectors(self.latitudes, self.longitudes).reshape(-1, 3)
+        n = len(self.items)
+
+        # Nodes: [start, end) slice of the reordered points, children and box
+        self._starts, self._ends, self._left, self._right = [], [], [], []
+        self._lo, self._hi = [], []
+        order = np.arange(n)
+        if n:
+            self._build(xyz, order, 0, n)
+        self._order = order
+        self._xyz = xyz[order]
+
+    def __len__(self):
+        return len(self.items)
+
+    def _build(self, xyz, order, start, end):
+        node = len(self._starts)
+        block = xyz[order[start:end]]
+        lo, hi = block.min(axis=0), block.max(axis=0)
+        self._starts.append(start)
+        self._ends.append(end)
+        self._left.append(-1)
+        self._right.append(-1)
+        # Boxes stay plain tuples: for three coordinates Python beats NumPy call overhead
+        self._lo.append(tuple(lo.tolist()))
+        self._hi.append(tuple(hi.tolist()))
+        if end - start > LEAF_SIZE:
+            # Split the widest dimension at its median
+            axis = int(np.argmax(hi - lo))
+            mid = (end - start) // 2
+            part = np.argpartition(block[:, axis], mid)
+            order[start:end] = order[start:end][part]
+            self._left[node] = self._build(xyz, order, start, start + mid)
+            self._right[node] = self._build(xyz, order, start + mid, end)
+        return node
+
+    def _box_distance(self, node, q):
+        total = 0.0
+        for lo, hi, x in zip(self._lo[node], self._hi[node], q):
+            gap = lo - x if x < lo else x - hi if x > hi else 0.0
+            total += gap * gap
+        return math.sqrt(total)
+
+    def _results(self, q_lat, q_lon, slots):
+        originals = self._order[slots]
+        km = haversine_km_array(q_lat, q_lon, self.latitudes[originals], self.longitudes[originals])
+        ordering = np.argsort(km, kind='stable')
+        return [(self.items[originals[i]], float(km[i])) for i in ordering]
+
+    def nearest(self, lat, lon, k):
+        """The ``k`` closest ``(item, km)`` pairs, closest first"""
+        if k <= 0 or not len(self):
+            return []
+        q = to_unit_vectors(lat, lon)
+        q_point = tuple(q.tolist())
+        best_d = np.empty(0)
+        best_slots = np.empty(0, dtype=np.intp)
+        frontier = [(0.0, 0)]
+        while frontier:
+            bound, node = heapq.heappop(frontier)
+            if len(best_d) == k and bound > best_d[-1]:
+                break
+            if self._left[node] < 0:
+                start, end = self._starts[node], self._ends[node]
+                diff = self._xyz[start:end] - q
+                d = np.sqrt(np.einsum('ij,ij->i', diff, diff))
+                best_d = np.concatenate([best_d, d])
+                best_slots = np.concatenate([best_slots, np.arange(start, end)])
+                if len(best_d) > k:
+                    keep = np.argpartition(best_d, k - 1)[:k]
+                    best_d, best_slots = best_d[keep], best_slots[keep]
+                ordering = np.argsort(best_d)
+                best_d, best_slots = best_d[ordering], best_slots[ordering]
+                continue
+            for child in (self._left[node], self._right[node]):
+                heapq.heappush(frontier, (self._box_distance(child, q_point), child))
+        return self._results(lat, lon, best_slots)
+
+    def within(self, lat, lon, radius_km, limit=None):
+        """``(item, km)`` pairs no farther than ``radius_km``, closest first"""
+        if radius_km < 0 or not len(self):
+            return []
+        q = to_unit_vectors(lat, lon)
+        q_point = tuple(q.tolist())
+        # Tiny slack so points exactly on the boundary survive rounding
+        chord = _chord_for_km(radius_km) + 1e-12
+        found = []
+        stack = [0]
+        while stack:
+            node = stack.pop()
+            if self._box_distance(node, q_point) > chord:
+                continue
+            if self._left[node] < 0:
+                start, end = self._starts[node], self._ends[node]
+                diff = self._xyz[start:end] - q
+                inside = np.flatnonzero(np.einsum('ij,ij->i', diff, diff) <= chord * chord)
+                if len(inside):
+                    found.append(inside + start)
+                continue
+            stack.append(self._left[node])
+            stack.append(self._right[node])
+        if not found:
+            return []
+        results = [r for r in self._results(lat, lon, np.concatenate(found)) if r[1] <= radius_km]
+        return results[:limit] if limit is not None else results
+
+
+class CenterIndexCache(LoadedCache):
+    """Builds the dispatch center index once and again after ``invalidate()``"""
+
+    def _load(self, conn):
+        rows = conn.execute('SELECT id, name, latitude, longitude FROM dispatch_centers').fetchall()
+        centers = [{'id': row[0], 'name': row[1], 'coordinates': [row[2], row[3]]} for row in rows]
+        return SpatialIndex(centers, [row[2] for row in rows], [row[3] for row in rows])
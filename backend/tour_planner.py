@@ -0,0 +1,180 @@
+"""Multi-stop delivery tours over the road graph.
+
+A tour starts at a depot, visits every stop once and optionally returns.
+Road distances between all stops come from one truncated Dijkstra per stop
+(each search stops once the stops after it are settled, and the symmetric
+half is mirrored).  A nearest-neighbour tour is then improved with 2-opt
+and Or-opt moves until neither finds an improvement or the time budget
+runs out; each move scans all its candidate positions in one NumPy
+expression, so a pass over 500 stops is a few milliseconds.
+"""
+import time
+
+from lazy_imports import lazy_import
+from metrics import instrument
+
+np = lazy_import('numpy')
+
+INF = float('infinity')
+
+# Longest run of consecutive stops Or-opt tries to relocate
+OR_OPT_SEGMENT = 3
+
+# Moves must save more than this to count, so float noise cannot cycle
+EPSILON = 1e-9
+
+
+class UnreachableStops(ValueError):
+    """Some stops cannot be reached from the depot"""
+
+    def __init__(self, stops):
+        super().__init__(f"Unreachable stops: {', '.join(map(str, stops))}")
+        self.stops = stops
+
+
+def stop_distances(graph, nodes):
+    """Road distance matrix between graph node indices ``nodes``"""
+    n = len(nodes)
+    dist = np.zeros((n, n))
+    for i in range(n - 1):
+        tree, _ = graph.shortest_path_tree(nodes[i], targets=nodes[i + 1:])
+        row = [tree[j] for j in nodes[i + 1:]]
+        dist[i, i + 1:] = row
+        dist[i + 1:, i] = row
+    return dist
+
+
+def tour_length(tour, dist):
+    """Length of the cycle ``tour`` including the leg back to its start"""
+    return float(dist[tour, np.roll(tour, -1)].sum())
+
+
+def nearest_neighbour_tour(dist):
+    """Greedy tour from index 0, always driving to the closest unvisited stop"""
+    n = len(dist)
+    visited = np.zeros(n, dtype=bool)
+    visited[0] = True
+    tour = [0]
+    for _ in range(n - 1):
+        nxt = int(np.argmin(np.where(visited, INF, dist[tour[-1]])))
+        visited[nxt] = True
+        tour.append(nxt)
+    return np.array(tour, dtype=np.intp)
+
+
+def two_opt_pass(tour, dist, deadline):
+    """Reverse tour segments while that shortens the cycle; True if any did.
+
+    ``dist`` is read in driving direction, so a matrix whose column 0 is
+    zero (a free return to the depot) gives open tours.
+    """
+    n = len(tour)
+    # ext[n] closes the cycle; reversals stay inside 1..n-1 so it never moves
+    ext = np.append(tour, tour[0])
+    improved = False
+    for i in range(1, n - 1):
+        if time.perf_counter() > deadline:
+            break
+        a, b = ext[i - 1], ext[i]
+        c, d = ext[i + 1:n], ext[i + 2:n + 1]
+        # Replace a->b and c->d with a->c and b->d for every later c
+        delta = dist[a, c] + dist[b, d] - dist[a, b] - dist[c, d]
+        j = int(np.argmin(delta))
+        if delta[j] < -EPSILON:
+            j += i + 1
+            ext[i:j + 1] = ext[i:j + 1][::-1].copy()
+            improved = True
+    tour[:] = ext[:n]
+    return improved
+
+
+def or_opt_pass(tour, dist, deadline):
+    """Move runs of up to ``OR_OPT_SEGMENT`` stops elsewhere; True if any moved"""
+    n = len(tour)
+    improved = False
+    for length in range(1, OR_OPT_SEGMENT + 1):
+        if n - length < 2:
+            break
+        for i in range(1, n - length + 1):
+            if time.perf_counter() > deadline:
+                return improved
+            p, s0, se = tour[i - 1], tour[i], tour[i + length - 1]
+            nx = tour[(i + length) % n]
+            gain = dist[p, s0] + dist[se, nx] - dist[p, nx]
+            if gain <= EPSILON:
+                continue
+            rest = np.concatenate([tour[:i], tour[i + length:]])
+            c, d = rest, np.roll(rest, -1)
+            base = dist[c, d]
+            forward = dist[c, s0] + dist[se, d] - base
+            backward = dist[c, se] + dist[s0, d] - base
+            k_forward, k_backward = int(np.argmin(forward)), int(np.argmin(backward))
+            if forward[k_forward] <= backward[k_backward]:
+                k, cost, segment = k_forward, forward[k_forward], tour[i:i + length]
+            else:
+                k, cost, segment = k_backward, backward[k_backward], tour[i:i + length][::-1]
+            if cost < gain - EPSILON:
+                tour[:] = np.concatenate([rest[:k + 1], segment, rest[k + 1:]])
+                improved = True
+    return improved
+
+
+def improve_tour(tour, dist, deadline):
+    """Alternate 2-opt and Or-opt until both stall or ``deadline`` passes"""
+    tour = tour.copy()
+    while time.perf_counter() < deadline:
+        changed = two_opt_pass(tour, dist, deadline)
+        changed = or_opt_pass(tour, dist, deadline) or changed
+        if not changed:
+            return tour, True
+    return tour, False
+
+
+@instrument(size='stops')
+def plan_tour(graph, depot, stops, return_to_depot=True, time_budget_ms=1000):
+    """Visit order for ``stops`` from ``depot`` with per-leg road paths.
+
+    ``depot`` and ``stops`` must be nodes of ``graph``; duplicate stops and
+    the depot itself are ignored.  Raises ``UnreachableStops`` if the road
+    network does not connect them all.
+    """
+    started = time.perf_counter()
+    unique = [depot] + [s for s in dict.fromkeys(stops) if s != depot]
+
+    dist = stop_distances(graph, [graph.index[s] for s in unique])
+    unreachable = [unique[j] for j in np.flatnonzero(~np.isfinite(dist[0]))]
+    if unreachable:
+        raise UnreachableStops(unreachable)
+    matrix_ms = (time.perf_counter() - started) * 1000
+
+    # Open tours end wherever the last stop is: driving back is free
+    costs = dist if return_to_depot else np.concatenate([np.zeros((len(dist), 1)), dist[:, 1:]], axis=1)
+
+    solve_started = time.perf_counter()
+    initial = nearest_neighbour_tour(costs)
+    tour, converged = improve_tour(initial, costs, solve_started + time_budget_ms / 1000)
+    solve_ms = (time.perf_counter() - solve_started) * 1000
+
+    order = [unique[i] for i in tour]
+    if return_to_depot and len(order) > 1:
+        order.append(depot)
+
+    integral = graph.weights.typecode == 'q'
+    legs = []
+    for u, v in zip(order, order[1:]):
+        path, distance = graph.shortest_path(u, v, astar=graph.supports_astar)
+        legs.append({'from': u, 'to': v, 'distance': int(distance) if integral else distance, 'path': path})
+
+    def total(indices):
+        length = tour_length(indices, costs)
+        return int(round(length)) if integral else length
+
+    return {
+        'order': order,
+        'legs': legs,
+        'total_distance': total(tour),
+        'initial_distance': total(initial),
+        'converged': converged,
+        'matrix_time_ms': round(matrix_ms, 2),
+        'solve_time_ms': round(solve_ms, 2)
+    }
@@ -57,7 +57,7 @@ const MultiDispatch: React.FC = () => {
         centers: selectedCenters
       });
       setResult(response.data);
-      toast.success('Multi-dispatch optimized using Floyd-Warshall algorithm');
+      toast.success('Multi-dispatch routes calculated');
     } catch (error) {
       toast.error('Failed to optimize dispatch plan');
     } finally {
@@ -85,7 +85,7 @@ const MultiDispatch: React.FC = () => {
       <div className="flex items-center justify-between">
         <div>
           <h1 className="text-3xl font-bold text-white">Multi-Dispatch Planning</h1>
-          <p className="text-gray-400 mt-1">Floyd-Warshall algorithm for all-pairs shortest paths</p>
+          <p className="text-gray-400 mt-1">Shortest road routes between the selected centers</p>
         </div>
         <button
           onClick={calculateOptimalDispatch}